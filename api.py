@@ -0,0 +1,292 @@
+# pyright: reportGeneralTypeIssues=false
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+from datetime import date
+from functools import partial
+from flask import Blueprint
+from flask import Response
+from flask import abort
+from flask import current_app
+from flask import request
+from flask import stream_with_context
+from models import Artist
+from models import Venue
+import cache
+import json
+import queries
+import typeahead
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Dict
+from typing import Iterator
+from typing import List
+
+
+#----------------------------------------------------------------------------#
+# Serialization
+#----------------------------------------------------------------------------#
+def encode_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+
+    raise TypeError('%r is not JSON serializable' % type(value))
+
+
+def dumps(value) -> bytes:
+    """Compact JSON: orjson when installed, the standard library otherwise."""
+
+    if orjson is not None:
+        return orjson.dumps(value)
+
+    return json.dumps(value, default=encode_default, separators=(',', ':'),
+                      ensure_ascii=False).encode()
+
+
+def json_response(value, status: int = 200) -> Response:
+    return Response(dumps(value), status, content_type='application/json')
+
+
+def stream_collection(pages: Iterator[List[Dict]]) -> Response:
+    """Every item of pages as one JSON array or as NDJSON, written page by page.
+
+    NDJSON is chosen with ?format=ndjson or Accept: application/x-ndjson.
+    The body is sent chunked while pages are read, so memory holds one page.
+    """
+
+    ndjson = (request.args.get('format') == 'ndjson'
+              or request.accept_mimetypes.best == 'application/x-ndjson')
+
+    def generate_ndjson():
+        for page in pages:
+            if page:
+                yield b'\n'.join(dumps(item) for item in page) + b'\n'
+
+    def generate_array():
+        separator = b'['
+        for page in pages:
+            if page:
+                yield separator + b','.join(dumps(item) for item in page)
+                separator = b','
+
+        yield b'[]' if separator == b'[' else b']'
+
+    if ndjson:
+        return Response(stream_with_context(generate_ndjson()),
+                        content_type='application/x-ndjson')
+
+    return Response(stream_with_context(generate_array()),
+                    content_type='application/json')
+
+
+#----------------------------------------------------------------------------#
+# Blueprint
+#----------------------------------------------------------------------------#
+blueprint = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+# Registered per code: the app's own 404 and 500 pages would win otherwise
+@blueprint.errorhandler(400)
+@blueprint.errorhandler(404)
+@blueprint.errorhandler(500)
+@blueprint.errorhandler(503)
+def http_error(error):
+    return json_response({'error': error.name, 'status': error.code}, error.code)
+
+
+# Most suggestions one typeahead request returns
+TYPEAHEAD_MAX = 50
+
+# Widest and default radius of a "near" search, in kilometres, and most venues returned
+NEAR_MAX_RADIUS = 500
+NEAR_RADIUS = 10
+NEAR_MAX = 100
+
+
+def per_page() -> int:
+    """Requested page size, within (0, API_MAX_PAGE_SIZE]."""
+
+    size = request.args.get('per_page', current_app.config['PAGE_SIZE'], type=int)
+
+    return max(1, min(size, current_app.config['API_MAX_PAGE_SIZE']))
+
+
+def collection(listing, key: str, tags) -> Response:
+    """One keyset page of a listing, or with ?all=1 the whole collection streamed.
+
+    tags(item) names the entities an item depends on, for the page cache;
+    streamed responses are never cached.
+    """
+
+    try:
+        if request.args.get('all'):
+            pages = queries.iter_pages(listing, key, current_app.config['API_MAX_PAGE_SIZE'],
+                                       after=request.args.get('after'))
+
+            # Read the first page now so a bad cursor is still a 400
+            first = next(pages)
+
+            def all_pages():
+                yield first
+                yield from pages
+
+            return stream_collection(all_pages())
+
+        page = listing(request.args.get('after'), per_page())
+
+    except queries.InvalidCursor:
+        abort(400)
+
+    for item in page[key]:
+        cache.tag(*tags(item))
+
+    return json_response({'data': page[key], 'next_cursor': page['next_cursor']})
+
+
+def facets() -> Dict[str, str]:
+    """Facet selections of the request: ?genre= and ?state=."""
+
+    return {k: request.args[k] for k in ('genre', 'state') if request.args.get(k)}
+
+
+def suggestions(kind: str) -> Response:
+    """Names with a word starting with ?q=, from the in-memory index: no SQL."""
+
+    limit = max(1, min(request.args.get('limit', 10, type=int), TYPEAHEAD_MAX))
+
+    try:
+        return json_response({'data': typeahead.search(kind, request.args.get('q', ''), limit)})
+
+    # The names could not be read, even on another try: the database is down
+    except typeahead.IndexUnavailable:
+        abort(503)
+
+
+def search(search_fn) -> Response:
+    term = request.args.get('q', '')
+    page = max(request.args.get('page', 1, type=int), 1)
+
+    return json_response(search_fn(term, page=page, per_page=per_page()))
+
+
+#----------------------------------------------------------------------------#
+#  Venues
+#----------------------------------------------------------------------------#
+@blueprint.route('/venues')
+@cache.cached_page('venues')
+def venues():
+    return collection(partial(queries.venue_listing, **facets()), 'venues',
+                      lambda v: ['venue:%d' % v['id']])
+
+
+@blueprint.route('/venues/facets')
+@cache.cached_page('venues')
+def venue_facets():
+    return json_response(queries.facet_counts('venues', **facets()))
+
+
+@blueprint.route('/venues/typeahead')
+def venue_typeahead():
+    return suggestions('venues')
+
+
+@blueprint.route('/venues/search')
+def search_venues():
+    return search(queries.search_venues)
+
+
+@blueprint.route('/venues/near')
+def venues_near():
+    """Venues within ?radius= km of ?lat=&lon=, nearest first."""
+
+    latitude = request.args.get('lat', type=float)
+    longitude = request.args.get('lon', type=float)
+    radius = request.args.get('radius', NEAR_RADIUS, type=float)
+
+    if (latitude is None or longitude is None or not -90 <= latitude <= 90
+            or not -180 <= longitude <= 180 or not 0 < radius <= NEAR_MAX_RADIUS):
+        abort(400)
+
+    limit = max(1, min(request.args.get('limit', 20, type=int), NEAR_MAX))
+
+    return json_response({'data': queries.venues_near(latitude, longitude, radius, limit)})
+
+
+@blueprint.route('/venues/<int:venue_id>')
+@cache.cached_page('venue:{venue_id}',
+                   version=lambda venue_id: queries.detail_version(Venue, venue_id))
+def venue(venue_id):
+    data = queries.venue_detail(venue_id)
+
+    if data is None:
+        abort(404)
+
+    cache.tag(*('artist:%d' % s['artist_id']
+                for s in data['past_shows'] + data['upcoming_shows']))
+
+    return json_response(data)
+
+
+#----------------------------------------------------------------------------#
+#  Artists
+#----------------------------------------------------------------------------#
+@blueprint.route('/artists')
+@cache.cached_page('artists')
+def artists():
+    return collection(partial(queries.artist_listing, **facets()), 'artists',
+                      lambda a: ['artist:%d' % a['id']])
+
+
+@blueprint.route('/artists/facets')
+@cache.cached_page('artists')
+def artist_facets():
+    return json_response(queries.facet_counts('artists', **facets()))
+
+
+@blueprint.route('/artists/typeahead')
+def artist_typeahead():
+    return suggestions('artists')
+
+
+@blueprint.route('/artists/search')
+def search_artists():
+    return search(queries.search_artists)
+
+
+@blueprint.route('/artists/<int:artist_id>')
+@cache.cached_page('artist:{artist_id}',
+                   version=lambda artist_id: queries.detail_version(Artist, artist_id))
+def artist(artist_id):
+    data = queries.artist_detail(artist_id)
+
+    if data is None:
+        abort(404)
+
+    cache.tag(*('venue:%d' % s['venue_id']
+                for s in data['past_shows'] + data['upcoming_shows']))
+
+    return json_response(data)
+
+
+#----------------------------------------------------------------------------#
+#  Shows
+#----------------------------------------------------------------------------#
+@blueprint.route('/shows')
+@cache.cached_page('shows')
+def shows():
+    # ?from=&to= window on the start time, ?city=&state= of the venue
+    try:
+        filters = queries.show_filters(request.args)
+
+    except ValueError:
+        abort(400)
+
+    return collection(partial(queries.show_listing, **filters), 'shows',
+                      lambda s: ['venue:%d' % s['venue_id'], 'artist:%d' % s['artist_id']])
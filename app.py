@@ -4,31 +4,49 @@
 #----------------------------------------------------------------------------#
 from datetime import datetime as dt
 from flask import Flask
+from flask import Response
 from flask import render_template
 from flask import request
-# from flask import Response
+from flask import stream_with_context
+from flask import abort
 from flask import flash
+from flask import jsonify
 from flask import redirect
 from flask import url_for
 from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from logging import Formatter, FileHandler
 # from flask_wtf import Form
 # from flask_wtf.csrf import CSRFProtect
 from forms import *
+from models import db
 from models import Artist
-from models import Contact
 from models import Venue
 from models import Show
 from forms import ArtistForm
 from forms import VenueForm
 from forms import ShowForm 
+import api
+import assets
+import bookings
+import cache
+import counters
+import formatting
+import ical
+import importer
+import instrumentation
+import profiling
+import queries
+import routing
+import typeahead
+import writes
 
 # import json
-import dateutil.parser
-import babel
+import click
+import hmac
+import io
 import logging
+import os
 import sys
 
 #----------------------------------------------------------------------------#
@@ -42,33 +60,90 @@ from typing import Union
 #----------------------------------------------------------------------------#
 # App Config
 #----------------------------------------------------------------------------#
-app = Flask(__name__)
+def create_app(config_object='config') -> Flask:
+    """Build the Flask app around the single, shared SQLAlchemy instance.
 
-# TODO: Investigate this.
-moment = Moment(app)
+    Nothing here touches the database: engines are created lazily on first
+    use, so a pre-forking server can import the app in its master process
+    and every worker opens its own connections (see models.py).
+    """
 
-app.config.from_object('config')
+    app = Flask(__name__)
 
-db = SQLAlchemy(app)
+    app.config.from_object(config_object)
 
-migrate = Migrate(app, db)
+    # SQLite has no connection queue to size, nor psycopg2's executemany modes
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            k: v for k, v in app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}).items()
+            if k not in ('pool_size', 'max_overflow', 'pool_timeout', 'executemany_mode')
+        }
+
+    # Read replicas become binds of db: register them first
+    routing.init_app(app)
+
+    db.init_app(app)
+
+    # Schema changes go through migrations only: flask db upgrade
+    Migrate(app, db)
+
+    # TODO: Investigate this.
+    Moment(app)
+
+    # TODO: Use this. Not now, though.
+    # csrf = CSRFProtect(app)
+
+    cache.init_app(app)
+
+    instrumentation.init_app(app)
+
+    # Sampled stacks of requests asked for by X-Profile or drawn at random
+    profiling.init_app(app)
+
+    # Versioned JSON API over the same query layer: /api/v1/...
+    app.register_blueprint(api.blueprint)
+
+    app.jinja_env.filters['datetime'] = formatting.format_datetime
+
+    # Fingerprinted, precompressed CSS/JS and asset_url() for templates
+    assets.init_app(app)
+
+    # In-memory artist and venue name indexes for the show form's pickers
+    typeahead.init_app(app)
+
+    if not app.debug:
+        file_handler = FileHandler('error.log')
+        file_handler.setFormatter(
+            Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+        )
+        app.logger.setLevel(logging.INFO)
+        file_handler.setLevel(logging.INFO)
+        app.logger.addHandler(file_handler)
+        app.logger.info('errors')
 
-# TODO: Use this. Not now, though.
-# csrf = CSRFProtect(app)
+    return app
+
+
+app = create_app()
 
 
 #----------------------------------------------------------------------------#
-# Filters
+# Streaming
 #----------------------------------------------------------------------------#
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format, locale='en')
+def stream_template(template_name: str, **context) -> Response:
+    """Render a template to the client piece by piece as it is evaluated.
+
+    Iterables in the context are consumed while the body is being sent, so
+    a generator of rows is never held in memory in full.
+    """
+
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(template_name).stream(context)
 
-app.jinja_env.filters['datetime'] = format_datetime
+    # Send a few dozen template statements per chunk rather than each one
+    stream.enable_buffering(app.config.get('STREAM_BUFFER', 64))
+
+    return Response(stream_with_context(stream))
 
 
 #----------------------------------------------------------------------------#
@@ -83,151 +158,84 @@ def index():
 #  Venues
 #----------------------------------------------------------------------------#
 @app.route('/venues')
+@cache.cached_page('venues')
 def venues():
 
-    # Instantiate empty resulting data
-    data = []
-
-    # Instantiate venues data
-    venuesPerCity: Dict[str, List] = {}
-
-    # Iterate through all venues grouping them by city
-    for venue in Venue.query.all():
-
-        # Get venue's upcoming shows
-        relatedShows = Show.query.filter_by(venue_id=venue.id)
-
-        # Count upcoming shows based on current date-time
-        upcoming_shows_count = relatedShows.filter(Show.start > dt.now()).count()
-
-        # Instantiate venue data to be displayed
-        venueData = {
-                'id': venue.id,
-                'name': venue.name,
-                'upcoming_shows_count': upcoming_shows_count,
-        }
-
-        # Fetch venue's contact information
-        contact = Contact.query.get(venue.contact_id)
-
-        # Construct grouping key based on venue's tuple of state and city
-        city = str(contact.state) + '$' + str(contact.city)
-
-        # City is not yet a key: instantiate a list with current venue
-        if city not in venuesPerCity:
-            venuesPerCity[city] = [venueData]
+    # Facet selections, e.g. /venues?genre=Jazz&state=CA
+    facets = {k: request.args[k] for k in ('genre', 'state') if request.args.get(k)}
 
-        # City points to existing data: append current venue data
-        else:
-            venuesPerCity[city].append(venueData)
+    # A page of venues grouped by (state, city) with upcoming show counts
+    try:
+        data = queries.venue_directory(request.args.get('after'),
+                                       app.config['PAGE_SIZE'],
+                                       **facets)
 
-    # Iterate through venues per city data
-    for cityState, venues in venuesPerCity.items():
+    except queries.InvalidCursor:
+        abort(400)
 
-        # ...
-        data.append({
-            'city': cityState.split('$')[0],
-            'state': cityState.split('$')[1],
-            'venues': venues,
-        })
+    # The page goes stale whenever one of its venues changes
+    cache.tag(*('venue:%d' % v['id'] for area in data['areas'] for v in area['venues']))
 
     # Render data to the user
-    return render_template('pages/venues.html', areas=data, form=VenueForm());
+    return render_template('pages/venues.html',
+                           areas=data['areas'],
+                           next_cursor=data['next_cursor'],
+                           facets=facets,
+                           counts=queries.facet_counts('venues', **facets),
+                           form=VenueForm());
 
 
-@app.route('/venues/search', methods=['POST'])
+@app.route('/venues/search', methods=['GET', 'POST'])
+@routing.read_only
 def search_venues():
-    
-    # Fetch search string from page's form
-    search: str = request.form.get('search_term')
-
-    # Fetch venues through wildcarding
-    venues = Venue.query.filter(Venue.name.ilike(f'%{search}%')).all()
-
-    # Instantiate response data
-    data: List[Dict[str, Union[str, int]]] = []
-
-    for venue in venues:
-
-        # Get venue's upcoming shows
-        relatedShows = Show.query.filter_by(venue_id=venue.id)
 
-        # Count upcoming shows based on current date-time
-        upcoming_shows_count = relatedShows.filter(Show.start > dt.now()).count()
+    # Fetch search string from page's form, or from a results page link
+    search: str = request.values.get('search_term', '')
 
-        # Instantiate venue data to be displayed
-        data.append({
-                'id': venue.id,
-                'name': venue.name,
-                'upcoming_shows_count': upcoming_shows_count,
-        })
-
-    # Instantiate response
-    response = {
-            'count': len(data),
-            'data': data,
-    }
+    # Ranked, indexed search with upcoming counts in the same query
+    response = queries.search_venues(search,
+                                     page=max(request.args.get('page', 1, type=int), 1))
 
     return render_template('pages/search_venues.html',
                            results = response,
-                           search_term = request.form.get('search_term', ''),
+                           search_term = search,
                            form = VenueForm())
 
 
 @app.route('/venues/<int:venue_id>')
+@cache.cached_page('venue:{venue_id}',
+                   version=lambda venue_id: queries.detail_version(Venue, venue_id))
 def show_venue(venue_id):
-    
-    # Fetch venue by id
-    venue = Venue.query.get(venue_id)
 
-    # Fetch shows by fetched venue
-    shows = Show.query.filter_by(venue_id = venue.id).all()
+    # Venue, its contact and its shows split by date, in bounded queries
+    data = queries.venue_detail(venue_id)
 
-    # Instantiate list of upcoming and past shows
-    pastShows: List[Dict[str, str]] = []
-    upcomingShows: List[Dict[str, str]] = []
+    if data is None:
+        abort(404)
 
-    for show in shows:
+    # Artist names and images shown with each show come from other rows
+    cache.tag(*('artist:%d' % s['artist_id']
+                for s in data['past_shows'] + data['upcoming_shows']))
 
-        artist = Artist.query.get(show.artist_id)
+    formatting.label_shows(data['past_shows'] + data['upcoming_shows'])
 
-        showData = {
-            'artist_id': show.artist_id,
-            'artist_name': artist.name,
-            'artist_image_link': artist.image_link,
-            'start_time': str(show.start),
-        }
+    return render_template('pages/show_venue.html', venue=data, form=VenueForm)
 
-        if show.start < dt.now():
-            pastShows.append(showData)
 
-        else:
-            upcomingShows.append(showData)
+@app.route('/venues/<int:venue_id>.ics')
+def venue_calendar(venue_id):
 
-    venueContactInfo = Contact.query.get(venue.contact_id)
-    
-    data = {
-        "id": venue.id,
-        "name": venue.name,
-        "genres": venue.genres,
-        "address": venueContactInfo.address,
-        "city": venueContactInfo.city,
-        "state": venueContactInfo.state,
-        "phone": venueContactInfo.phone,
-        "website": venueContactInfo.website_link,
-        "facebook_link": venueContactInfo.facebook_link,
-        "image_link": venueContactInfo.image_link,
-        "past_shows": pastShows,
-        "upcoming_shows": upcomingShows,
-        "past_shows_count": len(pastShows),
-        "upcoming_shows_count": len(upcomingShows),
-
-        # Hard-coded while I'm stuck
-        "seeking_talent": True,
-        "seeking_description": "Hardcoded description which means nothing."
-    }
+    # Name, then every show streamed by (venue_id, start); skipped on a 304
+    def load():
+        venue = db.session.query(Venue.name).filter(Venue.id == venue_id).first()
 
-    return render_template('pages/show_venue.html', venue=data, form=VenueForm)
+        if venue is None:
+            return None
+
+        return venue.name or '', queries.calendar_shows(Show.venue_id == venue_id)
+
+    return ical.feed_response('venue:%d' % venue_id, load,
+                              lambda: queries.detail_version(Venue, venue_id))
 
 
 #----------------------------------------------------------------------------#
@@ -250,68 +258,38 @@ def create_venue_submission():
    #      return render_template('forms/new_venue.html', form = form)
 
     try:
-
-        # Fetch form data.
-        name = request.form['name']
-        city = request.form['city']
-        state = request.form['state']
-        address = request.form['address']
-        phone = request.form['phone']
-        genres = request.form.getlist('genres')
-        website = request.form['website_link']
-        image_link = request.form['image_link']
-        facebook_link = request.form['facebook_link']
-
-        # Instantiate a contact
-        contact = Contact(city = city,
-                          state = state,
-                          address = address,
-                          phone = phone,
-                          image_link = image_link,
-                          facebook_link = facebook_link,
-                          website_link = website)
-
-        db.session.add(contact)
-        db.session.commit()
-
-        contact_id = contact.id
-
-        venue_created = Venue(name = name,
-                              genres = genres,
-                              contact_id = contact_id)
-
-        db.session.add(venue_created)
-        db.session.commit()
+        # Venue, contact and genre links: one flush, one commit
+        with writes.UnitOfWork() as uow:
+            uow.save(Venue, form.data)
 
     except:
-
-        db.session.rollback()
-
         print(sys.exc_info())
-
         error = True
 
     finally:
         db.session.close()
 
-    # FIXME: Remove this quickfix
-    name = 'shabbles'
-
     if not error:
-        print('ValidationError')
-        flash('Venue ' + name + ' was successfully listed!')
+        flash('Venue ' + form.name.data + ' was successfully listed!')
 
     else:
-        flash('An error occurred. Venue ' + name + ' could not be listed.')
+        flash('An error occurred. Venue ' + (form.name.data or '') + ' could not be listed.')
 
     return render_template('pages/home.html')
 
 
 @app.route('/venues/<venue_id>', methods=['DELETE'])
 def delete_venue(venue_id):
+    success = False
     try:
-        Venue.query.filter_by(id=venue_id).delete()
+        # Through the session, so genre links and facet counts follow
+        venue = Venue.query.get(venue_id)
+        if venue is not None:
+            db.session.delete(venue)
         db.session.commit()
+        success = True
+
+        cache.catalog_changed.send(app, tags=['venue:%s' % venue_id, 'venues'])
 
     except:
         db.session.rollback()
@@ -325,111 +303,88 @@ def delete_venue(venue_id):
     # redirect the user to the homepage.
 
     # -> Not now, thanks.
-    return None
+    return jsonify(success=success)
 
 
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')
+@cache.cached_page('artists')
 def artists():
 
-    data = [{ 'id': a.id, 'name': a.name} for a in Artist.query.all()]
+    # Facet selections, e.g. /artists?genre=Jazz&state=CA
+    facets = {k: request.args[k] for k in ('genre', 'state') if request.args.get(k)}
+
+    # A page of artists, positioned by the cursor of the previous page
+    try:
+        data = queries.artist_listing(request.args.get('after'),
+                                      app.config['PAGE_SIZE'],
+                                      **facets)
+
+    except queries.InvalidCursor:
+        abort(400)
+
+    cache.tag(*('artist:%d' % a['id'] for a in data['artists']))
 
     return render_template('pages/artists.html',
-                           artists = data,
+                           artists = data['artists'],
+                           next_cursor = data['next_cursor'],
+                           facets = facets,
+                           counts = queries.facet_counts('artists', **facets),
                            form = ArtistForm())
 
-@app.route('/artists/search', methods=['POST'])
+@app.route('/artists/search', methods=['GET', 'POST'])
+@routing.read_only
 def search_artists():
-    # ... 
-    search = request.form.get('search_term')
-
-    # ... 
-    artists = Artist.query.filter(Artist.name.ilike(f'%{search}')).all()
-
-    # ... 
-    data = []
-
-    # ... 
-    for a in artists:
-        relatedShows = Show.query.filter_by(artist_id = a.id)
-        upcoming_shows_count = relatedShows.filter(Show.start > dt.now()).count()
-        artistData = {
-                'id': a.id,
-                'name': a.name,
-                'num_upcoming_shows': upcoming_shows_count,
-        }
-        data.append(artistData)
 
-    response = {
-            'count': len(data),
-            'data': data,
-    }
+    # Fetch search string from page's form, or from a results page link
+    search: str = request.values.get('search_term', '')
+
+    # Ranked, indexed search with upcoming counts in the same query
+    response = queries.search_artists(search,
+                                      page=max(request.args.get('page', 1, type=int), 1))
 
     return render_template('pages/search_artists.html',
                            results = response,
-                           search_term = request.form.get('search_term', ''),
+                           search_term = search,
                            form = ArtistForm())
 
 @app.route('/artists/<int:artist_id>')
+@cache.cached_page('artist:{artist_id}',
+                   version=lambda artist_id: queries.detail_version(Artist, artist_id))
 def show_artist(artist_id):
 
-    # ...
-    data = []
+    # Artist, its contact and its shows split by date, in bounded queries
+    data = queries.artist_detail(artist_id)
 
-    # ...
-    artist = Artist.query.get(artist_id)
+    if data is None:
+        abort(404)
 
-    # ...
-    artistContact = Contact.query.get(artist.contact_id)
+    # Venue names and images shown with each show come from other rows
+    cache.tag(*('venue:%d' % s['venue_id']
+                for s in data['past_shows'] + data['upcoming_shows']))
 
-    # ...
-    shows = Show.query.filter_by(artist_id = artist.id).all()
+    formatting.label_shows(data['past_shows'] + data['upcoming_shows'])
 
-    # ...
-    pastShows = []
-    upcomingShows = []
+    return render_template('pages/show_artist.html',
+                           artist = data,
+                           form = ArtistForm())
 
-    # ...
-    for s in shows:
 
-        # ...
-        venue = Venue.query.get(s.venue_id)
-        venueContact = Contact.query.get(venue.contact_id)
+@app.route('/artists/<int:artist_id>.ics')
+def artist_calendar(artist_id):
 
-        # ...
-        show = {
-            'venue_id': s.venue_id,
-            'venue_name': venue.name,
-            'venue_image_link': venueContact.image_link,
-            'start_time': str(s.start),
-        }
+    # Name, then every show streamed by (artist_id, start); skipped on a 304
+    def load():
+        artist = db.session.query(Artist.name).filter(Artist.id == artist_id).first()
 
-        if s.start < dt.now():
-            pastShows.append(show)
-
-        else:
-            upcomingShows.append(show)
-
-    data = {
-        'id': artist.id,
-        'name': artist.name,
-        'genres': artist.genres,
-        'city': artistContact.city,
-        'state': artistContact.state,
-        'phone': artistContact.phone,
-        'website': artistContact.website_link,
-        'facebook_link': artistContact.facebook_link,
-        'image_link': artistContact.image_link,
-        'past_shows': pastShows,
-        'upcoming_shows': upcomingShows,
-        'past_shows_count': len(pastShows),
-        'upcoming_shows_count': len(upcomingShows),
-    }
+        if artist is None:
+            return None
 
-    return render_template('pages/show_artist.html',
-                           artist = data,
-                           form = ArtistForm())
+        return artist.name or '', queries.calendar_shows(Show.artist_id == artist_id)
+
+    return ical.feed_response('artist:%d' % artist_id, load,
+                              lambda: queries.detail_version(Artist, artist_id))
 
 #  ----------------------------------------------------------------
 #  Update
@@ -437,27 +392,24 @@ def show_artist(artist_id):
 @app.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
 
-    # ...
-    # artist = {}
+    # Artist, contact and genres in one query
+    artist = writes.load(Artist, artist_id)
 
-    # ...
-    form = ArtistForm()
-
-    # ...
-    artist = Artist.query.get(artist_id)
+    if artist is None:
+        abort(404)
 
     # ...
-    artistContact = Contact.query.get(artist.contact_id)
+    form = ArtistForm()
 
     # ...
     form.name.data = artist.name
     form.genres.data = artist.genres
-    form.city.data = artistContact.city
-    form.state.data = artistContact.state
-    form.facebook_link.data = artistContact.facebook_link
-    form.image_link.data = artistContact.image_link
-    form.website_link.data = artistContact.website_link
-    form.phone.data = artistContact.phone
+    form.city.data = artist.contact.city
+    form.state.data = artist.contact.state
+    form.facebook_link.data = artist.contact.facebook_link
+    form.image_link.data = artist.contact.image_link
+    form.website_link.data = artist.contact.website_link
+    form.phone.data = artist.contact.phone
     
     # ...
     returnArtist = {
@@ -481,32 +433,23 @@ def edit_artist_submission(artist_id):
     # ...
     if not form.validate():
         flash('Bad input.')
-        return render_template('forms/edit_artist.html', form = form)
-
-    # ...
-    try:
-        # ...
-        artist = Artist.query.get(artist_id)
+        return render_template('forms/edit_artist.html', form = form,
+                               artist = {'id': artist_id, 'name': form.name.data})
 
-        # ...
-        artistContact = Contact.query.get(artist.contact_id)
+    # Read in the transaction the unit of work commits
+    artist = writes.load(Artist, artist_id)
 
-        # ...
-        artist.name = request.form['name']
-        artist.genres = request.form.getlist['genres']
-        artistContact.city = request.form['city']
-        artistContact.state = request.form['state']
-        artistContact.phone = request.form['phone']
-        artistContact.image_link = request.form['image_link']
-        artistContact.website_link = request.form['website']
-        artistContact.facebook_link = request.form['facebook_link']
+    if artist is None:
+        abort(404)
 
-        # ...
-        db.session.commit()
+    # ...
+    try:
+        # Artist, contact and genre links: one flush, one commit
+        with writes.UnitOfWork() as uow:
+            uow.save(Artist, form.data, artist)
 
     # ...
     except:
-        db.session.rollback()
         print(sys.exc_info())
         error = True
 
@@ -516,10 +459,10 @@ def edit_artist_submission(artist_id):
 
     # ...
     if not error:
-        flash('Artist ' + request.form['name'] + ' was successfully edited.')
+        flash('Artist ' + form.name.data + ' was successfully edited.')
 
     else:
-        flash('Artist ' + request.form['name'] + ' could not be edited.')
+        flash('Artist ' + form.name.data + ' could not be edited.')
 
     return redirect(url_for('show_artist', artist_id=artist_id))
 
@@ -527,27 +470,27 @@ def edit_artist_submission(artist_id):
 @app.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
 
-    # ...
-    form = VenueForm()
+    # Venue, contact and genres in one query
+    venue = writes.load(Venue, venue_id)
 
-    # ...
-    venue = Venue.query.get(venue_id)
+    if venue is None:
+        abort(404)
 
     # ...
-    venueContact = Contact.query.get(venue.contact_id)
+    form = VenueForm()
 
     # ...
     form.name.data = venue.name
     form.genres.data = venue.genres
 
     # ...
-    form.city.data = venueContact.city
-    form.state.data = venueContact.state
-    form.phone.data = venueContact.phone
-    form.address.data = venueContact.address
-    form.website_link.data = venueContact.website_link
-    form.image_link.data = venueContact.image_link
-    form.facebook_link.data = venueContact.facebook_link
+    form.city.data = venue.contact.city
+    form.state.data = venue.contact.state
+    form.phone.data = venue.contact.phone
+    form.address.data = venue.contact.address
+    form.website_link.data = venue.contact.website_link
+    form.image_link.data = venue.contact.image_link
+    form.facebook_link.data = venue.contact.facebook_link
 
     # ...
     venue = {
@@ -573,33 +516,23 @@ def edit_venue_submission(venue_id):
         flash('Bad input.')
 
         # ...
-        return render_template('forms/edit_venue.html', form = form)
+        return render_template('forms/edit_venue.html', form = form,
+                               venue = {'id': venue_id, 'name': form.name.data})
 
-    # ...
-    try:
-        # ...
-        venue = Venue.query.get(venue_id)
-        venueContact = Contact.query.get(selectedVenue.contact_id)
-
-        # ...
-        venueContact.city = request.form['city']
-        venueContact.state = request.form['state']
-        venueContact.phone = request.form['phone']
-        venueContact.address = request.form['address']
-        venueContact.website_link = request.form['website']
-        venueContact.image_link = request.form['image_link']
-        venueContact.facebook_link = request.form['facebook_link']
+    # Read in the transaction the unit of work commits
+    venue = writes.load(Venue, venue_id)
 
-        # ...
-        venue.name = request.form['name']
-        venue.genres = request.form.getlist('genres')
+    if venue is None:
+        abort(404)
 
-        # ...
-        db.session.commit()
+    # ...
+    try:
+        # Venue, contact and genre links: one flush, one commit
+        with writes.UnitOfWork() as uow:
+            uow.save(Venue, form.data, venue)
 
     # ...
     except:
-        db.session.rollback()
         print(sys.exc_info())
         error = True
 
@@ -609,11 +542,11 @@ def edit_venue_submission(venue_id):
 
     # ...
     if not error:
-        flash('Venue ' + request.form['name'] + ' was successfully edited.')
+        flash('Venue ' + form.name.data + ' was successfully edited.')
 
     # ...
     else:
-        flash('Venue ' + request.form['name'] + ' could not be edited.')
+        flash('Venue ' + form.name.data + ' could not be edited.')
 
     # ...
     return redirect(url_for('show_venue', venue_id = venue_id))
@@ -643,46 +576,12 @@ def create_artist_submission():
 
     # ...
     try:
-
-        # Fetch form data.
-        name = request.form['name']
-        city = request.form['city']
-        state = request.form['state']
-        phone = request.form['phone']
-        genres = request.form.getlist('genres')
-        image_link = request.form['image_link']
-        website_link = request.form['website_link']
-        facebook_link = request.form['facebook_link']
-
-        # ...
-        contact = Contact(city = city,
-                          state = state,
-                          phone = phone,
-                          facebook_link = facebook_link,
-                          image_link = image_link,
-                          website_link = website_link)
-
-        # ...
-        db.session.add(contact)
-        db.session.commit()
-
-        # ...
-        contact_id = contact.id
-
-        # ...
-        artist_created = Artist(name = name,
-                                genres = genres,
-                                contact_id = contact_id)
-
-        # ...
-        db.session.add(artist_created)
-
-        # ...
-        db.session.commit()
+        # Artist, contact and genre links: one flush, one commit
+        with writes.UnitOfWork() as uow:
+            uow.save(Artist, form.data)
 
     # ...
     except:
-        db.session.rollback()
         print(sys.exc_info())
         error = True
 
@@ -692,11 +591,11 @@ def create_artist_submission():
 
     # ...
     if not error:
-        flash('Artist ' + request.form['name'] + ' was successfully listed!')
+        flash('Artist ' + form.name.data + ' was successfully listed!')
 
     # ...
     else:
-      flash('An error occurred. Artist ' + name + ' could not be listed.')
+      flash('An error occurred. Artist ' + (form.name.data or '') + ' could not be listed.')
 
     # ...
     return render_template('pages/home.html', form = form)
@@ -706,39 +605,51 @@ def create_artist_submission():
 #  Shows
 #----------------------------------------------------------------------------#
 @app.route('/shows')
+@cache.cached_page('shows')
 def shows():
 
-    # ...
-    data = []
+    # ?from=&to= window on the start time, ?city=&state= of the venue
+    try:
+        filters = queries.show_filters(request.args)
 
-    # ...
-    shows = Show.query.all()
+    except ValueError:
+        abort(400)
 
-    # ...
-    for s in shows:
+    # Kept by the pager links
+    params = {k: request.args[k] for k in ('from', 'to', 'city', 'state') if request.args.get(k)}
 
-        # ...
-        venue = Venue.query.filter_by(id = s.venue_id).first()
+    # The whole listing, streamed from a server-side cursor as it renders
+    if request.args.get('all'):
+        try:
+            rows = queries.iter_shows(request.args.get('after'), **filters)
 
-        # ...
-        artist = Artist.query.filter_by(id = s.artist_id).first()
+        except queries.InvalidCursor:
+            abort(400)
 
-        # ...
-        artistContact = Contact.query.filter_by(id = artist.contact_id)
+        return stream_template('pages/shows.html',
+                               shows=formatting.iter_labeled(rows),
+                               next_cursor=None,
+                               params=params)
 
-        # ...
-        show_data = {
-          'venue_id': s.venue_id,
-          'venue_name': venue.name,
-          'artist_id': s.artist_id,
-          'artist_name': artist.name,
-          'artist_image_link': artistContact.image_link,
-          'start_time': str(s.start)
-        }
+    # A page of shows with artist and venue joined in, keyed on (start, id)
+    try:
+        data = queries.show_listing(request.args.get('after'),
+                                    app.config['PAGE_SIZE'],
+                                    **filters)
+
+    except queries.InvalidCursor:
+        abort(400)
+
+    for s in data['shows']:
+        cache.tag('venue:%d' % s['venue_id'], 'artist:%d' % s['artist_id'])
 
-        data.append(show_data)
+    # Start times of the whole page formatted in one pass
+    formatting.label_shows(data['shows'])
 
-    return render_template('pages/shows.html', shows=data)
+    return render_template('pages/shows.html',
+                           shows=data['shows'],
+                           next_cursor=data['next_cursor'],
+                           params=params)
 
 
 @app.route('/shows/create')
@@ -757,21 +668,33 @@ def create_show_submission():
     # ...
     form = ShowForm()
 
+    # Invalid fields and booking conflicts go back to the form, by their field
+    if not form.validate():
+        return render_template('forms/new_show.html', form=form), 400
+
     # ...
     try:
-        artist_id = request.form['artist_id']
-        venue_id = request.form['venue_id']
-        start_time = request.form['start_time']
-        show_created = Show(artist_id = artist_id,
-                            venue_id = venue_id,
-                            start_time = start_time)
+        artist_id = form.artist_id.data
+        venue_id = form.venue_id.data
+        start = form.start_time.data
+        end = bookings.end_of(start, minutes=form.duration.data)
 
-        # ...
-        db.session.add(show_created)
+        # One indexed range query, then the insert
+        bookings.book_show(venue_id, artist_id, start, end)
 
         # ...
         db.session.commit()
 
+        # Only pages showing this artist or venue, and the show listing
+        cache.catalog_changed.send(app, tags=['artist:%s' % artist_id,
+                                              'venue:%s' % venue_id,
+                                              'shows'])
+
+    except bookings.BookingConflict as e:
+        db.session.rollback()
+        getattr(form, e.field).errors.append(str(e))
+        return render_template('forms/new_show.html', form=form), 409
+
     # ...
     except:
         db.session.rollback()
@@ -794,6 +717,231 @@ def create_show_submission():
     return render_template('pages/home.html', form=form)
 
 
+#----------------------------------------------------------------------------#
+#  Import
+#----------------------------------------------------------------------------#
+def require_import_token():
+    """Abort unless the request carries the configured IMPORT_TOKEN."""
+
+    token = app.config.get('IMPORT_TOKEN')
+
+    # Disabled unless a token is configured
+    if not token:
+        abort(404)
+
+    # As bytes: compare_digest() raises TypeError on non-ASCII str
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(),
+                               ('Bearer ' + token).encode()):
+        abort(403)
+
+
+@app.route('/import/<kind>', methods=['POST'])
+def import_catalog(kind):
+    """Stream a CSV or NDJSON upload of venues, artists or shows into the catalog.
+
+    The file is the request body (Content-Type text/csv or
+    application/x-ndjson) or a multipart 'file' field; requires the
+    IMPORT_TOKEN configured on the server as a bearer token.
+    """
+
+    require_import_token()
+
+    if kind not in importer.KINDS:
+        abort(404)
+
+    if 'file' in request.files:
+        upload = request.files['file']
+        stream = upload.stream
+
+        try:
+            format = request.args.get('format') or importer.format_for(upload.filename or '')
+        except ValueError:
+            abort(400)
+
+    else:
+        stream = request.stream
+        format = request.args.get('format') or \
+            ('ndjson' if 'ndjson' in (request.mimetype or '') else 'csv')
+
+    if format not in importer.FORMATS:
+        abort(400)
+
+    # Rows are read from the socket chunk by chunk, never all at once
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+
+    try:
+        result = importer.import_stream(kind, text, format,
+                                        request.args.get('chunk_size', type=int))
+
+    except importer.InvalidRow as e:
+        cache.catalog_changed.send(app, tags=e.tags)
+        if e.imported and kind != 'shows':
+            typeahead.schedule_reload()
+        return jsonify(error=str(e), row=e.row, imported=e.imported), 400
+
+    # COPY bypasses the session events that keep the name index current
+    if kind != 'shows':
+        typeahead.schedule_reload()
+
+    cache.catalog_changed.send(app, tags=result.pop('tags'))
+
+    return jsonify(result)
+
+
+@app.route('/batch/<kind>', methods=['POST'])
+def batch_submission(kind):
+    """Create many venues or artists from a JSON array, all or none of them.
+
+    Each object has the fields of the import rows (name, genres and the
+    contact's); up to writes.BATCH_MAX per request, saved in one
+    transaction. Requires the IMPORT_TOKEN as a bearer token.
+    """
+
+    require_import_token()
+
+    if kind not in writes.KINDS:
+        abort(404)
+
+    rows = request.get_json(silent=True)
+
+    if not isinstance(rows, list):
+        abort(400)
+
+    if len(rows) > writes.BATCH_MAX:
+        abort(413)
+
+    try:
+        with writes.UnitOfWork() as uow:
+            # Reserved up front: read before the commit expires them
+            ids = [entity.id for entity in uow.save_all(writes.KINDS[kind], rows)]
+
+    except writes.InvalidEntity as e:
+        return jsonify(error=str(e), row=e.row), 400
+
+    finally:
+        db.session.close()
+
+    return jsonify(kind=kind, rows=len(ids), ids=ids), 201
+
+
+#----------------------------------------------------------------------------#
+# Commands
+#----------------------------------------------------------------------------#
+@app.cli.command('import-catalog')
+@click.argument('kind', type=click.Choice(importer.KINDS))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', type=click.Choice(importer.FORMATS),
+              help='Input format; guessed from the file extension by default.')
+@click.option('--chunk-size', type=int, default=importer.CHUNK_SIZE, show_default=True,
+              help='Rows per COPY and per transaction.')
+def import_catalog_command(kind, path, format, chunk_size):
+    """Bulk load venues, artists or shows from a CSV or NDJSON file."""
+
+    try:
+        format = format or importer.format_for(path)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--format')
+
+    with open(path, encoding='utf-8', newline='') as f:
+        try:
+            result = importer.import_stream(kind, f, format, chunk_size)
+
+        except importer.InvalidRow as e:
+            cache.catalog_changed.send(app, tags=e.tags)
+            raise click.ClickException('%s (%d rows imported before it)' % (e, e.imported))
+
+    cache.catalog_changed.send(app, tags=result['tags'])
+
+    print('Imported %(rows)d %(kind)s in %(chunks)d chunks, %(seconds).1f s '
+          '(%(rows_per_second)d rows/s).' % result)
+
+
+@app.cli.command('roll-show-counters')
+def roll_show_counters_command():
+    """Move shows that started since the last roll into past counts.
+
+    Meant to run periodically, e.g. every few minutes from cron.
+    """
+    result = counters.roll_show_counters()
+    print('Rolled show counters of %(venues)d venues and %(artists)d artists.' % result)
+
+
+@app.cli.command('rebuild-show-counters')
+def rebuild_show_counters_command():
+    """Recount upcoming and past shows of every venue and artist."""
+    result = counters.rebuild_show_counters()
+    print('Rebuilt show counters of %(venues)d venues and %(artists)d artists.' % result)
+
+
+@app.cli.command('rebuild-facet-counts')
+def rebuild_facet_counts_command():
+    """Recount venues and artists per state and genre for faceted browsing."""
+    result = counters.rebuild_facet_counts()
+    print('Rebuilt %(venues)d venue and %(artists)d artist facet counts.' % result)
+
+
+@app.cli.command('rebuild-show-cards')
+def rebuild_show_cards_command():
+    """Rewrite the /shows read model from shows, venues, artists and contacts."""
+    print('Rebuilt %d show cards.' % counters.rebuild_show_cards())
+
+
+@app.cli.command('check-show-cards')
+def check_show_cards_command():
+    """Report show cards out of step with their sources; fails if any are."""
+    result = counters.check_show_cards()
+    print('%(cards)d show cards: %(missing_or_stale)d shows missing or stale, '
+          '%(unexpected)d unexpected cards.' % result)
+
+    if result['missing_or_stale'] or result['unexpected']:
+        raise click.ClickException('show cards out of step (shows %s); '
+                                   'run flask rebuild-show-cards' % ', '.join(
+                                       str(id) for id in sorted(set(result['missing_or_stale_ids']
+                                                                    + result['unexpected_ids']))))
+
+
+@app.cli.command('merge-profiles')
+@click.option('--endpoint', multiple=True, help='Only these endpoints; all by default.')
+@click.option('--directory', type=click.Path(file_okay=False),
+              help='Where profiles were saved; PROFILE_DIR by default.')
+@click.option('--output', type=click.File('w'), default='-',
+              help='Collapsed stacks for flamegraph.pl or speedscope; stdout by default.')
+def merge_profiles_command(endpoint, directory, output):
+    """Sum saved request profiles per endpoint into collapsed stacks."""
+    merged = profiling.merge(profiling.load_profiles(directory or app.config['PROFILE_DIR'],
+                                                     endpoint))
+
+    if not merged:
+        raise click.ClickException('no profiles found')
+
+    for line in profiling.collapsed(merged):
+        output.write(line + '\n')
+
+    # Summary on stderr, out of the way of the stacks
+    for name, entry in sorted(merged.items()):
+        shares = profiling.breakdown(entry['stacks'])
+        samples = sum(shares.values()) or 1
+
+        click.echo('%-24s %5d requests %8d samples  sql %3d%%  render %3d%%  python %3d%%' % (
+            name, entry['requests'], sum(shares.values()),
+            100 * shares['sql'] // samples, 100 * shares['render'] // samples,
+            100 * shares['python'] // samples), err=True)
+
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Bundle, minify, fingerprint and precompress static files into static/dist."""
+    manifest = assets.build(app.static_folder)
+
+    for name in assets.BUNDLES:
+        sizes = manifest[name]['sizes']
+        print('%-8s %-24s %8d B  gzip %7s  brotli %7s' % (
+            name, manifest[name]['file'], sizes[''],
+            sizes.get('.gz', '-'), sizes.get('.br', '-')))
+
+    print('Built %d files into %s.' % (len(manifest), os.path.join(app.static_folder, assets.DIST)))
+
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -803,17 +951,6 @@ def not_found_error(error):
 def server_error(error):
     return render_template('errors/500.html'), 500
 
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info('errors')
-
-
 #----------------------------------------------------------------------------#
 # Launch.
 #----------------------------------------------------------------------------#
@@ -0,0 +1,322 @@
+# pyright: reportGeneralTypeIssues=false
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+from flask import abort
+from flask import current_app
+from flask import request
+from flask import send_from_directory
+from flask import url_for
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+
+
+#----------------------------------------------------------------------------#
+# Static asset pipeline
+#
+# `flask build-assets` writes into static/dist/:
+#
+#   - each bundle below, concatenated and minified;
+#   - every other file under static/, copied;
+#
+# all named after a hash of their content (main.css -> main.3f9a1c2e.css),
+# with .gz and, when the brotli package is installed, .br variants of
+# whatever compresses. manifest.json maps logical names to built ones.
+# Served from /static/dist/ with the best encoding the client accepts and
+# an immutable, year-long Cache-Control: a changed file gets a new name.
+#
+# Templates link through asset_url('app.css'), which falls back to the
+# source files when ASSETS = 'source' or nothing has been built.
+#----------------------------------------------------------------------------#
+BUNDLES: Dict[str, List[str]] = {
+    'app.css': ['css/bootstrap.min.css',
+                'css/layout.main.css',
+                'css/main.css',
+                'css/main.responsive.css',
+                'css/main.quickfix.css'],
+    # Loaded in <head>, before the page renders
+    'head.js': ['js/libs/modernizr-2.8.2.min.js',
+                'js/libs/moment.min.js'],
+    # Deferred: runs after the page has been parsed, after jQuery
+    'app.js': ['js/libs/bootstrap-3.1.1.min.js',
+               'js/plugins.js',
+               'js/script.js'],
+}
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+
+# Worth compressing; images and woff fonts already are
+COMPRESSIBLE = ('.css', '.js', '.map', '.json', '.svg', '.txt', '.ttf', '.otf', '.eot', '.ico')
+
+# Far-future caching: safe because every built name embeds its content hash
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def fingerprinted(name: str, content: bytes) -> str:
+    """name with a hash of content before its extension."""
+
+    root, ext = posixpath.splitext(name)
+    return '%s.%s%s' % (root, hashlib.sha256(content).hexdigest()[:10], ext)
+
+
+def minify_css(css: str) -> str:
+    if rcssmin is not None:
+        return rcssmin.cssmin(css)
+
+    # Comments (keeping /*! licences), whitespace runs, and spaces around
+    # punctuation that never needs them
+    css = re.sub(r'/\*(?!!).*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+
+    return css.replace(';}', '}').strip()
+
+
+def minify_js(js: str) -> str:
+    # Without rjsmin, sources are left as they are: the libraries ship minified
+    return rjsmin.jsmin(js) if rjsmin is not None else js
+
+
+def rewrite_css_urls(css: str, source: str, resolve: Callable[[str], str]) -> str:
+    """Point the relative url()s of a stylesheet at resolve(static path)."""
+
+    directory = posixpath.dirname(source)
+
+    def replace(match):
+        url = match.group(2)
+
+        if re.match(r'^(?:[a-z]+:|/|#)', url):
+            return match.group(0)
+
+        path, suffix = re.match(r'^([^?#]*)(.*)$', url).groups()
+
+        return 'url("%s%s")' % (resolve(posixpath.normpath(posixpath.join(directory, path))),
+                                suffix)
+
+    return CSS_URL.sub(replace, css)
+
+
+def bundle(static: str, name: str, resolve: Callable[[str], str], minify: bool = True) -> bytes:
+    """Sources of a bundle read from static, joined and (optionally) minified."""
+
+    parts = []
+    for source in BUNDLES[name]:
+        with open(os.path.join(static, source), encoding='utf-8') as f:
+            text = f.read()
+
+        if name.endswith('.css'):
+            text = rewrite_css_urls(text, source, resolve)
+
+        parts.append(text)
+
+    if name.endswith('.css'):
+        text = '\n'.join(parts)
+        return (minify_css(text) if minify else text).encode()
+
+    # A lone ; keeps a source missing its last one from running into the next
+    text = '\n;\n'.join(parts)
+    return (minify_js(text) if minify else text).encode()
+
+
+#----------------------------------------------------------------------------#
+# Build
+#----------------------------------------------------------------------------#
+def write_variants(path: str, content: bytes) -> Dict[str, int]:
+    """Write a built file and its compressed variants; their sizes by suffix."""
+
+    with open(path, 'wb') as f:
+        f.write(content)
+
+    sizes = {'': len(content)}
+
+    if not path.endswith(COMPRESSIBLE):
+        return sizes
+
+    variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content, quality=11)
+
+    for suffix, compressed in variants.items():
+        # Not worth a variant unless it saves something
+        if len(compressed) < len(content) * 0.95:
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+            sizes[suffix] = len(compressed)
+
+    return sizes
+
+
+def build(static: str) -> Dict[str, Dict]:
+    """Fingerprint, bundle and precompress static/ into static/dist/.
+
+    Returns the manifest: logical name -> built name and sizes.
+    """
+
+    dist = os.path.join(static, DIST)
+    shutil.rmtree(dist, ignore_errors=True)
+    os.makedirs(dist)
+
+    manifest: Dict[str, Dict] = {}
+
+    # Single files first, so stylesheets can reference their built names
+    for directory, dirnames, filenames in os.walk(static):
+        dirnames[:] = sorted(d for d in dirnames if os.path.join(directory, d) != dist)
+
+        for filename in sorted(filenames):
+            if filename.startswith('.'):
+                continue
+
+            source = os.path.relpath(os.path.join(directory, filename), static).replace(os.sep, '/')
+
+            with open(os.path.join(static, source), 'rb') as f:
+                content = f.read()
+
+            built = fingerprinted(source, content)
+            os.makedirs(os.path.join(dist, posixpath.dirname(built)), exist_ok=True)
+
+            manifest[source] = {'file': built,
+                                'sizes': write_variants(os.path.join(dist, built), content)}
+
+    # Built stylesheets all sit at the top of dist/: link relative to it
+    def resolve(path: str) -> str:
+        return manifest[path]['file'] if path in manifest else '/static/' + path
+
+    for name in BUNDLES:
+        content = bundle(static, name, resolve)
+        built = fingerprinted(name, content)
+
+        manifest[name] = {'file': built,
+                          'sizes': write_variants(os.path.join(dist, built), content),
+                          'sources': BUNDLES[name]}
+
+    with open(os.path.join(dist, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+    return manifest
+
+
+def load_manifest(static: str) -> Optional[Dict[str, str]]:
+    """Logical name -> built name, or None if nothing has been built."""
+
+    try:
+        with open(os.path.join(static, DIST, MANIFEST)) as f:
+            return {name: entry['file'] for name, entry in json.load(f).items()}
+
+    except FileNotFoundError:
+        return None
+
+
+#----------------------------------------------------------------------------#
+# Serving
+#----------------------------------------------------------------------------#
+def asset_url(name: str) -> str:
+    """URL of a static file or bundle: its built version when there is one."""
+
+    manifest = current_app.extensions.get('assets')
+
+    if manifest is not None and name in manifest:
+        return url_for('built_asset', filename=manifest[name])
+
+    # Sources: a bundle is joined on request, unminified
+    if name in BUNDLES:
+        return url_for('source_bundle', name=name)
+
+    return url_for('static', filename=name)
+
+
+def built_asset(filename: str):
+    """A file of static/dist/, precompressed if the client accepts it."""
+
+    manifest = current_app.extensions.get('assets')
+
+    # Built names only, never the manifest or a compressed variant
+    if manifest is None or filename not in current_app.extensions['assets_files']:
+        abort(404)
+
+    dist = os.path.join(current_app.static_folder, DIST)
+    accepted = request.accept_encodings
+
+    path, encoding = filename, None
+    for suffix, name in (('.br', 'br'), ('.gz', 'gzip')):
+        if accepted[name] and os.path.exists(os.path.join(dist, filename + suffix)):
+            path, encoding = filename + suffix, name
+            break
+
+    response = send_from_directory(dist, path,
+                                   mimetype=mimetypes.guess_type(filename)[0],
+                                   download_name=posixpath.basename(filename),
+                                   etag=True,
+                                   max_age=31536000)
+
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.vary.add('Accept-Encoding')
+
+    return response
+
+
+def source_bundle(name: str):
+    """A bundle joined from its sources as they are now, for development."""
+
+    if name not in BUNDLES:
+        abort(404)
+
+    content = bundle(current_app.static_folder, name,
+                     lambda path: url_for('static', filename=path), minify=False)
+
+    response = current_app.response_class(content, mimetype=mimetypes.guess_type(name)[0])
+    response.headers['Cache-Control'] = 'no-cache'
+
+    return response
+
+
+def init_app(app):
+    """Serve built assets when they exist and ASSETS is 'built'; add asset_url()."""
+
+    manifest = None
+    if app.config.get('ASSETS', 'built') == 'built':
+        manifest = load_manifest(app.static_folder)
+
+    app.extensions['assets'] = manifest
+    app.extensions['assets_files'] = set(manifest.values()) if manifest else set()
+
+    # More specific than the static route, so it wins for /static/dist/
+    app.add_url_rule(app.static_url_path + '/' + DIST + '/<path:filename>',
+                     'built_asset', built_asset)
+    app.add_url_rule('/assets/<name>', 'source_bundle', source_bundle)
+
+    app.jinja_env.globals['asset_url'] = asset_url
@@ -0,0 +1,94 @@
+#----------------------------------------------------------------------------#
+# Datetime formatting benchmark: cost per show on a 10k-show page.
+#
+#   python benchmarks/bench_datetime.py --shows 10000
+#
+# Compares the filter as it used to be (str() in the route, dateutil parse
+# and babel pattern lookup per call) with the cached filter on datetimes
+# and with the batch formatter. No database needed.
+#----------------------------------------------------------------------------#
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime as dt
+from datetime import timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import babel.dates
+import dateutil.parser
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import List
+
+
+def legacy_format_datetime(value, format='medium'):
+    """The filter as it used to be, fed str(show.start)."""
+
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, locale='en')
+
+
+def starts(n: int, seed: int = 0) -> List[dt]:
+    """Show times the way listings have them: on the hour or half hour."""
+
+    rng = random.Random(seed)
+    now = dt.now().replace(minute=0, second=0, microsecond=0)
+
+    return [now + timedelta(days=rng.randint(-365, 365), minutes=30 * rng.randint(36, 46))
+            for _ in range(n)]
+
+
+def time_page(render, repeat: int) -> float:
+    """Median milliseconds to format one page."""
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return statistics.median(timings)
+
+
+#----------------------------------------------------------------------------#
+# Launch.
+#----------------------------------------------------------------------------#
+def main():
+    parser = argparse.ArgumentParser(description='Datetime formatting benchmark')
+    parser.add_argument('--shows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    import formatting
+
+    values = starts(args.shows)
+    strings = [str(v) for v in values]
+
+    # Same text either way
+    assert [legacy_format_datetime(s, 'full') for s in strings[:100]] == \
+        formatting.format_datetimes(values[:100], 'full')
+
+    paths = (
+        ('legacy parse + format', lambda: [legacy_format_datetime(s, 'full') for s in strings]),
+        ('cached filter', lambda: [formatting.format_datetime(v, 'full') for v in values]),
+        ('batch', lambda: formatting.format_datetimes(values, 'full')),
+    )
+
+    for name, render in paths:
+        ms = time_page(render, args.repeat)
+        print('%-22s %9.2f ms per page  %7.2f us per show' %
+              (name, ms, ms * 1000 / args.shows))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#----------------------------------------------------------------------------#
+# "Near" benchmark: geohash pruning against ranking every venue.
+#
+#   python benchmarks/bench_near.py --venues 200000
+#
+# Scatters venues around the generator's cities, sorts their geohashes as
+# the index on Contact.geohash would, then times searches both ways: the
+# covering cells read as ranges of the sorted list and their candidates
+# ranked, or every venue ranked. No database needed; reports how many
+# candidates each search had to rank, and whether numpy was used.
+#----------------------------------------------------------------------------#
+import argparse
+import bisect
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from generate import CITIES
+from generate import CITY_SPREAD
+import geo
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import List
+from typing import Tuple
+
+
+def pruned(index: List[Tuple], hashes: List[str], latitude: float, longitude: float,
+           radius: float) -> Tuple[List[Tuple], int]:
+    """Venues within radius through the covering cells; and the candidates ranked."""
+
+    candidates = []
+    for cell in geo.covering_cells(latitude, longitude, radius):
+        low = bisect.bisect_left(hashes, cell)
+        high = bisect.bisect_right(hashes, cell + 'z' * (geo.PRECISION - len(cell)))
+        candidates.extend(index[low:high])
+
+    return ranked(candidates, latitude, longitude, radius), len(candidates)
+
+
+def ranked(candidates: List[Tuple], latitude: float, longitude: float,
+           radius: float) -> List[Tuple]:
+    distances = geo.haversine_km(latitude, longitude,
+                                 [c[1] for c in candidates], [c[2] for c in candidates])
+
+    return sorted((d, c[3]) for d, c in zip(distances, candidates) if d <= radius)
+
+
+#----------------------------------------------------------------------------#
+# Launch.
+#----------------------------------------------------------------------------#
+def main():
+    parser = argparse.ArgumentParser(description='Venues near a point benchmark')
+    parser.add_argument('--venues', type=int, default=200000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    venues = []
+    for n in range(args.venues):
+        latitude, longitude = geo.locate(*rng.choice(CITIES))
+        latitude += rng.gauss(0, CITY_SPREAD)
+        longitude += rng.gauss(0, CITY_SPREAD) / math.cos(math.radians(latitude))
+        venues.append((geo.encode(latitude, longitude), latitude, longitude, n))
+
+    venues.sort()
+    hashes = [v[0] for v in venues]
+
+    print('%d venues, haversine with %s' % (args.venues, 'numpy' if geo.numpy else 'math'))
+
+    for radius in (1, 10, 50):
+        points = [geo.locate(*rng.choice(CITIES)) for _ in range(args.queries)]
+
+        timings = {'pruned': [], 'every venue': []}
+        examined = []
+
+        for latitude, longitude in points:
+            started = time.perf_counter()
+            near, candidates = pruned(venues, hashes, latitude, longitude, radius)
+            timings['pruned'].append(time.perf_counter() - started)
+            examined.append(candidates)
+
+            # A sample is enough for the slow path
+            if len(timings['every venue']) < 10:
+                started = time.perf_counter()
+                assert ranked(venues, latitude, longitude, radius) == near
+                timings['every venue'].append(time.perf_counter() - started)
+
+        for label, seconds in timings.items():
+            print('  %3d km  %-12s p50 %9.2f ms' % (radius, label, statistics.median(seconds) * 1000))
+
+        print('  %3d km  candidates   p50 %9d' % (radius, statistics.median(examined)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#----------------------------------------------------------------------------#
+# Search benchmark: indexed, ranked search vs. the legacy ilike path.
+#
+#   python benchmarks/bench_search.py \
+#       --database-url postgresql://postgres@localhost:5432/fyuur_bench
+#
+# The target database is filled with a synthetic catalog: never point this
+# at a database whose data you care about.
+#----------------------------------------------------------------------------#
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime as dt
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+#----------------------------------------------------------------------------#
+# Catalog
+#----------------------------------------------------------------------------#
+WORDS = ['Blue', 'Red', 'Moon', 'Sun', 'Velvet', 'Iron', 'Golden', 'Black',
+         'River', 'Garden', 'Hall', 'Room', 'Club', 'Lounge', 'Tavern', 'Band',
+         'Collective', 'Orchestra', 'Trio', 'Quartet', 'Kings', 'Queens']
+
+
+def seed(db, venues: int, artists: int, shows: int):
+    """Fill the catalog with generate_series so large sizes load quickly."""
+
+    words = 'ARRAY[' + ','.join("'%s'" % w for w in WORDS) + ']'
+    pick = words + '[1 + (random() * %d)::int %% %d]' % (len(WORDS), len(WORDS))
+
+    statements = [
+        'TRUNCATE "Show", "VenueGenre", "ArtistGenre", "FacetCount", "Venue", "Artist", "Contact" '
+        'RESTART IDENTITY CASCADE',
+
+        # One contact per venue and per artist, spread over a few hundred cities
+        '''INSERT INTO "Contact" (city, state, address, phone)
+           SELECT 'City ' || (random() * 300)::int,
+                  (ARRAY['CA','NY','TX','WA','IL','FL'])[1 + (random() * 5)::int],
+                  n || ' Main St', '555-0100'
+           FROM generate_series(1, %d) AS n''' % (venues + artists),
+
+        '''INSERT INTO "Venue" (name, contact_id)
+           SELECT %s || ' ' || %s || ' ' || n, n
+           FROM generate_series(1, %d) AS n''' % (pick, pick, venues),
+
+        '''INSERT INTO "Artist" (name, contact_id)
+           SELECT %s || ' ' || %s || ' ' || n, %d + n
+           FROM generate_series(1, %d) AS n''' % (pick, pick, venues, artists),
+
+        '''INSERT INTO "VenueGenre" (genre_id, venue_id)
+           SELECT g.id, v.id FROM "Venue" v JOIN "Genre" g ON g.name IN ('Jazz', 'Blues')''',
+
+        '''INSERT INTO "ArtistGenre" (genre_id, artist_id)
+           SELECT g.id, a.id FROM "Artist" a JOIN "Genre" g ON g.name IN ('Rock n Roll')''',
+
+        '''INSERT INTO "Show" (start, artist_id, venue_id)
+           SELECT now() + (random() * 730 - 365) * interval '1 day',
+                  1 + (random() * %d)::int, 1 + (random() * %d)::int
+           FROM generate_series(1, %d)''' % (artists - 1, venues - 1, shows),
+
+        'ANALYZE',
+    ]
+
+    for statement in statements:
+        db.session.execute(statement)
+
+    db.session.commit()
+
+
+#----------------------------------------------------------------------------#
+# Search paths
+#----------------------------------------------------------------------------#
+def legacy_search_venues(term: str):
+    """The search as it used to be: unindexed ilike plus a count per venue."""
+
+    from models import Show
+    from models import Venue
+
+    data = []
+
+    for venue in Venue.query.filter(Venue.name.ilike(f'%{term}%')).all():
+        upcoming = (Show.query.filter_by(venue_id=venue.id)
+                    .filter(Show.start > dt.now())
+                    .count())
+        data.append({'id': venue.id, 'name': venue.name, 'upcoming': upcoming})
+
+    return data
+
+
+def time_search(search, terms, repeat: int):
+    """Latencies in milliseconds of search over every term, repeat times."""
+
+    timings = []
+
+    for _ in range(repeat):
+        for term in terms:
+            started = time.perf_counter()
+            search(term)
+            timings.append((time.perf_counter() - started) * 1000)
+
+    return timings
+
+
+def summary(timings):
+    timings = sorted(timings)
+    return {
+        'p50': statistics.median(timings),
+        'p95': timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+#----------------------------------------------------------------------------#
+# Launch.
+#----------------------------------------------------------------------------#
+def main():
+    parser = argparse.ArgumentParser(description='Search latency benchmark')
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--venues', type=int, default=100000)
+    parser.add_argument('--artists', type=int, default=100000)
+    parser.add_argument('--shows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--no-seed', action='store_true')
+    args = parser.parse_args()
+
+    # Point the app at the benchmark database before anything binds to it
+    import config
+    config.SQLALCHEMY_DATABASE_URI = args.database_url
+
+    import queries
+    from app import app
+    from models import db
+
+    terms = ['blue', 'moon hall', 'jazz', 'city 42', 'ca', 'quartet 9']
+
+    with app.app_context():
+
+        if not args.no_seed:
+            seed(db, args.venues, args.artists, args.shows)
+
+        for name, search in (('legacy ilike', legacy_search_venues),
+                             ('ranked trigram', queries.search_venues)):
+            result = summary(time_search(search, terms, args.repeat))
+            print('%-16s p50 %8.2f ms   p95 %8.2f ms' %
+                  (name, result['p50'], result['p95']))
+
+
+if __name__ == '__main__':
+    main()
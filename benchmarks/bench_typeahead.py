@@ -0,0 +1,100 @@
+#----------------------------------------------------------------------------#
+# Typeahead benchmark: the in-memory name index at catalog scale.
+#
+#   python benchmarks/bench_typeahead.py --names 100000
+#
+# Builds a PrefixIndex over generated names, then times searches for
+# prefixes of one to eight characters, renames and inserts. No database
+# needed; the target is well under a millisecond per search.
+#----------------------------------------------------------------------------#
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from generate import name
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Callable
+from typing import List
+
+
+def timings_us(fn: Callable, args: List) -> List[float]:
+    """Microseconds per call of fn over args."""
+
+    timings = []
+    for arg in args:
+        started = time.perf_counter()
+        fn(*arg)
+        timings.append((time.perf_counter() - started) * 1e6)
+
+    return timings
+
+
+def report(label: str, timings: List[float]):
+    timings = sorted(timings)
+    print('  %-22s p50 %7.1f us  p99 %7.1f us  max %8.1f us' % (
+        label, statistics.median(timings), timings[int(len(timings) * 0.99)], timings[-1]))
+
+
+#----------------------------------------------------------------------------#
+# Launch.
+#----------------------------------------------------------------------------#
+def main():
+    parser = argparse.ArgumentParser(description='Typeahead index benchmark')
+    parser.add_argument('--names', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from typeahead import PrefixIndex
+
+    rng = random.Random(args.seed)
+    names = [(n, name(rng, n)) for n in range(1, args.names + 1)]
+
+    started = time.perf_counter()
+    index = PrefixIndex(names)
+    built = time.perf_counter() - started
+
+    # Measured apart: tracing slows the build down several times
+    tracemalloc.start()
+    traced = PrefixIndex(names)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del traced
+
+    print('%d names: built in %.0f ms, %.1f MiB, %d + %d keys' % (
+        args.names, built * 1000, memory / 2 ** 20, len(index.starts), len(index.words)))
+
+    # What people type: the start of a name or of one of its words
+    prefixes = []
+    for _ in range(args.queries):
+        _, text = rng.choice(names)
+        word = rng.choice([0] + [i + 1 for i, c in enumerate(text) if c == ' '])
+        prefixes.append((text[word:word + rng.randint(1, 8)], 10))
+
+    for length in (1, 2, 4, 8):
+        report('search, %d char%s' % (length, '' if length == 1 else 's'),
+               timings_us(index.search, [p for p in prefixes if len(p[0]) == length] or prefixes))
+
+    report('search, all', timings_us(index.search, prefixes))
+
+    # Every prefix comes from a name in the index
+    assert all(index.search(*p) for p in prefixes)
+
+    # Incremental upkeep, as after a create or edit commit
+    renames = [(rng.randint(1, args.names), name(rng, args.names + n)) for n in range(1000)]
+    report('rename', timings_us(index.add, renames))
+    report('insert', timings_us(index.add, [(args.names + n, name(rng, args.names + n))
+                                            for n in range(1, 1001)]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#----------------------------------------------------------------------------#
+# Write benchmark: venues and artists saved per second, by write path.
+#
+#   python benchmarks/bench_writes.py \
+#       --database-url postgresql://postgres@localhost:5432/fyuur_bench
+#
+# Compares the handlers' former path (commit the contact, then commit the
+# venue or artist, one genre lookup per genre) with writes.UnitOfWork, one
+# entity per commit and in batches. The target database is dropped and
+# recreated: never point this at one whose data you care about.
+#----------------------------------------------------------------------------#
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from generate import reset
+from harness import artist_form
+from harness import venue_form
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Callable
+from typing import Dict
+from typing import List
+
+
+#----------------------------------------------------------------------------#
+# Write paths
+#----------------------------------------------------------------------------#
+def legacy_save(model, fields: Dict):
+    """A create handler as it used to be: two transactions per entity."""
+
+    from models import db
+    from models import Contact
+
+    contact = Contact(city=fields['city'],
+                      state=fields['state'],
+                      address=fields.get('address'),
+                      phone=fields['phone'],
+                      image_link=fields['image_link'],
+                      facebook_link=fields['facebook_link'],
+                      website_link=fields['website_link'])
+
+    db.session.add(contact)
+    db.session.commit()
+
+    db.session.add(model(name=fields['name'], genres=fields['genres'], contact_id=contact.id))
+    db.session.commit()
+
+
+def unit_of_work_save(model, fields: Dict):
+    import writes
+
+    with writes.UnitOfWork() as uow:
+        uow.save(model, fields)
+
+
+def unit_of_work_batch(model, rows: List[Dict]):
+    import writes
+
+    with writes.UnitOfWork() as uow:
+        uow.save_all(model, rows)
+
+
+def run(save: Callable, rows: List, counter: Dict) -> Dict:
+    """Time save(model, row) over rows, alternating venues and artists.
+
+    Starts from empty tables, so every path writes into the same catalog.
+    """
+
+    from models import db
+    from models import Artist
+    from models import Venue
+
+    reset(db)
+
+    counter['statements'] = 0
+    started = time.perf_counter()
+
+    for n, row in enumerate(rows):
+        save(Artist if n % 2 else Venue, row)
+        db.session.remove()
+
+    seconds = time.perf_counter() - started
+    return {'seconds': seconds, 'statements': counter['statements']}
+
+
+#----------------------------------------------------------------------------#
+# Launch.
+#----------------------------------------------------------------------------#
+def main():
+    parser = argparse.ArgumentParser(description='Write throughput benchmark')
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--entities', type=int, default=2000)
+    parser.add_argument('--batch', type=int, default=100)
+    args = parser.parse_args()
+
+    # Point the app at the benchmark database before anything binds to it
+    import config
+    config.SQLALCHEMY_DATABASE_URI = args.database_url
+    config.CACHE_BACKEND = None
+
+    from app import app
+    from models import db
+    from sqlalchemy import event
+
+    def forms(offset: int) -> List[Dict]:
+        return [(artist_form if n % 2 else venue_form)(offset + n) for n in range(args.entities)]
+
+    with app.app_context():
+        counter = {'statements': 0}
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count(*args):
+            counter['statements'] += 1
+
+        batches = forms(0)
+        batches = [batches[i:i + args.batch] for i in range(0, len(batches), args.batch)]
+
+        results = [
+            ('legacy, two commits', args.entities, run(legacy_save, forms(0), counter)),
+            ('unit of work', args.entities, run(unit_of_work_save, forms(0), counter)),
+            # Alternately a batch of venues and one of artists
+            ('unit of work, batch %d' % args.batch, args.entities,
+             run(unit_of_work_batch, batches, counter)),
+        ]
+
+        for label, entities, result in results:
+            print('%-24s %8.0f writes/s  %6.2f statements per entity' % (
+                label, entities / result['seconds'], result['statements'] / entities))
+
+
+if __name__ == '__main__':
+    main()
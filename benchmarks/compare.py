@@ -0,0 +1,55 @@
+#----------------------------------------------------------------------------#
+# Diff two harness reports, route by route.
+#
+#   python benchmarks/compare.py benchmarks/results/abc123.json \
+#                                benchmarks/results/def456.json
+#
+# Exits non-zero when a route got slower than --threshold or issues more
+# SQL statements than before, so it can gate a merge.
+#----------------------------------------------------------------------------#
+import argparse
+import json
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare benchmark reports')
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed relative p95 slowdown (default 20%%)')
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    regressions = 0
+
+    print('%s -> %s' % (before['revision'], after['revision']))
+
+    for size in sorted(set(before['sizes']) & set(after['sizes']), key=int):
+        print('size %s' % size)
+
+        old_routes = before['sizes'][size]['routes']
+        new_routes = after['sizes'][size]['routes']
+
+        for endpoint in sorted(set(old_routes) & set(new_routes)):
+            old, new = old_routes[endpoint], new_routes[endpoint]
+
+            slower = new['p95_ms'] > old['p95_ms'] * (1 + args.threshold)
+            chattier = new['statements'] > old['statements']
+            flag = ' <-- regression' if slower or chattier else ''
+            regressions += bool(flag)
+
+            print('  %-26s p95 %9.2f -> %9.2f ms  stmts %4d -> %4d  mem %9.1f -> %9.1f KiB%s' %
+                  (endpoint, old['p95_ms'], new['p95_ms'],
+                   old['statements'], new['statements'],
+                   old['peak_memory_kb'], new['peak_memory_kb'], flag))
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
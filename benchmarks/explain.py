@@ -0,0 +1,178 @@
+#----------------------------------------------------------------------------#
+# Plan check: no route may sequentially scan a large table.
+#
+#   python benchmarks/explain.py \
+#       --database-url postgresql://postgres@localhost:5432/fyuur_bench --size 10000
+#
+# Every route is requested once against a generated catalog of the given
+# size; each SELECT, UPDATE and DELETE it issued is then EXPLAINed, and any
+# Seq Scan on a table above --min-rows rows is reported. Exits 1 if one is
+# found, so it can gate a deploy. The target database is dropped and
+# recreated: never point this at one whose data you care about.
+#----------------------------------------------------------------------------#
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from generate import generate
+from generate import reset
+from harness import IMPORT_TOKEN
+from harness import requests_for
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Set
+from typing import Tuple
+
+
+EXPLAINED = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+
+class StatementLog:
+    """Statements and parameters sent through an engine while recording."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.statements: List[Tuple[str, object]] = []
+        event.listen(engine, 'before_cursor_execute', self.on_execute)
+
+    def on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(EXPLAINED):
+            self.statements.append((statement, parameters))
+
+
+def seq_scans(plan: Dict) -> Iterator[str]:
+    """Relations scanned sequentially anywhere in a JSON plan tree."""
+
+    if plan.get('Node Type') == 'Seq Scan':
+        yield plan['Relation Name']
+
+    for child in plan.get('Plans', []):
+        yield from seq_scans(child)
+
+
+def explain(db, statement: str, parameters) -> Dict:
+    """The planner's JSON plan for a statement, without running it."""
+
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + statement, parameters)
+        plan = cursor.fetchone()[0]
+    finally:
+        connection.close()
+
+    # psycopg2 decodes json columns; be lenient with other drivers
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return plan[0]['Plan']
+
+
+def scanned_tables(app, db, catalog: Dict[str, int], min_rows: int) -> Dict[str, Set[str]]:
+    """Tables of min_rows or more each route scans sequentially, by endpoint.
+
+    Every route is requested once against the generated catalog; each
+    statement it sent is then EXPLAINed.
+    """
+
+    rows = dict(db.session.execute(
+        "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'").fetchall())
+    db.session.remove()
+
+    log = StatementLog(db.engine)
+    builders = requests_for(catalog)
+    client = app.test_client()
+
+    scans: Dict[str, Set[str]] = {}
+
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if rule.endpoint == 'static' or rule.endpoint not in builders:
+            continue
+
+        if rule.endpoint in scans:
+            continue
+
+        log.statements = []
+        method, path, data, *headers = builders[rule.endpoint](0)
+        client.open(path, method=method, data=data,
+                    headers=headers[0] if headers else None)
+        db.session.remove()
+
+        scanned = set()
+        for statement, parameters in log.statements:
+            for relation in seq_scans(explain(db, statement, parameters)):
+                if rows.get(relation, 0) >= min_rows:
+                    scanned.add(relation)
+
+        scans[rule.endpoint] = scanned
+
+    return scans
+
+
+def prepare(db, size: int, seed: int = 0) -> Dict[str, int]:
+    """A fresh catalog of size, its counters and read models built and analyzed."""
+
+    import counters
+
+    reset(db)
+    catalog = generate(db, size, seed=seed)
+    counters.rebuild_show_counters()
+    counters.rebuild_facet_counts()
+    counters.rebuild_show_cards()
+    db.session.execute('ANALYZE')
+    db.session.commit()
+
+    return catalog
+
+
+#----------------------------------------------------------------------------#
+# Launch.
+#----------------------------------------------------------------------------#
+def main():
+    parser = argparse.ArgumentParser(description='Fail on sequential scans')
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--size', type=int, default=10000)
+    parser.add_argument('--min-rows', type=int, default=1000,
+                        help='tables smaller than this may be scanned')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if not args.database_url.startswith('postgresql'):
+        parser.error('plans are only checked on PostgreSQL')
+
+    # Point the app at the benchmark database before anything binds to it
+    import config
+    config.SQLALCHEMY_DATABASE_URI = args.database_url
+    config.WTF_CSRF_ENABLED = False
+    config.DEBUG = False
+    config.CACHE_BACKEND = None
+    config.IMPORT_TOKEN = IMPORT_TOKEN
+
+    from app import app
+    from models import db
+
+    with app.app_context():
+        catalog = prepare(db, args.size, args.seed)
+
+        print('size %d (%s)' % (args.size, ', '.join('%d %s' % (v, k) for k, v in catalog.items())))
+
+        scans = scanned_tables(app, db, catalog, args.min_rows)
+
+    for endpoint, scanned in sorted(scans.items()):
+        print('  %-26s %s' % (endpoint, 'SEQ SCAN ' + ', '.join(sorted(scanned))
+                                        if scanned else 'ok'))
+
+    sys.exit(1 if any(scans.values()) else 0)
+
+
+if __name__ == '__main__':
+    main()
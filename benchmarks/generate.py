@@ -0,0 +1,203 @@
+#----------------------------------------------------------------------------#
+# Seeded synthetic catalog: contacts, venues, artists and shows.
+#
+# Popularity is skewed the way real listings are: a few cities, genres,
+# venues and artists account for most of the shows (Zipf-like weights), and
+# show dates cluster around the present. Contacts are scattered around
+# their city's centre, from their own generator so positions leave the
+# rest of the catalog as it was. No two shows of a venue or of an
+# artist overlap; draws that would are redrawn, which caps the busiest
+# venues and artists. The same seed always produces the same catalog.
+#----------------------------------------------------------------------------#
+import math
+import random
+from datetime import datetime as dt
+from datetime import timedelta
+from itertools import accumulate
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Dict
+from typing import List
+
+
+CITIES = [
+    ('New York', 'NY'), ('Los Angeles', 'CA'), ('Chicago', 'IL'),
+    ('Austin', 'TX'), ('Nashville', 'TN'), ('San Francisco', 'CA'),
+    ('Seattle', 'WA'), ('New Orleans', 'LA'), ('Atlanta', 'GA'),
+    ('Denver', 'CO'), ('Portland', 'OR'), ('Boston', 'MA'),
+    ('Philadelphia', 'PA'), ('Detroit', 'MI'), ('Minneapolis', 'MN'),
+    ('Miami', 'FL'), ('Kansas City', 'MO'), ('Memphis', 'TN'),
+    ('Salt Lake City', 'UT'), ('Albuquerque', 'NM'), ('Omaha', 'NE'),
+    ('Boise', 'ID'), ('Burlington', 'VT'), ('Charleston', 'SC'),
+]
+
+GENRES = ['Rock n Roll', 'Pop', 'Hip-Hop', 'Jazz', 'Electronic', 'R&B',
+          'Alternative', 'Country', 'Blues', 'Folk', 'Punk', 'Soul', 'Funk',
+          'Reggae', 'Heavy Metal', 'Classical', 'Instrumental',
+          'Musical Theatre', 'Other']
+
+FIRST = ['The', 'Blue', 'Red', 'Velvet', 'Iron', 'Golden', 'Black', 'Silver',
+         'Electric', 'Midnight', 'Crimson', 'Wild', 'Lonely', 'Neon']
+SECOND = ['Moon', 'River', 'Garden', 'Hall', 'Room', 'Club', 'Lounge',
+          'Tavern', 'Kings', 'Queens', 'Wolves', 'Echoes', 'Saints', 'Union']
+
+# Rows per INSERT batch
+CHUNK = 5000
+
+# Spread of contacts around their city's centre, in degrees of latitude
+CITY_SPREAD = 0.08
+
+# Show lengths, in minutes
+DURATIONS = (60, 90, 120, 150, 180)
+
+
+def zipf_weights(n: int, s: float = 1.1) -> List[float]:
+    """Cumulative weights where the k-th item is drawn ~ 1 / k**s."""
+
+    return list(accumulate(1 / (k ** s) for k in range(1, n + 1)))
+
+
+def sizes_for(size: int) -> Dict[str, int]:
+    """Catalog proportions for a nominal size (number of venues)."""
+
+    return {'venues': size, 'artists': size * 2, 'shows': size * 10}
+
+
+def name(rng: random.Random, n: int) -> str:
+    return '%s %s %d' % (rng.choice(FIRST), rng.choice(SECOND), n)
+
+
+def generate(db, size: int, seed: int = 0, now: dt = None) -> Dict[str, int]:
+    """Fill an empty schema with a catalog of the given nominal size."""
+
+    from bookings import Bookings
+    import geo
+    from models import Artist
+    from models import Contact
+    from models import Genre
+    from models import Venue
+    from models import Show
+    from models import artist_genres
+    from models import venue_genres
+
+    rng = random.Random(seed)
+    spread = random.Random(seed)
+    now = now or dt.now()
+    counts = sizes_for(size)
+
+    city_weights = zipf_weights(len(CITIES))
+    genre_weights = zipf_weights(len(GENRES))
+
+    def genres() -> List[str]:
+        return sorted(set(rng.choices(GENRES, cum_weights=genre_weights,
+                                      k=rng.randint(1, 3))))
+
+    genre_ids = dict(db.session.query(Genre.name, Genre.id))
+
+    contacts: List[Dict] = []
+    venues: List[Dict] = []
+    artists: List[Dict] = []
+    links: Dict[str, List[Dict]] = {'venues': [], 'artists': []}
+
+    for kind, rows in (('venues', venues), ('artists', artists)):
+        for n in range(1, counts[kind] + 1):
+            city, state = rng.choices(CITIES, cum_weights=city_weights)[0]
+            contact_id = len(contacts) + 1
+
+            latitude, longitude = geo.locate(city, state)
+            latitude += spread.gauss(0, CITY_SPREAD)
+            longitude += spread.gauss(0, CITY_SPREAD) / math.cos(math.radians(latitude))
+
+            contacts.append({
+                'id': contact_id,
+                'city': city,
+                'state': state,
+                'address': '%d %s St' % (rng.randint(1, 9999), rng.choice(SECOND)),
+                'phone': '555-%03d-%04d' % (rng.randint(0, 999), rng.randint(0, 9999)),
+                'image_link': 'https://example.com/img/%s/%d.jpg' % (kind, n),
+                'facebook_link': 'https://www.facebook.com/%s%d' % (kind, n),
+                'website_link': 'https://example.com/%s/%d' % (kind, n),
+                'latitude': latitude,
+                'longitude': longitude,
+                'geohash': geo.encode(latitude, longitude),
+            })
+            rows.append({
+                'id': n,
+                'name': name(rng, n),
+                'contact_id': contact_id,
+            })
+            links[kind].extend({'genre_id': genre_ids[genre], kind[:-1] + '_id': n}
+                               for genre in genres())
+
+    # Popular venues and artists host most shows; dates cluster around now
+    venue_weights = zipf_weights(counts['venues'])
+    artist_weights = zipf_weights(counts['artists'])
+    venue_ids = list(range(1, counts['venues'] + 1))
+    artist_ids = list(range(1, counts['artists'] + 1))
+    rng.shuffle(venue_ids)
+    rng.shuffle(artist_ids)
+
+    venue_bookings = Bookings()
+    artist_bookings = Bookings()
+
+    shows: List[Dict] = []
+    while len(shows) < counts['shows']:
+        days = max(-720.0, min(720.0, rng.gauss(0, 120)))
+        venue_id = rng.choices(venue_ids, cum_weights=venue_weights)[0]
+        artist_id = rng.choices(artist_ids, cum_weights=artist_weights)[0]
+        start = (now + timedelta(days=days)).replace(second=0, microsecond=0)
+        end = start + timedelta(minutes=rng.choice(DURATIONS))
+
+        if (venue_bookings.overlapping(venue_id, start, end)
+                or artist_bookings.overlapping(artist_id, start, end)):
+            continue
+
+        venue_bookings.add(venue_id, start, end)
+        artist_bookings.add(artist_id, start, end)
+
+        shows.append({
+            'id': len(shows) + 1,
+            'venue_id': venue_id,
+            'artist_id': artist_id,
+            'start': start,
+            'end': end,
+        })
+
+    for table, rows in ((Contact.__table__, contacts), (Venue.__table__, venues),
+                        (Artist.__table__, artists), (Show.__table__, shows),
+                        (venue_genres, links['venues']), (artist_genres, links['artists'])):
+        insert(db, table, rows)
+
+    db.session.commit()
+
+    return {
+        'contacts': len(contacts),
+        'venues': len(venues),
+        'artists': len(artists),
+        'shows': len(shows),
+        'genre_links': len(links['venues']) + len(links['artists']),
+    }
+
+
+def insert(db, table, rows: List[Dict]):
+    """Bulk insert with explicit ids, then move the id sequence past them."""
+
+    for start in range(0, len(rows), CHUNK):
+        db.session.execute(table.insert(), rows[start:start + CHUNK])
+
+    if rows and 'id' in table.c and db.engine.dialect.name == 'postgresql':
+        db.session.execute(
+            "SELECT setval(pg_get_serial_sequence('\"%s\"', 'id'), %d)"
+            % (table.name, len(rows)))
+
+
+def reset(db):
+    """Drop and recreate every table of the application's schema."""
+
+    db.session.remove()
+
+    # The primary only: replicas get their schema by replication
+    db.drop_all(bind=None)
+    db.create_all(bind=None)
@@ -0,0 +1,330 @@
+#----------------------------------------------------------------------------#
+# Route benchmark: latency, SQL statements and peak memory per route.
+#
+#   python benchmarks/harness.py \
+#       --database-url postgresql://postgres@localhost:5432/fyuur_bench \
+#       --sizes 100 1000 10000 --output benchmarks/results/$(git rev-parse --short HEAD).json
+#
+# Every route registered on the app is driven through the Flask test client
+# against a freshly generated catalog of each size. The target database is
+# dropped and recreated: never point this at one whose data you care about.
+#----------------------------------------------------------------------------#
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime as dt
+from datetime import timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from generate import generate
+from generate import reset
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Dict
+from typing import List
+
+
+#----------------------------------------------------------------------------#
+# Requests
+#----------------------------------------------------------------------------#
+def venue_form(n: int) -> Dict:
+    return {
+        'name': 'Benchmark Venue %d' % n,
+        'city': 'Austin',
+        'state': 'TX',
+        'address': '%d Congress Ave' % n,
+        'phone': '555-000-0000',
+        'genres': ['Jazz', 'Blues'],
+        'website_link': 'https://example.com',
+        'image_link': 'https://example.com/venue.jpg',
+        'facebook_link': 'https://www.facebook.com/venue',
+    }
+
+
+def artist_form(n: int) -> Dict:
+    return {
+        'name': 'Benchmark Artist %d' % n,
+        'city': 'Austin',
+        'state': 'TX',
+        'phone': '555-000-0000',
+        'genres': ['Rock n Roll'],
+        'website_link': 'https://example.com',
+        'image_link': 'https://example.com/artist.jpg',
+        'facebook_link': 'https://www.facebook.com/artist',
+    }
+
+
+IMPORT_TOKEN = 'benchmark'
+
+# Shows per bulk import request
+IMPORT_ROWS = 1000
+
+# Venues or artists per batch submission
+BATCH_ROWS = 100
+
+
+# Imported and created shows book their own two-hour slots from here on,
+# after every generated show, so no request is rejected as a conflict
+BOOKED_FROM = dt(2031, 1, 1, 20, 0)
+
+
+def batch_body(n: int) -> str:
+    """A JSON array of BATCH_ROWS new venues (even n) or artists (odd n)."""
+
+    form = artist_form if n % 2 else venue_form
+    return json.dumps([form(n * BATCH_ROWS + i) for i in range(BATCH_ROWS)])
+
+
+def import_body(n: int, artists: int, venues: int) -> str:
+    """A CSV of shows spread over the catalog, each in a slot of its own."""
+
+    lines = ['start,duration,artist_id,venue_id']
+    for k in range(IMPORT_ROWS):
+        start = BOOKED_FROM + timedelta(hours=2 * (n * IMPORT_ROWS + k))
+        lines.append('%s,120,%d,%d' % (start.strftime('%Y-%m-%d %H:%M'),
+                                       1 + (n * IMPORT_ROWS + k) % artists,
+                                       1 + (n * 31 + k) % venues))
+
+    return '\n'.join(lines) + '\n'
+
+
+def requests_for(catalog: Dict[str, int]) -> Dict[str, object]:
+    """One request builder per endpoint: n -> (method, path, data[, headers])."""
+
+    import queries
+
+    venues = catalog['venues']
+    artists = catalog['artists']
+
+    # Spread detail lookups over the catalog, popular and obscure alike
+    venue = lambda n: 1 + (n * 7919) % venues
+    artist = lambda n: 1 + (n * 7919) % artists
+
+    # Later listing pages: names past 'M', shows starting from now on
+    after = queries.encode_cursor('M', 0)
+    after_now = queries.encode_cursor(dt.now().replace(microsecond=0), 0)
+
+    # The coming week in one state
+    window = '?from=%s&to=%s&state=CA' % (dt.now().date(), dt.now().date() + timedelta(days=7))
+
+    return {
+        'index': lambda n: ('GET', '/', None),
+        'metrics': lambda n: ('GET', '/metrics', None),
+        'venues': lambda n: ('GET', '/venues' + ['', '?after=' + after, '?genre=Jazz&state=CA'][n % 3], None),
+        'search_venues': lambda n: ('POST', '/venues/search', {'search_term': ['hall', 'blue', 'jazz', 'austin'][n % 4]}),
+        'show_venue': lambda n: ('GET', '/venues/%d' % venue(n), None),
+        'venue_calendar': lambda n: ('GET', '/venues/%d.ics' % venue(n), None),
+        'create_venue_form': lambda n: ('GET', '/venues/create', None),
+        'create_venue_submission': lambda n: ('POST', '/venues/create', venue_form(n)),
+        'delete_venue': lambda n: ('DELETE', '/venues/%d' % (venues + 1 + n), None),
+        'artists': lambda n: ('GET', '/artists' + ['', '?after=' + after, '?genre=Rock n Roll&state=NY'][n % 3], None),
+        'search_artists': lambda n: ('POST', '/artists/search', {'search_term': ['moon', 'the', 'wolves', 'ca'][n % 4]}),
+        'show_artist': lambda n: ('GET', '/artists/%d' % artist(n), None),
+        'artist_calendar': lambda n: ('GET', '/artists/%d.ics' % artist(n), None),
+        'edit_artist': lambda n: ('GET', '/artists/%d/edit' % artist(n), None),
+        'edit_artist_submission': lambda n: ('POST', '/artists/%d/edit' % artist(n), artist_form(n)),
+        'edit_venue': lambda n: ('GET', '/venues/%d/edit' % venue(n), None),
+        'edit_venue_submission': lambda n: ('POST', '/venues/%d/edit' % venue(n), venue_form(n)),
+        'create_artist_form': lambda n: ('GET', '/artists/create', None),
+        'create_artist_submission': lambda n: ('POST', '/artists/create', artist_form(n)),
+        'shows': lambda n: ('GET', '/shows' + ['', '?after=' + after_now, window][n % 3], None),
+        'import_catalog': lambda n: ('POST', '/import/shows', import_body(n, artists, venues), {
+            'Authorization': 'Bearer ' + IMPORT_TOKEN,
+            'Content-Type': 'text/csv',
+        }),
+        'create_shows': lambda n: ('GET', '/shows/create', None),
+        'batch_submission': lambda n: ('POST', '/batch/' + ('artists' if n % 2 else 'venues'), batch_body(n), {
+            'Authorization': 'Bearer ' + IMPORT_TOKEN,
+            'Content-Type': 'application/json',
+        }),
+
+        # JSON API: odd requests stream the whole collection
+        'api.venues': lambda n: ('GET', '/api/v1/venues' + ('?all=1' if n % 2 else ''), None),
+        'api.search_venues': lambda n: ('GET', '/api/v1/venues/search?q=' + ['hall', 'blue', 'jazz', 'austin'][n % 4], None),
+        'api.venue_facets': lambda n: ('GET', '/api/v1/venues/facets' + ('?genre=Jazz' if n % 2 else ''), None),
+        'api.venue': lambda n: ('GET', '/api/v1/venues/%d' % venue(n), None),
+        'api.venue_typeahead': lambda n: ('GET', '/api/v1/venues/typeahead?q=' + ['bl', 'the m', 'silver', 'neon lo'][n % 4], None),
+        # Downtown New York, Austin and Boise, and the middle of Nebraska
+        'api.venues_near': lambda n: ('GET', '/api/v1/venues/near?' + [
+            'lat=40.7128&lon=-74.0060', 'lat=30.2672&lon=-97.7431&radius=25',
+            'lat=43.6150&lon=-116.2023&radius=5', 'lat=41.5&lon=-99.9&radius=100'][n % 4], None),
+        'api.artists': lambda n: ('GET', '/api/v1/artists' + ('?all=1&format=ndjson' if n % 2 else ''), None),
+        'api.search_artists': lambda n: ('GET', '/api/v1/artists/search?q=' + ['moon', 'the', 'wolves', 'ca'][n % 4], None),
+        'api.artist_facets': lambda n: ('GET', '/api/v1/artists/facets' + ('?state=CA' if n % 2 else ''), None),
+        'api.artist': lambda n: ('GET', '/api/v1/artists/%d' % artist(n), None),
+        'api.artist_typeahead': lambda n: ('GET', '/api/v1/artists/typeahead?q=' + ['mo', 'red r', 'iron', 'wild wo'][n % 4], None),
+        'api.shows': lambda n: ('GET', '/api/v1/shows' + ['?all=1&format=ndjson', '?after=' + after_now, window][n % 3], None),
+        'create_show_submission': lambda n: ('POST', '/shows/create', {
+            'artist_id': str(artist(n)),
+            'venue_id': str(venue(n)),
+            'start_time': (BOOKED_FROM - timedelta(hours=2 * (n + 1))).strftime('%Y-%m-%d %H:%M'),
+            'duration': '120',
+        }),
+    }
+
+
+#----------------------------------------------------------------------------#
+# Measurement
+#----------------------------------------------------------------------------#
+class StatementCounter:
+    """Counts statements sent through an engine while enabled."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self.on_execute)
+
+    def on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p * (len(values) - 1))))]
+
+
+def measure(client, counter, build, iterations: int) -> Dict:
+    """Drive one endpoint: timings, statements, then peak memory per request."""
+
+    timings = []
+    statements = []
+    statuses = set()
+
+    for n in range(iterations):
+        method, path, data, *headers = build(n)
+
+        counter.count = 0
+        started = time.perf_counter()
+        response = client.open(path, method=method, data=data,
+                               headers=headers[0] if headers else None)
+        timings.append((time.perf_counter() - started) * 1000)
+        statements.append(counter.count)
+        statuses.add(response.status_code)
+
+    # Tracing slows Python down: keep it out of the latency numbers
+    peaks = []
+    tracemalloc.start()
+    for n in range(min(iterations, 3)):
+        method, path, data, *headers = build(iterations + n)
+        tracemalloc.reset_peak()
+        client.open(path, method=method, data=data,
+                    headers=headers[0] if headers else None)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    return {
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'statements': max(statements),
+        'peak_memory_kb': round(max(peaks) / 1024, 1),
+        'status': sorted(statuses),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(__file__),
+                                       text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+#----------------------------------------------------------------------------#
+# Launch.
+#----------------------------------------------------------------------------#
+def main():
+    parser = argparse.ArgumentParser(description='Route latency benchmark')
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cache', action='store_true',
+                        help='keep the page cache on (measures cache hits)')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    # Point the app at the benchmark database before anything binds to it
+    import config
+    config.SQLALCHEMY_DATABASE_URI = args.database_url
+    config.WTF_CSRF_ENABLED = False
+    config.DEBUG = False
+    config.IMPORT_TOKEN = IMPORT_TOKEN
+    if not args.cache:
+        config.CACHE_BACKEND = None
+
+    import counters
+    from app import app
+    from models import db
+
+    report = {
+        'revision': git_revision(),
+        'created': dt.now().isoformat(timespec='seconds'),
+        'iterations': args.iterations,
+        'seed': args.seed,
+        'sizes': {},
+    }
+
+    with app.app_context():
+        counter = StatementCounter(db.engine)
+
+        for size in args.sizes:
+            reset(db)
+            catalog = generate(db, size, seed=args.seed)
+            counters.rebuild_show_counters()
+            counters.rebuild_facet_counts()
+            counters.rebuild_show_cards()
+
+            # Venues past the catalog, without shows, for the DELETE route
+            for n in range(args.iterations + 3):
+                db.session.execute(
+                    db.text('INSERT INTO "Venue" (name, contact_id) VALUES (:name, 1)'),
+                    {'name': 'Doomed Venue %d' % n})
+            db.session.commit()
+
+            builders = requests_for(catalog)
+            client = app.test_client()
+            results = {}
+
+            for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+                if rule.endpoint == 'static':
+                    continue
+
+                if rule.endpoint not in builders:
+                    print('warning: no benchmark request for %s' % rule.endpoint,
+                          file=sys.stderr)
+                    continue
+
+                if rule.endpoint in results:
+                    continue
+
+                results[rule.endpoint] = measure(client, counter,
+                                                 builders[rule.endpoint],
+                                                 args.iterations)
+                db.session.remove()
+
+            report['sizes'][str(size)] = {'catalog': catalog, 'routes': results}
+
+            print('size %d (%s)' % (size, ', '.join('%d %s' % (v, k) for k, v in catalog.items())))
+            for endpoint, r in sorted(results.items()):
+                print('  %-26s p50 %9.2f ms  p95 %9.2f ms  %4d stmts  %9.1f KiB  %s' %
+                      (endpoint, r['p50_ms'], r['p95_ms'], r['statements'],
+                       r['peak_memory_kb'], r['status']))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
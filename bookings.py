@@ -0,0 +1,209 @@
+# pyright: reportGeneralTypeIssues=false
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+from bisect import bisect_left
+from datetime import datetime as dt
+from datetime import timedelta
+from sqlalchemy import exc
+from models import db
+from models import SHOW_DURATION
+from models import SHOW_EXCLUSIONS
+from models import SHOW_MAX_DURATION
+from models import Show
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+
+#----------------------------------------------------------------------------#
+# Booking conflicts
+#
+# A show occupies its venue and its artist over [start, end). Overlaps are
+# rejected three ways, all bounded by an index:
+#
+#   - on PostgreSQL by the exclusion constraints on Show (see models.py),
+#     which also settle races between concurrent bookings;
+#   - for a single booking by find_conflict(), one range query on the
+#     (venue_id, start) and (artist_id, start) indexes, which names the
+#     conflicting show for the form;
+#   - for bulk imports by an in-memory Bookings index over the chunk and
+#     the shows already booked around it.
+#----------------------------------------------------------------------------#
+class BookingConflict(ValueError):
+    """A show overlapping another show of its venue or of its artist."""
+
+    def __init__(self, field: str, show_id: Optional[int], start: dt, end: dt):
+        who = 'venue' if field == 'venue_id' else 'artist'
+        super().__init__('The %s is already booked between %s and %s.'
+                         % (who, start.strftime('%Y-%m-%d %H:%M'), end.strftime('%Y-%m-%d %H:%M')))
+
+        # Form field the conflict belongs to, and the show it collides with
+        self.field = field
+        self.show_id = show_id
+
+
+def end_of(start: dt, end: Optional[dt] = None, minutes: Optional[int] = None) -> dt:
+    """End of a show from an explicit end, a duration or the default length.
+
+    Raises ValueError unless the show lasts more than nothing and at most
+    SHOW_MAX_DURATION.
+    """
+
+    if end is None:
+        end = start + (SHOW_DURATION if minutes is None else timedelta(minutes=minutes))
+
+    if not start < end <= start + SHOW_MAX_DURATION:
+        raise ValueError('A show must end after it starts and last at most %d hours.'
+                         % (SHOW_MAX_DURATION.total_seconds() // 3600))
+
+    return end
+
+
+class Bookings:
+    """Interval index of bookings per key (a venue or an artist id).
+
+    Accepted bookings of one key never overlap, which reduces an interval
+    tree to two parallel sorted lists: ordered by start, the ends are
+    ordered too, so the only booking that can overlap [start, end) is the
+    last one starting before end. Lookups are a bisection; inserts a
+    bisection plus a list insert.
+    """
+
+    def __init__(self):
+        self.starts: Dict[int, List[dt]] = {}
+        self.ends: Dict[int, List[dt]] = {}
+        self.ids: Dict[int, List[Optional[int]]] = {}
+
+    def overlapping(self, key: int, start: dt, end: dt) -> Optional[Tuple[Optional[int], dt, dt]]:
+        """(id, start, end) of the booking of key overlapping [start, end), if any."""
+
+        starts = self.starts.get(key)
+        if not starts:
+            return None
+
+        i = bisect_left(starts, end) - 1
+        if i >= 0 and self.ends[key][i] > start:
+            return self.ids[key][i], starts[i], self.ends[key][i]
+
+        return None
+
+    def add(self, key: int, start: dt, end: dt, id: Optional[int] = None):
+        """Record a booking; the caller has checked it overlaps nothing."""
+
+        starts = self.starts.setdefault(key, [])
+        i = bisect_left(starts, start)
+
+        starts.insert(i, start)
+        self.ends.setdefault(key, []).insert(i, end)
+        self.ids.setdefault(key, []).insert(i, id)
+
+
+#----------------------------------------------------------------------------#
+# Single bookings
+#----------------------------------------------------------------------------#
+def find_conflict(venue_id: int, artist_id: int, start: dt, end: dt,
+                  exclude_id: Optional[int] = None) -> Optional[BookingConflict]:
+    """The first show of the venue or the artist overlapping [start, end)."""
+
+    query = (db.session.query(Show.id, Show.venue_id, Show.start, Show.end)
+             .filter(db.or_(Show.venue_id == venue_id, Show.artist_id == artist_id),
+                     Show.start > start - SHOW_MAX_DURATION,
+                     Show.start < end,
+                     Show.end > start))
+
+    if exclude_id is not None:
+        query = query.filter(Show.id != exclude_id)
+
+    # Report the venue first: it is the field listed first on the form
+    row = query.order_by(Show.venue_id != venue_id).first()
+    if row is None:
+        return None
+
+    return BookingConflict('venue_id' if row.venue_id == venue_id else 'artist_id',
+                           row.id, row.start, row.end)
+
+
+def book_show(venue_id: int, artist_id: int, start: dt, end: dt) -> Show:
+    """Add a show to the session, checked against the venue's and artist's bookings.
+
+    Raises BookingConflict, also when a concurrent booking wins the race
+    and an exclusion constraint rejects the flush; the session is then
+    rolled back.
+    """
+
+    conflict = find_conflict(venue_id, artist_id, start, end)
+    if conflict is not None:
+        raise conflict
+
+    show = Show(venue_id=venue_id, artist_id=artist_id, start=start, end=end)
+    db.session.add(show)
+
+    try:
+        db.session.flush()
+
+    except exc.IntegrityError as e:
+        constraint = getattr(getattr(e.orig, 'diag', None), 'constraint_name', None)
+        db.session.rollback()
+
+        if constraint not in SHOW_EXCLUSIONS:
+            raise
+
+        conflict = find_conflict(venue_id, artist_id, start, end)
+        raise conflict or BookingConflict(SHOW_EXCLUSIONS[constraint], None, start, end)
+
+    return show
+
+
+#----------------------------------------------------------------------------#
+# Bulk bookings
+#----------------------------------------------------------------------------#
+def load_bookings(venue_ids: Iterable[int], artist_ids: Iterable[int],
+                  first_start: dt, last_end: dt) -> Tuple[Bookings, Bookings]:
+    """Venue and artist indexes of the shows booked around [first_start, last_end)."""
+
+    venues = Bookings()
+    artists = Bookings()
+
+    rows = (db.session.query(Show.id, Show.venue_id, Show.artist_id, Show.start, Show.end)
+            .filter(db.or_(Show.venue_id.in_(set(venue_ids)), Show.artist_id.in_(set(artist_ids))),
+                    Show.start > first_start - SHOW_MAX_DURATION,
+                    Show.start < last_end,
+                    Show.end.isnot(None)))
+
+    for row in rows:
+        venues.add(row.venue_id, row.start, row.end, row.id)
+        artists.add(row.artist_id, row.start, row.end, row.id)
+
+    return venues, artists
+
+
+def check_bookings(shows: List[Tuple[int, int, dt, dt]]) -> Optional[Tuple[int, BookingConflict]]:
+    """First of (venue_id, artist_id, start, end) overlapping a booked show or an earlier one.
+
+    Returns its index in shows and the conflict, or None if all of them
+    can be booked. Issues one query whatever the number of shows.
+    """
+
+    if not shows:
+        return None
+
+    venues, artists = load_bookings((s[0] for s in shows), (s[1] for s in shows),
+                                    min(s[2] for s in shows), max(s[3] for s in shows))
+
+    for i, (venue_id, artist_id, start, end) in enumerate(shows):
+        for field, index, key in (('venue_id', venues, venue_id), ('artist_id', artists, artist_id)):
+            found = index.overlapping(key, start, end)
+            if found is not None:
+                return i, BookingConflict(field, *found)
+
+        venues.add(venue_id, start, end)
+        artists.add(artist_id, start, end)
+
+    return None
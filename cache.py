@@ -0,0 +1,336 @@
+# pyright: reportGeneralTypeIssues=false
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+from flask import current_app
+from flask import g
+from flask import request
+from flask import session
+from flask.signals import Namespace
+from markupsafe import Markup
+import hashlib
+import pickle
+import routing
+import time
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+from typing import Set
+
+
+#----------------------------------------------------------------------------#
+# Signals
+#----------------------------------------------------------------------------#
+signals = Namespace()
+
+# Sent by write handlers after a successful commit, with the tags of every
+# entity they touched: 'venue:<id>', 'artist:<id>' and the collection tags
+# 'venues', 'artists' and 'shows' when rows were added or removed.
+catalog_changed = signals.signal('catalog-changed')
+
+
+#----------------------------------------------------------------------------#
+# Backends
+#----------------------------------------------------------------------------#
+class LRUCache:
+    """In-process cache: bounded, least recently used entries go first."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.entries: OrderedDict = OrderedDict()
+        self.tags: Dict[str, Set[str]] = {}
+        self.lock = Lock()
+
+    def get(self, key: str):
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None:
+                return None
+
+            value, expires, _ = entry
+            if expires < time.time():
+                self._drop(key)
+                return None
+
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, tags: Iterable[str], ttl: int):
+        tags = set(tags)
+
+        with self.lock:
+            self._drop(key)
+            self.entries[key] = (value, time.time() + ttl, tags)
+
+            for tag in tags:
+                self.tags.setdefault(tag, set()).add(key)
+
+            while len(self.entries) > self.maxsize:
+                self._drop(next(iter(self.entries)))
+
+    def invalidate(self, tags: Iterable[str]):
+        with self.lock:
+            for tag in tags:
+                for key in self.tags.pop(tag, ()):
+                    self._drop(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.tags.clear()
+
+    def _drop(self, key: str):
+        entry = self.entries.pop(key, None)
+
+        if entry is None:
+            return
+
+        for tag in entry[2]:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+
+class RedisCache:
+    """Cache shared by every worker, kept in Redis with a key set per tag."""
+
+    def __init__(self, url: str, prefix: str = 'fyyur:'):
+        if redis is None:
+            raise RuntimeError('CACHE_BACKEND = "redis" requires the redis package')
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key: str, value, tags: Iterable[str], ttl: int):
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, pickle.dumps(value), ex=ttl)
+
+        # Tag sets outlive their entries by one ttl at most
+        for tag in tags:
+            pipe.sadd(self.prefix + 'tag:' + tag, key)
+            pipe.expire(self.prefix + 'tag:' + tag, ttl)
+
+        pipe.execute()
+
+    def invalidate(self, tags: Iterable[str]):
+        tag_keys = [self.prefix + 'tag:' + tag for tag in tags]
+
+        if not tag_keys:
+            return
+
+        keys = self.client.sunion(tag_keys)
+
+        pipe = self.client.pipeline()
+        if keys:
+            pipe.delete(*(self.prefix + k.decode() for k in keys))
+        pipe.delete(*tag_keys)
+        pipe.execute()
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+#----------------------------------------------------------------------------#
+# Flask integration
+#----------------------------------------------------------------------------#
+def init_app(app):
+    """Build the configured backend and subscribe it to catalog changes."""
+
+    backend = app.config.get('CACHE_BACKEND')
+
+    if backend == 'lru':
+        app.extensions['cache'] = LRUCache(app.config.get('CACHE_LRU_SIZE', 1024))
+
+    elif backend == 'redis':
+        app.extensions['cache'] = RedisCache(app.config['CACHE_REDIS_URL'])
+
+    else:
+        app.extensions['cache'] = None
+
+    catalog_changed.connect(invalidate, app)
+
+    app.jinja_env.globals['cache_fragment'] = cache_fragment
+
+
+def backend():
+    return current_app.extensions.get('cache')
+
+
+def invalidate(sender, tags: Iterable[str] = ()):
+    """Evict every page and fragment tagged with one of tags."""
+
+    cache = sender.extensions.get('cache')
+
+    if cache is not None:
+        cache.invalidate(tags)
+
+
+def tag(*tags: str):
+    """Mark the page being rendered as depending on the given entities."""
+
+    g.setdefault('cache_tags', set()).update(tags)
+
+
+def reads_cache() -> bool:
+    """Whether this request may be answered from the cache.
+
+    Not for a client pinned to the primary by a recent write: an entry
+    rendered from a lagging replica may not show that write yet.
+    """
+
+    return not routing.pinned_to_primary()
+
+
+def entry_ttl(ttl: int) -> int:
+    """Seconds to keep what this request rendered: ttl, or less from a replica.
+
+    A replica may render a page from before a write whose invalidation has
+    already run; such an entry lives no longer than the replica lag the app
+    allows for (REPLICA_READ_YOUR_WRITES).
+    """
+
+    if routing.on_replica():
+        return min(ttl, current_app.config.get('REPLICA_READ_YOUR_WRITES', 5))
+
+    return ttl
+
+
+def validator(version) -> Optional[str]:
+    """ETag of a page's version tuple, or None without one."""
+
+    if version is None:
+        return None
+
+    return hashlib.sha1(repr(tuple(version)).encode()).hexdigest()[:20]
+
+
+def not_modified(etag: Optional[str]) -> bool:
+    """Whether the request's If-None-Match holds etag."""
+
+    return etag is not None and request.if_none_match.contains_weak(etag)
+
+
+def not_modified_response(etag: str):
+    response = current_app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    return response
+
+
+def cached_page(*tags: str, version: Optional[Callable] = None):
+    """Cache a GET view's response, keyed by its full path.
+
+    Tags may reference view arguments, e.g. 'venue:{venue_id}'; views add
+    the entities their content depends on with tag().
+
+    version(**kwargs), if given, returns a tuple that changes whenever the
+    page does (None when there is no such page). Responses then carry an
+    ETag, and a client already holding the current page gets a 304: from
+    the cached entry, or else before the view renders anything.
+    """
+
+    def decorator(view):
+
+        @wraps(view)
+        def wrapper(**kwargs):
+            cache = backend()
+
+            # Pending flash messages are rendered into the page: never share it
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(**kwargs)
+
+            key = 'page:' + request.full_path
+            cached = cache.get(key) if cache is not None and reads_cache() else None
+
+            if cached is not None:
+                body, status, content_type, etag = cached
+
+                if not_modified(etag):
+                    return not_modified_response(etag)
+
+                response = current_app.response_class(body, status, content_type=content_type)
+                if etag is not None:
+                    response.set_etag(etag, weak=True)
+
+                return response
+
+            etag = validator(version(**kwargs)) if version is not None else None
+
+            if not_modified(etag):
+                return not_modified_response(etag)
+
+            g.cache_tags = set(t.format(**kwargs) for t in tags)
+            response = current_app.make_response(view(**kwargs))
+
+            if response.status_code != 200 or response.is_streamed:
+                return response
+
+            # A write committed while the view rendered: the body may be newer
+            # than etag, and cached under it would answer 304s to clients
+            # holding the page from before. Sent as is, neither validated nor kept
+            if (cache is not None and etag is not None
+                    and validator(version(**kwargs)) != etag):
+                return response
+
+            if etag is not None:
+                response.set_etag(etag, weak=True)
+
+            ttl = entry_ttl(current_app.config.get('CACHE_TTL', 300))
+            if cache is not None and ttl > 0:
+                cache.set(key,
+                          (response.get_data(), response.status_code, response.content_type, etag),
+                          g.cache_tags,
+                          ttl)
+
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def cache_fragment(key: str, *tags: str, caller=None) -> Markup:
+    """Jinja call block caching its body:
+
+        {% call cache_fragment('venue-header:1', 'venue:1') %}...{% endcall %}
+    """
+
+    cache = backend()
+
+    if cache is None:
+        return caller()
+
+    body: Optional[str] = cache.get('fragment:' + key) if reads_cache() else None
+
+    if body is None:
+        body = str(caller())
+
+        ttl = entry_ttl(current_app.config.get('CACHE_TTL', 300))
+        if ttl > 0:
+            cache.set('fragment:' + key, body, tags, ttl)
+
+    # The page embedding this fragment depends on the same entities
+    tag(*tags)
+
+    return Markup(body)
@@ -9,8 +9,81 @@ DEBUG = True
 
 # Connect to the database.
 db_url = 'postgresql://postgres@localhost:5432/fyuur'
-SQLALCHEMY_DATABASE_URI = db_url
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', db_url)
+
+# Connection pool of each worker process. pool_pre_ping replaces connections
+# the server dropped; pool_recycle retires them before proxies time out.
+SQLALCHEMY_ENGINE_OPTIONS = {
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+    'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+    'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    'pool_pre_ping': True,
+    # psycopg2 sends an executemany (batch writes) in pages, not row by row
+    'executemany_mode': 'batch',
+}
+
+# Read replicas, as comma separated URLs. GET requests read from one of
+# them; writes, and a client's requests within REPLICA_READ_YOUR_WRITES
+# seconds of its last commit, go to the primary. Each replica gets its own
+# pool of the size above in every worker.
+SQLALCHEMY_REPLICA_URIS = [url for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url]
+REPLICA_READ_YOUR_WRITES = int(os.environ.get('REPLICA_READ_YOUR_WRITES', 5))
 
 # Disable annoying deprecation warnings.
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+
+# Rows per page on the venue, artist and show listings.
+PAGE_SIZE = 50
+
+# Template statements rendered per chunk of a streamed page (/shows?all=1).
+STREAM_BUFFER = 64
+
+# Largest ?per_page= the JSON API accepts; also the rows per query when it
+# streams a whole collection.
+API_MAX_PAGE_SIZE = 500
+
+# Seconds between reloads of each worker's in-memory artist and venue name
+# index (typeahead); its own commits apply at once, other workers' within this.
+TYPEAHEAD_REFRESH = 60
+
+# Static files: 'built' serves the fingerprinted, precompressed output of
+# `flask build-assets` (from static/dist) once it exists; 'source' always
+# links the files under static/ as they are, for editing them.
+ASSETS = os.environ.get('ASSETS', 'built')
+
+# Rendered page and fragment cache: 'lru' (per process), 'redis' (shared by
+# every worker, needs the redis package) or None to disable it. A write only
+# evicts the 'lru' entries of the worker that handled it: other workers
+# serve their stale copies for up to CACHE_TTL seconds. Use 'lru' with a
+# single worker only, and 'redis' or none under a multi-worker server.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'lru')
+CACHE_LRU_SIZE = 1024
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+# Seconds a cached page may live; bounds how late a show moves from the
+# upcoming to the past section of a cached detail page.
+CACHE_TTL = 300
+
+# Seconds the validators (ETag, Last-Modified) of a venue or artist .ics
+# feed are kept: polls within it get a 304 until the catalog changes.
+FEED_TTL = 3600
+
+# Per-request SQL, render and response-size histograms, served on /metrics.
+METRICS_ENABLED = True
+
+# Requests issuing more SQL statements than this are logged as warnings.
+QUERY_BUDGET = 20
+
+# Bearer token enabling POST /import/<kind> (bulk CSV/NDJSON import); the
+# endpoint does not exist while unset. `flask import-catalog` needs none.
+IMPORT_TOKEN = os.environ.get('IMPORT_TOKEN')
+
+# Opt-in request profiling (profiling.py): requests sent with
+# "X-Profile: <PROFILE_TOKEN>", plus a random PROFILE_SAMPLE_RATE share of
+# all requests, have their stack sampled every PROFILE_INTERVAL seconds into
+# PROFILE_DIR; merge them with `flask merge-profiles`. Off while both unset.
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_INTERVAL = 0.001
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(basedir, 'profiles'))
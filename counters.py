@@ -0,0 +1,202 @@
+# pyright: reportGeneralTypeIssues=false
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+from datetime import datetime as dt
+from sqlalchemy import func
+from models import db
+from models import Artist
+from models import Venue
+from models import Show
+from models import ShowCard
+from models import ShowCounterWatermark
+from models import CARD_COLUMNS
+from models import card_rows
+from models import refresh_show_cards
+from models import FACETED
+from models import FacetCount
+from models import recount_facets
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+
+
+#----------------------------------------------------------------------------#
+# Show counters
+#----------------------------------------------------------------------------#
+def lock_watermark() -> Optional[ShowCounterWatermark]:
+    """The watermark row, locked against concurrent rolls and show writes."""
+
+    return (ShowCounterWatermark.query
+            .filter_by(id=1)
+            .with_for_update()
+            .one_or_none())
+
+
+def move_to_past(show_column, model, since: dt, until: dt) -> int:
+    """Shift shows that started in (since, until] from upcoming to past."""
+
+    moved = (db.session.query(show_column, func.count(Show.id))
+             .filter(Show.start > since, Show.start <= until)
+             .group_by(show_column)
+             .all())
+
+    for entity_id, n in moved:
+        (model.query
+         .filter_by(id=entity_id)
+         .update({model.upcoming_shows_count: model.upcoming_shows_count - n,
+                  model.past_shows_count: model.past_shows_count + n},
+                 synchronize_session=False))
+
+    return len(moved)
+
+
+def roll_show_counters(now: Optional[dt] = None) -> Dict[str, int]:
+    """Move shows whose start has passed since the last roll into past counts.
+
+    Only venues and artists with a show in the elapsed window are touched,
+    so a roll every few minutes costs a handful of updates.
+    """
+
+    now = now or dt.now()
+    mark = lock_watermark()
+
+    # No watermark yet: establish one from a full recount
+    if mark is None:
+        return rebuild_show_counters(now)
+
+    if now <= mark.rolled_at:
+        db.session.rollback()
+        return {'venues': 0, 'artists': 0}
+
+    result = {
+        'venues': move_to_past(Show.venue_id, Venue, mark.rolled_at, now),
+        'artists': move_to_past(Show.artist_id, Artist, mark.rolled_at, now),
+    }
+
+    mark.rolled_at = now
+    db.session.commit()
+
+    return result
+
+
+def recount(show_column, model, now: dt, ids: Optional[Iterable[int]] = None) -> int:
+    """Recompute both counters of every row of model (or of ids) from the Show table."""
+
+    upcoming = (db.session.query(func.count(Show.id))
+                .filter(show_column == model.id, Show.start > now)
+                .as_scalar())
+    past = (db.session.query(func.count(Show.id))
+            .filter(show_column == model.id, Show.start <= now)
+            .as_scalar())
+
+    query = model.query
+    if ids is not None:
+        query = query.filter(model.id.in_(list(ids)))
+
+    return (query
+            .update({model.upcoming_shows_count: upcoming,
+                     model.past_shows_count: past},
+                    synchronize_session=False))
+
+
+def rebuild_show_counters(now: Optional[dt] = None) -> Dict[str, int]:
+    """Recount every venue and artist and reset the watermark to now."""
+
+    now = now or dt.now()
+    mark = lock_watermark()
+
+    if mark is None:
+        mark = ShowCounterWatermark(id=1, rolled_at=now)
+        db.session.add(mark)
+
+    result = {
+        'venues': recount(Show.venue_id, Venue, now),
+        'artists': recount(Show.artist_id, Artist, now),
+    }
+
+    mark.rolled_at = now
+    db.session.commit()
+
+    return result
+
+
+def recount_show_counters(venue_ids: Iterable[int], artist_ids: Iterable[int]) -> Dict[str, int]:
+    """Recount the given venues and artists against the current watermark.
+
+    For writes that bypass the Show events, such as a bulk COPY: the
+    counters of everything they touched are recomputed in one UPDATE per
+    table, in the caller's transaction, which this commits.
+    """
+
+    mark = lock_watermark()
+
+    if mark is None:
+        return rebuild_show_counters()
+
+    result = {
+        'venues': recount(Show.venue_id, Venue, mark.rolled_at, venue_ids),
+        'artists': recount(Show.artist_id, Artist, mark.rolled_at, artist_ids),
+    }
+
+    db.session.commit()
+
+    return result
+
+
+#----------------------------------------------------------------------------#
+# Facet counts
+#----------------------------------------------------------------------------#
+def rebuild_facet_counts() -> Dict[str, int]:
+    """Recount every (state, genre) facet of venues and artists."""
+
+    connection = db.session.connection()
+
+    for kind in FACETED:
+        recount_facets(connection, kind)
+
+    db.session.commit()
+
+    return {kind: FacetCount.query.filter_by(kind=kind).count() for kind in FACETED}
+
+
+#----------------------------------------------------------------------------#
+# Show cards
+#----------------------------------------------------------------------------#
+def rebuild_show_cards() -> int:
+    """Rewrite every show card from its show, venue, artist and contacts."""
+
+    refresh_show_cards(db.session.connection())
+    db.session.commit()
+
+    return ShowCard.query.count()
+
+
+def check_show_cards(sample: int = 10) -> Dict:
+    """Compare the show cards with what their sources say now.
+
+    Returns the number of cards, how many shows have a missing or stale
+    card, how many cards match no show as it is, and a sample of the
+    show ids concerned. Read only: rebuild_show_cards() repairs them.
+    """
+
+    cards = ShowCard.__table__
+    stored = db.select([cards.c[column] for column in CARD_COLUMNS])
+    expected = card_rows()
+
+    result = {'cards': db.session.query(func.count(cards.c.show_id)).scalar()}
+
+    for label, difference in (('missing_or_stale', expected.except_(stored)),
+                              ('unexpected', stored.except_(expected))):
+        rows = difference.alias(label)
+        show_id = rows.c.show_id
+
+        result[label] = db.session.query(func.count()).select_from(rows).scalar()
+        result[label + '_ids'] = [id for id, in db.session.query(show_id)
+                                  .order_by(show_id).limit(sample)]
+
+    return result
@@ -13,6 +13,14 @@ def test():
         abort("Aborted at user request.")
 
 
+def bench(database_url, sizes='100 1000 10000'):
+    revision = local("git rev-parse --short HEAD", capture=True)
+    local(
+        "python benchmarks/harness.py --database-url {} --sizes {} "
+        "--output benchmarks/results/{}.json".format(database_url, sizes, revision)
+    )
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
@@ -0,0 +1,90 @@
+# pyright: reportGeneralTypeIssues=false
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+from datetime import datetime as dt
+from functools import lru_cache
+from itertools import islice
+from babel import Locale
+from babel.dates import parse_pattern
+import dateutil.parser
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Union
+
+
+#----------------------------------------------------------------------------#
+# Datetimes
+#----------------------------------------------------------------------------#
+# Named formats of the datetime filter; anything else is a babel pattern
+FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=64)
+def compiled(format: str, locale: str):
+    """Parsed babel pattern and locale for a (format, locale) pair."""
+
+    return parse_pattern(FORMATS.get(format, format)), Locale.parse(locale)
+
+
+def format_datetime(value: Union[dt, str], format: str = 'medium', locale: str = 'en') -> str:
+    """Jinja filter: a datetime (or, for old callers, a string) as text."""
+
+    # Strings still work, at the cost of parsing them
+    if isinstance(value, str):
+        value = dateutil.parser.parse(value)
+
+    pattern, locale = compiled(format, locale)
+
+    return pattern.apply(value, locale)
+
+
+def format_datetimes(values: Iterable[dt], format: str = 'medium', locale: str = 'en') -> List[str]:
+    """format_datetime() over many values: one pattern lookup, repeats formatted once."""
+
+    pattern, locale = compiled(format, locale)
+    done: Dict[dt, str] = {}
+
+    labels = []
+    for value in values:
+        label = done.get(value)
+
+        if label is None:
+            label = done[value] = pattern.apply(value, locale)
+
+        labels.append(label)
+
+    return labels
+
+
+def label_shows(shows: List[Dict], format: str = 'full', locale: str = 'en') -> List[Dict]:
+    """Add a formatted 'start_label' to each show dict in one pass."""
+
+    labels = format_datetimes([show['start_time'] for show in shows], format, locale)
+
+    for show, label in zip(shows, labels):
+        show['start_label'] = label
+
+    return shows
+
+
+def iter_labeled(shows: Iterable[Dict], batch: int = 500, format: str = 'full',
+                 locale: str = 'en') -> Iterator[Dict]:
+    """label_shows() over a stream of shows, batch at a time."""
+
+    shows = iter(shows)
+
+    while True:
+        chunk = list(islice(shows, batch))
+        if not chunk:
+            return
+        yield from label_shows(chunk, format, locale)
@@ -0,0 +1,290 @@
+# pyright: reportGeneralTypeIssues=false
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+
+#----------------------------------------------------------------------------#
+# Offline geocoding
+#
+# Contacts are placed at the centre of their city, from the table below:
+# no network lookups, ever. Rows that give their own latitude and
+# longitude keep them; unknown cities have no position and never show up
+# in a "near" search. Add cities here as the catalog grows.
+#----------------------------------------------------------------------------#
+CITIES: Dict[Tuple[str, str], Tuple[float, float]] = {
+    ('albany', 'NY'): (42.6526, -73.7562),
+    ('albuquerque', 'NM'): (35.0844, -106.6504),
+    ('anchorage', 'AK'): (61.2181, -149.9003),
+    ('annapolis', 'MD'): (38.9784, -76.4922),
+    ('asheville', 'NC'): (35.5951, -82.5515),
+    ('athens', 'GA'): (33.9519, -83.3576),
+    ('atlanta', 'GA'): (33.7490, -84.3880),
+    ('augusta', 'ME'): (44.3106, -69.7795),
+    ('austin', 'TX'): (30.2672, -97.7431),
+    ('baltimore', 'MD'): (39.2904, -76.6122),
+    ('baton rouge', 'LA'): (30.4515, -91.1871),
+    ('billings', 'MT'): (45.7833, -108.5007),
+    ('birmingham', 'AL'): (33.5186, -86.8104),
+    ('bismarck', 'ND'): (46.8083, -100.7837),
+    ('boise', 'ID'): (43.6150, -116.2023),
+    ('boston', 'MA'): (42.3601, -71.0589),
+    ('boulder', 'CO'): (40.0150, -105.2705),
+    ('brooklyn', 'NY'): (40.6782, -73.9442),
+    ('buffalo', 'NY'): (42.8864, -78.8784),
+    ('burlington', 'VT'): (44.4759, -73.2121),
+    ('carson city', 'NV'): (39.1638, -119.7674),
+    ('charleston', 'SC'): (32.7765, -79.9311),
+    ('charleston', 'WV'): (38.3498, -81.6326),
+    ('charlotte', 'NC'): (35.2271, -80.8431),
+    ('cheyenne', 'WY'): (41.1400, -104.8202),
+    ('chicago', 'IL'): (41.8781, -87.6298),
+    ('cincinnati', 'OH'): (39.1031, -84.5120),
+    ('cleveland', 'OH'): (41.4993, -81.6944),
+    ('colorado springs', 'CO'): (38.8339, -104.8214),
+    ('columbia', 'SC'): (34.0007, -81.0348),
+    ('columbus', 'OH'): (39.9612, -82.9988),
+    ('concord', 'NH'): (43.2081, -71.5376),
+    ('dallas', 'TX'): (32.7767, -96.7970),
+    ('denver', 'CO'): (39.7392, -104.9903),
+    ('des moines', 'IA'): (41.5868, -93.6250),
+    ('detroit', 'MI'): (42.3314, -83.0458),
+    ('dover', 'DE'): (39.1582, -75.5244),
+    ('el paso', 'TX'): (31.7619, -106.4850),
+    ('fargo', 'ND'): (46.8772, -96.7898),
+    ('fort worth', 'TX'): (32.7555, -97.3308),
+    ('frankfort', 'KY'): (38.2009, -84.8733),
+    ('grand rapids', 'MI'): (42.9634, -85.6681),
+    ('harrisburg', 'PA'): (40.2732, -76.8867),
+    ('hartford', 'CT'): (41.7658, -72.6734),
+    ('helena', 'MT'): (46.5891, -112.0391),
+    ('honolulu', 'HI'): (21.3069, -157.8583),
+    ('houston', 'TX'): (29.7604, -95.3698),
+    ('indianapolis', 'IN'): (39.7684, -86.1581),
+    ('jackson', 'MS'): (32.2988, -90.1848),
+    ('jacksonville', 'FL'): (30.3322, -81.6557),
+    ('jefferson city', 'MO'): (38.5767, -92.1735),
+    ('juneau', 'AK'): (58.3019, -134.4197),
+    ('kansas city', 'MO'): (39.0997, -94.5786),
+    ('knoxville', 'TN'): (35.9606, -83.9207),
+    ('lansing', 'MI'): (42.7325, -84.5555),
+    ('las vegas', 'NV'): (36.1699, -115.1398),
+    ('lincoln', 'NE'): (40.8136, -96.7026),
+    ('little rock', 'AR'): (34.7465, -92.2896),
+    ('los angeles', 'CA'): (34.0522, -118.2437),
+    ('louisville', 'KY'): (38.2527, -85.7585),
+    ('madison', 'WI'): (43.0731, -89.4012),
+    ('manchester', 'NH'): (42.9956, -71.4548),
+    ('memphis', 'TN'): (35.1495, -90.0490),
+    ('miami', 'FL'): (25.7617, -80.1918),
+    ('milwaukee', 'WI'): (43.0389, -87.9065),
+    ('minneapolis', 'MN'): (44.9778, -93.2650),
+    ('montgomery', 'AL'): (32.3792, -86.3077),
+    ('montpelier', 'VT'): (44.2601, -72.5754),
+    ('nashville', 'TN'): (36.1627, -86.7816),
+    ('new haven', 'CT'): (41.3083, -72.9279),
+    ('new orleans', 'LA'): (29.9511, -90.0715),
+    ('new york', 'NY'): (40.7128, -74.0060),
+    ('newark', 'NJ'): (40.7357, -74.1724),
+    ('oakland', 'CA'): (37.8044, -122.2712),
+    ('oklahoma city', 'OK'): (35.4676, -97.5164),
+    ('olympia', 'WA'): (47.0379, -122.9007),
+    ('omaha', 'NE'): (41.2565, -95.9345),
+    ('orlando', 'FL'): (28.5383, -81.3792),
+    ('philadelphia', 'PA'): (39.9526, -75.1652),
+    ('phoenix', 'AZ'): (33.4484, -112.0740),
+    ('pierre', 'SD'): (44.3683, -100.3510),
+    ('pittsburgh', 'PA'): (40.4406, -79.9959),
+    ('portland', 'ME'): (43.6591, -70.2568),
+    ('portland', 'OR'): (45.5152, -122.6784),
+    ('providence', 'RI'): (41.8240, -71.4128),
+    ('raleigh', 'NC'): (35.7796, -78.6382),
+    ('reno', 'NV'): (39.5296, -119.8138),
+    ('richmond', 'VA'): (37.5407, -77.4360),
+    ('sacramento', 'CA'): (38.5816, -121.4944),
+    ('saint paul', 'MN'): (44.9537, -93.0900),
+    ('salem', 'OR'): (44.9429, -123.0351),
+    ('salt lake city', 'UT'): (40.7608, -111.8910),
+    ('san antonio', 'TX'): (29.4241, -98.4936),
+    ('san diego', 'CA'): (32.7157, -117.1611),
+    ('san francisco', 'CA'): (37.7749, -122.4194),
+    ('san jose', 'CA'): (37.3382, -121.8863),
+    ('santa fe', 'NM'): (35.6870, -105.9378),
+    ('savannah', 'GA'): (32.0809, -81.0912),
+    ('seattle', 'WA'): (47.6062, -122.3321),
+    ('sioux falls', 'SD'): (43.5446, -96.7311),
+    ('spokane', 'WA'): (47.6588, -117.4260),
+    ('springfield', 'IL'): (39.7817, -89.6501),
+    ('saint louis', 'MO'): (38.6270, -90.1994),
+    ('tallahassee', 'FL'): (30.4383, -84.2807),
+    ('tampa', 'FL'): (27.9506, -82.4572),
+    ('topeka', 'KS'): (39.0473, -95.6752),
+    ('trenton', 'NJ'): (40.2206, -74.7597),
+    ('tucson', 'AZ'): (32.2226, -110.9747),
+    ('tulsa', 'OK'): (36.1540, -95.9928),
+    ('virginia beach', 'VA'): (36.8529, -75.9780),
+    ('washington', 'DC'): (38.9072, -77.0369),
+    ('wichita', 'KS'): (37.6872, -97.3301),
+    ('wilmington', 'DE'): (39.7391, -75.5398),
+}
+
+
+def city_key(city: Optional[str], state: Optional[str]) -> Tuple[str, str]:
+    """Lookup key of a city: case, dots and spacing ignored, 'St' read as 'Saint'."""
+
+    words = (city or '').casefold().replace('.', ' ').split()
+    if words and words[0] == 'st':
+        words[0] = 'saint'
+
+    return ' '.join(words), (state or '').strip().upper()
+
+
+def locate(city: Optional[str], state: Optional[str]) -> Optional[Tuple[float, float]]:
+    """(latitude, longitude) of a city from the table, or None."""
+
+    return CITIES.get(city_key(city, state))
+
+
+#----------------------------------------------------------------------------#
+# Geohash
+#
+# A geohash interleaves longitude and latitude bits, five to a base-32
+# character: points sharing a prefix share a cell, and every cell of a
+# given length is the same size in degrees. Contacts store 12 characters
+# (a few centimetres); a search covers its circle with the 3 x 3 block of
+# cells around the centre, at the longest length whose cells are at least
+# as wide as the radius, and fetches each as an index range.
+#----------------------------------------------------------------------------#
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+PRECISION = 12
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Length of a degree of latitude
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def encode(latitude: float, longitude: float, precision: int = PRECISION) -> str:
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+
+    chars = []
+    bits = 0
+    n = 0
+    even = True
+
+    while len(chars) < precision:
+        interval, value = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+
+        even = not even
+        n += 1
+
+        if n == 5:
+            chars.append(BASE32[bits])
+            bits = n = 0
+
+    return ''.join(chars)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """(latitude, longitude) span in degrees of the cells of a length."""
+
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def covering_cells(latitude: float, longitude: float, radius_km: float) -> List[str]:
+    """Geohash prefixes whose cells together cover the circle around a point."""
+
+    # The circle's widest reach in latitude, where a degree of longitude is shortest
+    reach = min(89.0, abs(latitude) + radius_km / KM_PER_DEGREE)
+    lon_km = KM_PER_DEGREE * math.cos(math.radians(reach))
+
+    precision = 1
+    for p in range(PRECISION, 0, -1):
+        lat_span, lon_span = cell_size(p)
+        if lat_span * KM_PER_DEGREE >= radius_km and lon_span * lon_km >= radius_km:
+            precision = p
+            break
+
+    lat_span, lon_span = cell_size(precision)
+
+    cells = set()
+    for dlat in (-lat_span, 0, lat_span):
+        for dlon in (-lon_span, 0, lon_span):
+            lat = max(-90.0, min(90.0 - 1e-9, latitude + dlat))
+            lon = (longitude + dlon + 180.0) % 360.0 - 180.0
+            cells.add(encode(lat, lon, precision))
+
+    return sorted(cells)
+
+
+def place(city: Optional[str], state: Optional[str],
+          latitude: Optional[float] = None, longitude: Optional[float] = None) -> Tuple:
+    """(latitude, longitude, geohash) of a contact: given, looked up, or Nones."""
+
+    if latitude is None or longitude is None:
+        latitude, longitude = locate(city, state) or (None, None)
+
+    if latitude is None:
+        return None, None, None
+
+    return latitude, longitude, encode(latitude, longitude)
+
+
+#----------------------------------------------------------------------------#
+# Distance
+#----------------------------------------------------------------------------#
+def haversine_km(latitude: float, longitude: float,
+                 latitudes: Sequence[float], longitudes: Sequence[float]) -> List[float]:
+    """Great-circle distances from a point to many, in kilometres.
+
+    One array expression over every candidate with numpy, a loop without.
+    """
+
+    if numpy is not None:
+        lat1 = math.radians(latitude)
+        lat2 = numpy.radians(numpy.asarray(latitudes, dtype=float))
+        dlat = lat2 - lat1
+        dlon = numpy.radians(numpy.asarray(longitudes, dtype=float) - longitude)
+
+        a = numpy.sin(dlat / 2) ** 2 + math.cos(lat1) * numpy.cos(lat2) * numpy.sin(dlon / 2) ** 2
+        return (2 * EARTH_RADIUS_KM * numpy.arcsin(numpy.sqrt(numpy.minimum(a, 1.0)))).tolist()
+
+    lat1 = math.radians(latitude)
+    cos_lat1 = math.cos(lat1)
+    distances = []
+
+    for lat, lon in zip(latitudes, longitudes):
+        lat2 = math.radians(lat)
+        a = (math.sin((lat2 - lat1) / 2) ** 2
+             + cos_lat1 * math.cos(lat2) * math.sin(math.radians(lon - longitude) / 2) ** 2)
+        distances.append(2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0))))
+
+    return distances
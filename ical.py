@@ -0,0 +1,201 @@
+# pyright: reportGeneralTypeIssues=false
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+from datetime import datetime as dt
+from flask import Response
+from flask import abort
+from flask import current_app
+from flask import request
+from flask import stream_with_context
+from flask import url_for
+from werkzeug.http import is_resource_modified
+from models import SHOW_DURATION
+import cache
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+
+#----------------------------------------------------------------------------#
+# iCalendar feeds
+#
+# /venues/<id>.ics and /artists/<id>.ics list every show of a venue or an
+# artist as RFC 5545 events, streamed from a server-side cursor as they are
+# written. Calendar clients poll them every few minutes, so each feed's
+# validators are kept in the page cache once it has been sent in full:
+#
+#   - ETag: the version of the venue or artist, its shows and their
+#     counterparts, as on the detail pages (queries.detail_version());
+#   - Last-Modified: when that content was first sent.
+#
+# Both are dropped with the cache tags of the venue or artist and of every
+# counterpart in the feed, like the detail pages. A poll that still holds
+# the current version gets a 304 without any SQL; without a cache backend,
+# or before the feed is cached, the ETag costs a single aggregate query.
+#----------------------------------------------------------------------------#
+PRODID = '-//Fyyur//Show calendar//EN'
+
+# Content lines are folded past this many octets
+LINE_OCTETS = 75
+
+
+def escape(text: Optional[str]) -> str:
+    """A TEXT property value: backslashes, separators and newlines escaped."""
+
+    return ((text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def fold(line: str) -> str:
+    """A content line with CRLF, folded into 75-octet pieces.
+
+    Never splits a UTF-8 sequence: continuation pieces start with a space.
+    """
+
+    encoded = line.encode()
+    if len(encoded) <= LINE_OCTETS:
+        return line + '\r\n'
+
+    pieces: List[str] = []
+    start = 0
+    limit = LINE_OCTETS
+
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+
+        # Back up to the first byte of a character
+        while end < len(encoded) and encoded[end] & 0xC0 == 0x80:
+            end -= 1
+
+        pieces.append(encoded[start:end].decode())
+        start = end
+
+        # Room for the leading space of the next piece
+        limit = LINE_OCTETS - 1
+
+    return '\r\n '.join(pieces) + '\r\n'
+
+
+def format_time(value: dt) -> str:
+    """Floating local time, as shows are stored: 20261024T200000."""
+
+    return value.strftime('%Y%m%dT%H%M%S')
+
+
+def event(row, stamp: str, host: str) -> str:
+    """VEVENT of a calendar_shows() row."""
+
+    end = row.end or row.start + SHOW_DURATION
+    place = ', '.join(part for part in (row.venue_name, row.address, row.city, row.state) if part)
+
+    lines = [
+        'BEGIN:VEVENT',
+        'UID:show-%d@%s' % (row.id, host),
+        'DTSTAMP:' + stamp,
+        'DTSTART:' + format_time(row.start),
+        'DTEND:' + format_time(end),
+        'SUMMARY:' + escape('%s at %s' % (row.artist_name, row.venue_name)),
+        'LOCATION:' + escape(place),
+        'URL:' + url_for('show_venue', venue_id=row.venue_id, _external=True),
+        'END:VEVENT',
+    ]
+
+    return ''.join(fold(line) for line in lines)
+
+
+def iter_calendar(name: str, rows: Iterable, tags: Set[str]) -> Iterator[bytes]:
+    """The VCALENDAR of rows, a few events per chunk.
+
+    Notes the entities each row shows in tags, as the rows go by.
+    """
+
+    stamp = dt.utcnow().strftime('%Y%m%dT%H%M%SZ')
+    host = request.host.split(':')[0]
+
+    chunk = ''.join(fold(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:' + PRODID,
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        'X-WR-CALNAME:' + escape(name),
+    ))
+
+    for n, row in enumerate(rows, 1):
+        tags.update(('venue:%d' % row.venue_id, 'artist:%d' % row.artist_id))
+
+        chunk += event(row, stamp, host)
+
+        if n % 50 == 0:
+            yield chunk.encode()
+            chunk = ''
+
+    yield (chunk + 'END:VCALENDAR\r\n').encode()
+
+
+#----------------------------------------------------------------------------#
+# Responses
+#----------------------------------------------------------------------------#
+def feed_response(tag: str, load: Callable[[], Optional[Tuple[str, Iterable]]],
+                  version: Callable[[], Optional[Tuple]]) -> Response:
+    """The feed of an entity ('venue:<id>' as a cache tag), conditional and streamed.
+
+    version() returns a tuple that changes whenever the feed does, or None
+    when the venue or artist does not exist; it makes the feed's ETag.
+    load() returns the calendar's name and its rows; it is only called
+    when the client's copy is out of date.
+    """
+
+    backend = cache.backend()
+    validators = backend.get('ics:' + tag) if backend is not None and cache.reads_cache() else None
+
+    if validators is not None:
+        etag, last_modified = validators
+
+    else:
+        # Not sent in full since the last change: no Last-Modified to compare yet
+        etag, last_modified = cache.validator(version()), None
+
+        if etag is None:
+            abort(404)
+
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        response.last_modified = last_modified
+        return response
+
+    loaded = load()
+    if loaded is None:
+        abort(404)
+
+    name, rows = loaded
+
+    tags = {tag}
+    modified = last_modified or dt.utcnow().replace(microsecond=0)
+
+    def generate():
+        yield from iter_calendar(name, rows, tags)
+
+        # Sent in full: remember what the client now holds, unless a write
+        # committed while the feed streamed; its rows may then be newer
+        # than etag, which would answer 304s to clients holding the old feed
+        ttl = cache.entry_ttl(current_app.config.get('FEED_TTL', 3600))
+        if (backend is not None and validators is None and ttl > 0
+                and cache.validator(version()) == etag):
+            backend.set('ics:' + tag, (etag, modified), tags, ttl)
+
+    response = Response(stream_with_context(generate()), mimetype='text/calendar')
+    response.set_etag(etag, weak=True)
+    response.last_modified = modified
+
+    return response
@@ -0,0 +1,444 @@
+# pyright: reportGeneralTypeIssues=false
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+from datetime import datetime as dt
+from itertools import islice
+from models import db
+from models import Artist
+from models import Contact
+from models import Genre
+from models import Venue
+from models import Show
+from models import ShowCard
+from models import artist_genres
+from models import recount_facets
+from models import CARD_COLUMNS
+from models import card_rows
+import bookings
+from models import venue_genres
+import counters
+import csv
+import geo
+import io
+import json
+import time
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import TextIO
+
+
+#----------------------------------------------------------------------------#
+# Bulk import
+#
+# Venues and artists carry their contact fields inline (one contact per
+# row, as in the forms); shows reference their artist and venue by id
+# (artist_id, venue_id) or by exact name (artist, venue):
+#
+#   venues:  name, genres, city, state, address, phone, image_link,
+#            facebook_link, website_link, [latitude, longitude]
+#   artists: name, genres, city, state, phone, image_link, facebook_link,
+#            website_link, [latitude, longitude]
+#   shows:   start, [end | duration], artist_id | artist, venue_id | venue
+#
+# A show's end is an ISO date and time, or its duration in minutes; shows
+# with neither last models.SHOW_DURATION. A show overlapping another of
+# its venue or artist, booked or earlier in the file, is an invalid row.
+# In CSV, genres are comma separated within their cell; in NDJSON they may
+# also be a list. Genres must already exist in the Genre table. Rows go to
+# PostgreSQL with COPY, one transaction per chunk.
+#----------------------------------------------------------------------------#
+KINDS = ('venues', 'artists', 'shows')
+FORMATS = ('csv', 'ndjson')
+
+CONTACT_FIELDS = ['city', 'state', 'address', 'phone',
+                  'image_link', 'facebook_link', 'website_link']
+
+# Filled by geo.place(), from the row's own latitude and longitude if any
+GEO_FIELDS = ['latitude', 'longitude', 'geohash']
+
+# Rows per COPY and per transaction
+CHUNK_SIZE = 10000
+
+
+class InvalidRow(ValueError):
+    """Raised when an input row cannot be imported; earlier chunks are kept."""
+
+    def __init__(self, row: int, message: str):
+        super().__init__('row %d: %s' % (row, message))
+        self.row = row
+
+        # Filled in by import_catalog(): what the committed chunks did
+        self.imported = 0
+        self.tags: List[str] = []
+
+
+def format_for(filename: str) -> str:
+    """Input format from a file name: .csv, or .ndjson / .jsonl."""
+
+    if filename.endswith('.csv'):
+        return 'csv'
+
+    if filename.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+
+    raise ValueError('Cannot tell the format of %s: use .csv or .ndjson' % filename)
+
+
+def read_rows(stream: TextIO, format: str) -> Iterator[Dict]:
+    """Rows of a CSV (with a header line) or NDJSON stream, one at a time."""
+
+    if format == 'csv':
+        yield from csv.DictReader(stream)
+
+    elif format == 'ndjson':
+        for n, line in enumerate(stream, 1):
+            if line.strip():
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    raise InvalidRow(n, 'invalid JSON (%s)' % e)
+
+                if not isinstance(row, dict):
+                    raise InvalidRow(n, 'expected a JSON object, got %s' % type(row).__name__)
+
+                yield row
+
+    else:
+        raise ValueError('Unknown import format %r' % format)
+
+
+def chunks(rows: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    rows = iter(rows)
+
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def genres_of(value) -> List[str]:
+    """Genre names of a comma separated string or a list; raises ValueError."""
+
+    if value is None:
+        return []
+
+    if isinstance(value, str):
+        value = value.split(',')
+
+    if not isinstance(value, list) or not all(isinstance(g, str) for g in value):
+        raise ValueError('genres must be a string or a list of strings')
+
+    return [g.strip() for g in value if g.strip()]
+
+
+def coordinate(value, bound: float) -> Optional[float]:
+    """Degrees within [-bound, bound], or None if blank; raises ValueError."""
+
+    if value in (None, ''):
+        return None
+
+    degrees = float(value)
+    if not -bound <= degrees <= bound:
+        raise ValueError('%r is out of range' % value)
+
+    return degrees
+
+
+def whole_number(value) -> int:
+    """A JSON integer or a string of digits (an id, minutes); raises ValueError.
+
+    int() alone would take 1.5 and true for 1: a row attached to the wrong
+    venue or artist, or a show of the wrong length.
+    """
+
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+
+    if isinstance(value, str) and value.strip().isascii() and value.strip().isdigit():
+        return int(value)
+
+    raise ValueError('%r is not a whole number' % (value,))
+
+
+#----------------------------------------------------------------------------#
+# COPY
+#----------------------------------------------------------------------------#
+def is_postgresql() -> bool:
+    return db.engine.dialect.name == 'postgresql'
+
+
+def copy_rows(table, columns: List[str], rows: List[List]):
+    """Append rows to table within the session's transaction.
+
+    PostgreSQL gets a single COPY ... FROM STDIN; other databases (SQLite in
+    development) an executemany INSERT.
+    """
+
+    if not rows:
+        return
+
+    if not is_postgresql():
+        db.session.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(rows)
+    buffer.seek(0)
+
+    # The DBAPI connection behind the session, so COPY joins its transaction
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert('COPY "%s" (%s) FROM STDIN WITH (FORMAT csv)'
+                           % (table.name, ', '.join('"%s"' % c for c in columns)),
+                           buffer)
+    finally:
+        cursor.close()
+
+
+def reserve_ids(table, n: int) -> List[int]:
+    """n fresh primary keys for table, taken from its sequence in one query."""
+
+    if is_postgresql():
+        return [id for id, in db.session.execute(
+            "SELECT nextval(pg_get_serial_sequence('\"%s\"', 'id')) "
+            "FROM generate_series(1, :n)" % table.name, {'n': n})]
+
+    # No sequences: fine for a single-writer development database
+    last = db.session.execute(db.select([db.func.max(table.c.id)])).scalar() or 0
+    return list(range(last + 1, last + 1 + n))
+
+
+#----------------------------------------------------------------------------#
+# Chunks
+#----------------------------------------------------------------------------#
+def import_entities(model, chunk: List[Dict], first_row: int):
+    """Copy a chunk of venues or artists with their contacts and genre links."""
+
+    contact_ids = reserve_ids(Contact.__table__, len(chunk))
+    entity_ids = reserve_ids(model.__table__, len(chunk))
+    genre_ids = dict(db.session.query(Genre.name, Genre.id))
+
+    contacts = []
+    entities = []
+    links = []
+    states = set()
+
+    for n, (row, contact_id, entity_id) in enumerate(zip(chunk, contact_ids, entity_ids),
+                                                     first_row):
+        name = row.get('name')
+        if name is not None and not isinstance(name, str):
+            raise InvalidRow(n, 'name must be a string')
+
+        name = (name or '').strip()
+        if not name:
+            raise InvalidRow(n, 'name is required')
+
+        try:
+            genres = set(genres_of(row.get('genres')))
+        except ValueError as e:
+            raise InvalidRow(n, str(e))
+
+        for genre in genres:
+            if genre not in genre_ids:
+                raise InvalidRow(n, 'unknown genre %r' % genre)
+            links.append([genre_ids[genre], entity_id])
+
+        try:
+            position = geo.place(row.get('city'), row.get('state'),
+                                 coordinate(row.get('latitude'), 90),
+                                 coordinate(row.get('longitude'), 180))
+        except (TypeError, ValueError):
+            raise InvalidRow(n, 'latitude and longitude must be numbers of degrees')
+
+        contacts.append([contact_id] + [row.get(f) or None for f in CONTACT_FIELDS]
+                        + list(position))
+        entities.append([entity_id, name, contact_id])
+        states.add(row.get('state') or None)
+
+    links_table = venue_genres if model is Venue else artist_genres
+    entity_key = 'venue_id' if model is Venue else 'artist_id'
+
+    copy_rows(Contact.__table__, ['id'] + CONTACT_FIELDS + GEO_FIELDS, contacts)
+    copy_rows(model.__table__, ['id', 'name', 'contact_id'], entities)
+    copy_rows(links_table, ['genre_id', entity_key], links)
+
+    # COPY skips the session's facet bookkeeping too
+    recount_facets(db.session.connection(), 'venues' if model is Venue else 'artists', states)
+
+    db.session.commit()
+
+
+def resolve(model, chunk: List[Dict], id_key: str, name_key: str,
+            first_row: int) -> List[int]:
+    """Ids referenced by every row of a chunk, checked in a single query."""
+
+    # Each row's reference: (id, None) or (None, name)
+    references = []
+
+    for n, row in enumerate(chunk, first_row):
+        if row.get(id_key) not in (None, ''):
+            try:
+                references.append((whole_number(row[id_key]), None))
+            except ValueError:
+                raise InvalidRow(n, '%s must be an integer' % id_key)
+
+        elif row.get(name_key):
+            if not isinstance(row[name_key], str):
+                raise InvalidRow(n, '%s must be a string' % name_key)
+            references.append((None, row[name_key]))
+
+        else:
+            raise InvalidRow(n, '%s or %s is required' % (id_key, name_key))
+
+    ids = {id for id, _ in references if id is not None}
+    names = {name for _, name in references if name is not None}
+
+    found = (db.session.query(model.id, model.name)
+             .filter(db.or_(model.id.in_(ids), model.name.in_(names)))
+             .all())
+
+    existing = {id for id, _ in found}
+    by_name: Dict[str, List[int]] = {}
+    for id, name in found:
+        if name in names:
+            by_name.setdefault(name, []).append(id)
+
+    resolved = []
+    for n, (id, name) in enumerate(references, first_row):
+        if id is not None:
+            if id not in existing:
+                raise InvalidRow(n, 'no %s with id %s' % (name_key, id))
+            resolved.append(id)
+
+        else:
+            matches = by_name.get(name, [])
+            if len(matches) != 1:
+                raise InvalidRow(n, '%s %r matches %d rows, use %s'
+                                 % (name_key, name, len(matches), id_key))
+            resolved.append(matches[0])
+
+    return resolved
+
+
+def import_shows(chunk: List[Dict], first_row: int) -> Dict[str, Set]:
+    """Copy a chunk of shows, then recount the counters they bypassed."""
+
+    artist_ids = resolve(Artist, chunk, 'artist_id', 'artist', first_row)
+    venue_ids = resolve(Venue, chunk, 'venue_id', 'venue', first_row)
+
+    shows = []
+    for n, (row, artist_id, venue_id) in enumerate(zip(chunk, artist_ids, venue_ids), first_row):
+        try:
+            start = dt.fromisoformat(str(row.get('start') or '').strip())
+        except ValueError:
+            raise InvalidRow(n, 'start must be an ISO date and time, got %r' % row.get('start'))
+
+        try:
+            end = dt.fromisoformat(str(row['end']).strip()) if row.get('end') else None
+        except ValueError:
+            raise InvalidRow(n, 'end must be an ISO date and time, got %r' % row.get('end'))
+
+        try:
+            minutes = whole_number(row['duration']) if row.get('duration') not in (None, '') else None
+        except ValueError:
+            raise InvalidRow(n, 'duration must be a number of minutes')
+
+        try:
+            end = bookings.end_of(start, end, minutes)
+        except ValueError as e:
+            raise InvalidRow(n, str(e))
+
+        shows.append([start, end, artist_id, venue_id])
+
+    # Overlaps with booked shows and within the chunk, in one query; on
+    # PostgreSQL the exclusion constraints would only reject the whole COPY
+    conflict = bookings.check_bookings([(venue_id, artist_id, start, end)
+                                        for start, end, artist_id, venue_id in shows])
+    if conflict is not None:
+        i, e = conflict
+        raise InvalidRow(first_row + i, str(e))
+
+    # Ids of the chunk's own: shows created meanwhile never share them
+    ids = reserve_ids(Show.__table__, len(shows))
+
+    copy_rows(Show.__table__, ['id', 'start', 'end', 'artist_id', 'venue_id'],
+              [[id] + show for id, show in zip(ids, shows)])
+
+    # COPY skips the session's show card sync...
+    db.session.connection().execute(ShowCard.__table__.insert().from_select(
+        CARD_COLUMNS, card_rows().where(Show.id.in_(ids))))
+
+    # ... and the Show mapper events: commits this chunk too
+    counters.recount_show_counters(set(venue_ids), set(artist_ids))
+
+    return {'artists': set(artist_ids), 'venues': set(venue_ids)}
+
+
+def import_catalog(kind: str, rows: Iterable[Dict],
+                   chunk_size: int = CHUNK_SIZE) -> Dict:
+    """Import venues, artists or shows in chunked transactions.
+
+    Returns the number of rows and chunks, elapsed seconds, throughput and
+    the cache tags of everything touched. On an invalid row, the chunk it
+    belongs to is rolled back and InvalidRow raised; earlier chunks stay.
+    """
+
+    if kind not in KINDS:
+        raise ValueError('Unknown import kind %r' % kind)
+
+    started = time.perf_counter()
+    imported = 0
+    n_chunks = 0
+    tags: Set[str] = {kind}
+
+    try:
+        for chunk in chunks(rows, chunk_size):
+            if kind == 'shows':
+                touched = import_shows(chunk, imported + 1)
+                tags.update('artist:%d' % id for id in touched['artists'])
+                tags.update('venue:%d' % id for id in touched['venues'])
+
+            else:
+                import_entities(Venue if kind == 'venues' else Artist, chunk, imported + 1)
+
+            imported += len(chunk)
+            n_chunks += 1
+
+    except InvalidRow as e:
+        db.session.rollback()
+        e.imported = imported
+        e.tags = sorted(tags) if imported else []
+        raise
+
+    except Exception:
+        db.session.rollback()
+        raise
+
+    seconds = time.perf_counter() - started
+
+    return {
+        'kind': kind,
+        'rows': imported,
+        'chunks': n_chunks,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(imported / seconds) if seconds else imported,
+        'tags': sorted(tags) if imported else [],
+    }
+
+
+def import_stream(kind: str, stream: TextIO, format: str,
+                  chunk_size: Optional[int] = None) -> Dict:
+    """import_catalog() over a CSV or NDJSON text stream."""
+
+    return import_catalog(kind, read_rows(stream, format), chunk_size or CHUNK_SIZE)
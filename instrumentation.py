@@ -0,0 +1,175 @@
+# pyright: reportGeneralTypeIssues=false
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+from bisect import bisect_left
+from threading import Lock
+from flask import Response
+from flask import before_render_template
+from flask import g
+from flask import has_request_context
+from flask import request
+from flask import template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import time
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Dict
+from typing import List
+from typing import Sequence
+from typing import Tuple
+
+
+#----------------------------------------------------------------------------#
+# Histograms
+#----------------------------------------------------------------------------#
+class Histogram:
+    """Cumulative-bucket histogram per endpoint, Prometheus style."""
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.buckets = sorted(buckets)
+        self.series: Dict[str, Tuple[List[int], List[float]]] = {}
+        self.lock = Lock()
+
+    def observe(self, endpoint: str, value: float):
+        with self.lock:
+            counts, total = self.series.setdefault(
+                endpoint, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def expose(self) -> List[str]:
+        lines = ['# HELP %s %s' % (self.name, self.help),
+                 '# TYPE %s histogram' % self.name]
+
+        with self.lock:
+            for endpoint, (counts, total) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + [float('inf')], counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append('%s_bucket{endpoint="%s",le="%s"} %d'
+                                 % (self.name, endpoint, le, cumulative))
+                lines.append('%s_sum{endpoint="%s"} %r' % (self.name, endpoint, total[0]))
+                lines.append('%s_count{endpoint="%s"} %d' % (self.name, endpoint, cumulative))
+
+        return lines
+
+
+SECONDS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5]
+
+request_seconds = Histogram(
+    'fyyur_request_duration_seconds', 'Wall time spent handling a request.', SECONDS)
+db_seconds = Histogram(
+    'fyyur_request_db_seconds', 'Time spent executing SQL per request.', SECONDS)
+render_seconds = Histogram(
+    'fyyur_request_render_seconds', 'Time spent rendering templates per request.', SECONDS)
+statements = Histogram(
+    'fyyur_request_statements', 'SQL statements issued per request.',
+    [0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000])
+response_bytes = Histogram(
+    'fyyur_response_size_bytes', 'Size of response bodies.',
+    [1024, 4096, 16384, 65536, 262144, 1048576, 4194304])
+
+HISTOGRAMS = [request_seconds, db_seconds, render_seconds, statements, response_bytes]
+
+
+#----------------------------------------------------------------------------#
+# Hooks
+#----------------------------------------------------------------------------#
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_started'] = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('query_started', None)
+
+    if has_request_context() and 'metrics' in g and started is not None:
+        g.metrics['statements'] += 1
+        g.metrics['db'] += time.perf_counter() - started
+
+
+def start_render(sender, template, context, **extra):
+    if 'metrics' in g:
+        g.metrics['rendering'].append(time.perf_counter())
+
+
+def end_render(sender, template, context, **extra):
+    if 'metrics' in g and g.metrics['rendering']:
+        g.metrics['render'] += time.perf_counter() - g.metrics['rendering'].pop()
+
+
+def start_request():
+    g.metrics = {
+        'started': time.perf_counter(),
+        'statements': 0,
+        'db': 0.0,
+        'render': 0.0,
+        'rendering': [],
+    }
+
+
+def make_finish_request(app):
+
+    def finish_request(response):
+        metrics = g.pop('metrics', None)
+
+        if metrics is None:
+            return response
+
+        endpoint = request.endpoint or 'unmatched'
+
+        request_seconds.observe(endpoint, time.perf_counter() - metrics['started'])
+        db_seconds.observe(endpoint, metrics['db'])
+        render_seconds.observe(endpoint, metrics['render'])
+        statements.observe(endpoint, metrics['statements'])
+
+        # Streamed bodies have no length yet
+        if response.content_length is not None:
+            response_bytes.observe(endpoint, response.content_length)
+
+        budget = app.config.get('QUERY_BUDGET')
+        if budget is not None and metrics['statements'] > budget:
+            app.logger.warning('%s %s issued %d SQL statements (budget %d, %.1f ms in the database)',
+                               request.method, request.full_path,
+                               metrics['statements'], budget, metrics['db'] * 1000)
+
+        return response
+
+    return finish_request
+
+
+def metrics():
+    """Prometheus text exposition of this process's histograms."""
+
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.expose())
+
+    return Response('\n'.join(lines) + '\n',
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_app(app):
+    """Record statements, DB, render and response metrics for every request."""
+
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    # Every engine, including ones created after this call
+    if not event.contains(Engine, 'before_cursor_execute', before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+
+    before_render_template.connect(start_render, app)
+    template_rendered.connect(end_render, app)
+
+    app.before_request(start_request)
+    app.after_request(make_finish_request(app))
+
+    app.add_url_rule('/metrics', 'metrics', metrics)
@@ -0,0 +1,74 @@
+"""base schema
+
+Revision ID: 1d6f3c0e2b47
+Revises: c5c402adfd4d
+Create Date: 2022-01-12 09:27:13.655104
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '1d6f3c0e2b47'
+down_revision = 'c5c402adfd4d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases made by db.create_all() already have some or all of these
+    # tables, with their rows: create only the missing ones
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'Contact' not in existing:
+        op.create_table('Contact',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('address', sa.String(length=120), nullable=True),
+        sa.Column('city', sa.String(length=120), nullable=True),
+        sa.Column('phone', sa.String(length=120), nullable=True),
+        sa.Column('state', sa.String(length=120), nullable=True),
+        sa.Column('facebook_link', sa.String(length=120), nullable=True),
+        sa.Column('website_link', sa.String(length=120), nullable=True),
+        sa.Column('image_link', sa.String(length=120), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'Artist' not in existing:
+        op.create_table('Artist',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('genres', postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column('contact_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['contact_id'], ['Contact.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'Venue' not in existing:
+        op.create_table('Venue',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('genres', postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column('contact_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['contact_id'], ['Contact.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'Show' not in existing:
+        op.create_table('Show',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('start', sa.DateTime(), nullable=True),
+        sa.Column('artist_id', sa.Integer(), nullable=False),
+        sa.Column('venue_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['artist_id'], ['Artist.id'], ),
+        sa.ForeignKeyConstraint(['venue_id'], ['Venue.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('Show')
+    op.drop_table('Venue')
+    op.drop_table('Artist')
+    op.drop_table('Contact')
@@ -0,0 +1,45 @@
+"""search indexes
+
+Revision ID: 3f1b2a9c7d10
+Revises: 1d6f3c0e2b47
+Create Date: 2022-02-07 19:12:04.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1b2a9c7d10'
+down_revision = '1d6f3c0e2b47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Trigram operator classes for substring and similarity search
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    op.create_index('ix_Venue_name_trgm', 'Venue', ['name'],
+                    postgresql_using='gin',
+                    postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_Artist_name_trgm', 'Artist', ['name'],
+                    postgresql_using='gin',
+                    postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_Contact_city_trgm', 'Contact', ['city'],
+                    postgresql_using='gin',
+                    postgresql_ops={'city': 'gin_trgm_ops'})
+    op.create_index('ix_Contact_state', 'Contact', ['state'])
+    op.create_index('ix_Venue_genres', 'Venue', ['genres'],
+                    postgresql_using='gin')
+    op.create_index('ix_Artist_genres', 'Artist', ['genres'],
+                    postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_Artist_genres', table_name='Artist')
+    op.drop_index('ix_Venue_genres', table_name='Venue')
+    op.drop_index('ix_Contact_state', table_name='Contact')
+    op.drop_index('ix_Contact_city_trgm', table_name='Contact')
+    op.drop_index('ix_Artist_name_trgm', table_name='Artist')
+    op.drop_index('ix_Venue_name_trgm', table_name='Venue')
@@ -0,0 +1,49 @@
+"""contact positions and geohash index
+
+Revision ID: 4c8a2f6d1b39
+Revises: e2b8d4f6a913
+Create Date: 2022-03-26 11:08:37.514820
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import geo
+
+
+# revision identifiers, used by Alembic.
+revision = '4c8a2f6d1b39'
+down_revision = 'e2b8d4f6a913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('Contact', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('Contact', sa.Column('longitude', sa.Float(), nullable=True))
+    op.add_column('Contact', sa.Column('geohash', sa.String(length=geo.PRECISION), nullable=True))
+
+    # Existing contacts sit at their city's centre: one UPDATE per city
+    # the offline table knows, before the index is built
+    connection = op.get_bind()
+    contact = sa.table('Contact', sa.column('city'), sa.column('state'),
+                       sa.column('latitude'), sa.column('longitude'), sa.column('geohash'))
+
+    for city, state in connection.execute(
+            sa.select([contact.c.city, contact.c.state]).distinct()).fetchall():
+        latitude, longitude, geohash = geo.place(city, state)
+        if geohash is None:
+            continue
+
+        connection.execute(contact.update()
+                           .where(contact.c.city == city)
+                           .where(contact.c.state == state)
+                           .values(latitude=latitude, longitude=longitude, geohash=geohash))
+
+    op.create_index('ix_Contact_geohash', 'Contact', ['geohash'])
+
+
+def downgrade():
+    op.drop_index('ix_Contact_geohash', table_name='Contact')
+    op.drop_column('Contact', 'geohash')
+    op.drop_column('Contact', 'longitude')
+    op.drop_column('Contact', 'latitude')
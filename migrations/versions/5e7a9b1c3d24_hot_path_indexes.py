@@ -0,0 +1,33 @@
+"""hot path indexes
+
+Revision ID: 5e7a9b1c3d24
+Revises: b91e07d3c5a2
+Create Date: 2022-02-26 10:21:48.530117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e7a9b1c3d24'
+down_revision = 'b91e07d3c5a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Detail pages and counter recounts: a venue's or artist's shows by date
+    op.create_index('ix_Show_venue_id_start', 'Show', ['venue_id', 'start'])
+    op.create_index('ix_Show_artist_id_start', 'Show', ['artist_id', 'start'])
+
+    # Area lookups by state, then city; also serves state alone
+    op.create_index('ix_Contact_state_city', 'Contact', ['state', 'city'])
+    op.drop_index('ix_Contact_state', table_name='Contact')
+
+
+def downgrade():
+    op.create_index('ix_Contact_state', 'Contact', ['state'])
+    op.drop_index('ix_Contact_state_city', table_name='Contact')
+    op.drop_index('ix_Show_artist_id_start', table_name='Show')
+    op.drop_index('ix_Show_venue_id_start', table_name='Show')
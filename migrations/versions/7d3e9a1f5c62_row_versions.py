@@ -0,0 +1,35 @@
+"""row versions for conditional detail pages
+
+Revision ID: 7d3e9a1f5c62
+Revises: 4c8a2f6d1b39
+Create Date: 2022-04-02 09:51:24.630118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3e9a1f5c62'
+down_revision = '4c8a2f6d1b39'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ('Venue', 'Artist', 'Contact', 'Show')
+
+
+def upgrade():
+    # Existing rows start at version 1, updated now; COPY imports rely on
+    # the same server defaults
+    for table in TABLES:
+        op.add_column(table, sa.Column('version', sa.Integer(), nullable=False,
+                                       server_default='1'))
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=False,
+                                       server_default=sa.func.now()))
+
+
+def downgrade():
+    for table in TABLES:
+        op.drop_column(table, 'updated_at')
+        op.drop_column(table, 'version')
@@ -0,0 +1,29 @@
+"""keyset indexes
+
+Revision ID: 8c2d4e6f1a3b
+Revises: 3f1b2a9c7d10
+Create Date: 2022-02-12 16:40:51.902733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c2d4e6f1a3b'
+down_revision = '3f1b2a9c7d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Listings page on these sort keys: keep each page an index range scan
+    op.create_index('ix_Show_start_id', 'Show', ['start', 'id'])
+    op.create_index('ix_Venue_name_id', 'Venue', ['name', 'id'])
+    op.create_index('ix_Artist_name_id', 'Artist', ['name', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_Artist_name_id', table_name='Artist')
+    op.drop_index('ix_Venue_name_id', table_name='Venue')
+    op.drop_index('ix_Show_start_id', table_name='Show')
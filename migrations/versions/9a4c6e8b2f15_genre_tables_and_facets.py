@@ -0,0 +1,100 @@
+"""genre tables and facet counts
+
+Revision ID: 9a4c6e8b2f15
+Revises: 5e7a9b1c3d24
+Create Date: 2022-03-05 14:37:12.664051
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4c6e8b2f15'
+down_revision = '5e7a9b1c3d24'
+branch_labels = None
+depends_on = None
+
+
+GENRES = [
+    'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk',
+    'Funk', 'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz',
+    'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul',
+    'Other',
+]
+
+LINKS = (('Venue', 'VenueGenre', 'venue_id'), ('Artist', 'ArtistGenre', 'artist_id'))
+
+
+def upgrade():
+    genre = op.create_table('Genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.bulk_insert(genre, [{'name': name} for name in GENRES])
+
+    for table, links, entity_id in LINKS:
+        op.create_table(links,
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.Column(entity_id, sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ),
+        sa.ForeignKeyConstraint([entity_id], [table + '.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('genre_id', entity_id)
+        )
+        op.create_index('ix_%s_%s' % (links, entity_id), links, [entity_id])
+
+        # Genres outside the vocabulary keep existing, as rows of their own
+        op.execute('''INSERT INTO "Genre" (name)
+                      SELECT DISTINCT unnest(genres) FROM "%s"
+                      ON CONFLICT (name) DO NOTHING''' % table)
+        op.execute('''INSERT INTO "%s" (genre_id, %s)
+                      SELECT DISTINCT g.id, t.id FROM "%s" t
+                      JOIN "Genre" g ON g.name = ANY(t.genres)''' % (links, entity_id, table))
+
+        op.drop_index('ix_%s_genres' % table, table_name=table)
+        op.drop_column(table, 'genres')
+
+    op.create_table('FacetCount',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('state', sa.String(length=120), nullable=True),
+    sa.Column('genre_id', sa.Integer(), nullable=True),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_FacetCount_kind_state', 'FacetCount', ['kind', 'state'])
+    op.create_index('ix_FacetCount_kind_genre_id', 'FacetCount', ['kind', 'genre_id'])
+
+    for (table, links, entity_id), kind in zip(LINKS, ('venues', 'artists')):
+        op.execute('''INSERT INTO "FacetCount" (kind, state, genre_id, count)
+                      SELECT '%s', c.state, l.genre_id, count(*)
+                      FROM "%s" t JOIN "Contact" c ON t.contact_id = c.id
+                      JOIN "%s" l ON l.%s = t.id
+                      GROUP BY c.state, l.genre_id''' % (kind, table, links, entity_id))
+        op.execute('''INSERT INTO "FacetCount" (kind, state, genre_id, count)
+                      SELECT '%s', c.state, NULL, count(*)
+                      FROM "%s" t JOIN "Contact" c ON t.contact_id = c.id
+                      GROUP BY c.state''' % (kind, table))
+
+
+def downgrade():
+    op.drop_index('ix_FacetCount_kind_genre_id', table_name='FacetCount')
+    op.drop_index('ix_FacetCount_kind_state', table_name='FacetCount')
+    op.drop_table('FacetCount')
+
+    for table, links, entity_id in LINKS:
+        op.add_column(table, sa.Column('genres', postgresql.ARRAY(sa.String()), nullable=True))
+        op.execute('''UPDATE "%s" t SET genres = (
+                          SELECT array_agg(g.name ORDER BY g.name)
+                          FROM "%s" l JOIN "Genre" g ON g.id = l.genre_id
+                          WHERE l.%s = t.id)''' % (table, links, entity_id))
+        op.create_index('ix_%s_genres' % table, table, ['genres'], postgresql_using='gin')
+
+        op.drop_index('ix_%s_%s' % (links, entity_id), table_name=links)
+        op.drop_table(links)
+
+    op.drop_table('Genre')
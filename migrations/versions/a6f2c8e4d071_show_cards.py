@@ -0,0 +1,59 @@
+"""show cards read model for /shows
+
+Revision ID: a6f2c8e4d071
+Revises: 7d3e9a1f5c62
+Create Date: 2022-04-09 14:27:53.308416
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6f2c8e4d071'
+down_revision = '7d3e9a1f5c62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ShowCard',
+        sa.Column('show_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('start', sa.DateTime(), nullable=True),
+        sa.Column('end', sa.DateTime(), nullable=True),
+        sa.Column('venue_id', sa.Integer(), nullable=False),
+        sa.Column('venue_name', sa.String(), nullable=True),
+        sa.Column('venue_city', sa.String(length=120), nullable=True),
+        sa.Column('venue_state', sa.String(length=120), nullable=True),
+        sa.Column('artist_id', sa.Integer(), nullable=False),
+        sa.Column('artist_name', sa.String(), nullable=True),
+        sa.Column('artist_image_link', sa.String(length=120), nullable=True),
+        sa.ForeignKeyConstraint(['show_id'], ['Show.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('show_id'),
+    )
+
+    # Every existing show, before the indexes are built
+    op.execute('''
+        INSERT INTO "ShowCard" (show_id, start, "end", venue_id, venue_name, venue_city,
+                                venue_state, artist_id, artist_name, artist_image_link)
+        SELECT s.id, s.start, s."end", s.venue_id, v.name, vc.city,
+               vc.state, s.artist_id, a.name, ac.image_link
+        FROM "Show" s
+        JOIN "Venue" v ON v.id = s.venue_id
+        JOIN "Artist" a ON a.id = s.artist_id
+        LEFT JOIN "Contact" vc ON vc.id = v.contact_id
+        LEFT JOIN "Contact" ac ON ac.id = a.contact_id
+    ''')
+
+    op.create_index('ix_ShowCard_start_show_id', 'ShowCard', ['start', 'show_id'])
+    op.create_index('ix_ShowCard_venue_state_start', 'ShowCard',
+                    ['venue_state', 'start', 'show_id'])
+    op.create_index('ix_ShowCard_venue_city_trgm', 'ShowCard', ['venue_city'],
+                    postgresql_using='gin',
+                    postgresql_ops={'venue_city': 'gin_trgm_ops'})
+    op.create_index('ix_ShowCard_venue_id', 'ShowCard', ['venue_id'])
+    op.create_index('ix_ShowCard_artist_id', 'ShowCard', ['artist_id'])
+
+
+def downgrade():
+    op.drop_table('ShowCard')
@@ -0,0 +1,51 @@
+"""show counters
+
+Revision ID: b91e07d3c5a2
+Revises: 8c2d4e6f1a3b
+Create Date: 2022-02-20 11:05:37.410289
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b91e07d3c5a2'
+down_revision = '8c2d4e6f1a3b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('Venue', 'Artist'):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(),
+                                       server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(),
+                                       server_default='0', nullable=False))
+
+    op.create_table('ShowCounterWatermark',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('rolled_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # Backfill from the existing shows and start rolling from now
+    op.execute("INSERT INTO \"ShowCounterWatermark\" (id, rolled_at) VALUES (1, localtimestamp)")
+    for table, column in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+        op.execute('''
+            UPDATE "{table}" SET
+                upcoming_shows_count = (SELECT count(*) FROM "Show"
+                                        WHERE "Show".{column} = "{table}".id
+                                        AND "Show".start > localtimestamp),
+                past_shows_count = (SELECT count(*) FROM "Show"
+                                    WHERE "Show".{column} = "{table}".id
+                                    AND "Show".start <= localtimestamp)
+        '''.format(table=table, column=column))
+
+
+def downgrade():
+    op.drop_table('ShowCounterWatermark')
+
+    for table in ('Artist', 'Venue'):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
@@ -17,12 +17,10 @@ depends_on = None
 
 
 def upgrade():
-    # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_table('Artist')
-    op.drop_table('Contact')
-    op.drop_table('Show')
-    op.drop_table('Venue')
-    # ### end Alembic commands ###
+    # Nothing to do: tables created by db.create_all() (at import time, in
+    # older versions of the app) are kept, and the next revision creates
+    # only those missing
+    pass
 
 
 def downgrade():
@@ -0,0 +1,62 @@
+"""show durations and booking exclusion constraints
+
+Revision ID: e2b8d4f6a913
+Revises: 9a4c6e8b2f15
+Create Date: 2022-03-19 16:42:11.207358
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b8d4f6a913'
+down_revision = '9a4c6e8b2f15'
+branch_labels = None
+depends_on = None
+
+
+# Constraint name -> column whose shows may not overlap
+EXCLUSIONS = {
+    'ex_Show_venue_overlap': 'venue_id',
+    'ex_Show_artist_overlap': 'artist_id',
+}
+
+
+def upgrade():
+    op.add_column('Show', sa.Column('end', sa.DateTime(), nullable=True))
+
+    # Existing shows last two hours, cut short where the venue's or the
+    # artist's next show starts sooner; a show sharing its start with
+    # another gets no end, which leaves it out of the constraints below.
+    op.execute('''
+        UPDATE "Show" SET "end" = b.finish
+        FROM (
+            SELECT id,
+                   NULLIF(LEAST(start + interval '2 hours',
+                                lead(start) OVER (PARTITION BY venue_id ORDER BY start, id),
+                                lead(start) OVER (PARTITION BY artist_id ORDER BY start, id)),
+                          start) AS finish
+            FROM "Show"
+            WHERE start IS NOT NULL
+        ) b
+        WHERE "Show".id = b.id
+    ''')
+
+    op.create_check_constraint('ck_Show_end_after_start', 'Show', '"end" > start')
+
+    # Equality on the ids inside a GiST index needs btree_gist
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+
+    for name, column in EXCLUSIONS.items():
+        op.execute('ALTER TABLE "Show" ADD CONSTRAINT "%s" EXCLUDE USING gist '
+                   '(%s WITH =, tsrange(start, "end") WITH &&) '
+                   'WHERE (start IS NOT NULL AND "end" IS NOT NULL)' % (name, column))
+
+
+def downgrade():
+    for name in EXCLUSIONS:
+        op.drop_constraint(name, 'Show')
+
+    op.drop_constraint('ck_Show_end_after_start', 'Show', type_='check')
+    op.drop_column('Show', 'end')
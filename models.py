@@ -1,29 +1,159 @@
 # pyright: reportGeneralTypeIssues=false
 
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime as dt
+from datetime import timedelta
+from sqlalchemy import DDL
+from sqlalchemy import case
+from sqlalchemy import event
+from sqlalchemy import exc
+from sqlalchemy import func
+from sqlalchemy.ext.associationproxy import association_proxy
+from sqlalchemy.orm import Session
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm import attributes
+from sqlalchemy.pool import Pool
+from routing import RoutingSQLAlchemy
+import geo
+import os
 
-# Instantiate flask app
-app = Flask(__name__)
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+from typing import Set
 
-# Add external app's configuration
-app.config.from_object('config')
+# Instantiate DB abstraction/integration, bound by app.create_app(); its
+# sessions read from a replica during read-only requests (see routing.py)
+db = RoutingSQLAlchemy()
 
-# Instantiate DB abstraction/integration
-db = SQLAlchemy(app)
+
+# Pooled connections must never cross a fork: a worker that inherited its
+# parent's pool drops those connections (without closing the sockets the
+# parent still uses) and opens its own.
+@event.listens_for(Pool, 'connect')
+def remember_pid(dbapi_connection, connection_record):
+    connection_record.info['pid'] = os.getpid()
+
+
+@event.listens_for(Pool, 'checkout')
+def check_pid(dbapi_connection, connection_record, connection_proxy):
+    if connection_record.info.get('pid', os.getpid()) != os.getpid():
+        connection_record.connection = connection_proxy.connection = None
+        raise exc.DisconnectionError('Connection belongs to pid %d, not %d'
+                                     % (connection_record.info['pid'], os.getpid()))
+
+
+# Trigram indexes below need pg_trgm before any table is created
+event.listen(db.metadata,
+             'before_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+
+
+# Genre vocabulary offered by the forms, and the initial rows of Genre
+GENRES = [
+    'Alternative',
+    'Blues',
+    'Classical',
+    'Country',
+    'Electronic',
+    'Folk',
+    'Funk',
+    'Hip-Hop',
+    'Heavy Metal',
+    'Instrumental',
+    'Jazz',
+    'Musical Theatre',
+    'Pop',
+    'Punk',
+    'R&B',
+    'Reggae',
+    'Rock n Roll',
+    'Soul',
+    'Other',
+]
+
+
+class Genre(db.Model):
+    __tablename__ = 'Genre'
+
+    id = db.Column(db.Integer, primary_key = True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    @classmethod
+    def named(cls, name: str) -> 'Genre':
+        """The genre called name, created if it is not in the table yet."""
+
+        with db.session.no_autoflush:
+            genre = cls.query.filter_by(name=name).one_or_none()
+
+        return genre or cls(name=name)
+
+
+@event.listens_for(Genre.__table__, 'after_create')
+def insert_genres(table, connection, **kw):
+    connection.execute(table.insert(), [{'name': name} for name in GENRES])
+
+
+# One row per (entity, genre); the (genre_id, ...) primary key finds every
+# venue or artist of a genre with an index range scan.
+venue_genres = db.Table('VenueGenre',
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True),
+    db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_VenueGenre_venue_id', 'venue_id'),
+)
+
+artist_genres = db.Table('ArtistGenre',
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True),
+    db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_ArtistGenre_artist_id', 'artist_id'),
+)
 
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    __table_args__ = (
+        db.Index('ix_Artist_name_trgm', 'name',
+                 postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_Artist_name_id', 'name', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key = True)
     name = db.Column(db.String)
-    genres = db.Column(db.ARRAY(db.String))
     contact_id = db.Column(db.Integer, db.ForeignKey('Contact.id'))
 
+    # Bumped by touch_versions on every change: the detail pages' validators
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, nullable=False, default=dt.now, server_default=func.now())
+
+    # Genre rows, and their names as a plain list: artist.genres = ['Jazz']
+    genre_rows = db.relationship('Genre', secondary=artist_genres, order_by='Genre.name')
+    genres = association_proxy('genre_rows', 'name', creator=Genre.named)
+
+    # Maintained by the Show events below and by counters.roll_show_counters()
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # Contact is one row per artist: fetch it in the same SELECT
+    contact = db.relationship('Contact', lazy='joined')
+
+    # Shows are potentially many: loaded on demand, or with selectinload()
+    shows = db.relationship('Show',
+                            back_populates='artist',
+                            order_by='Show.start')
+
 
 class Contact(db.Model):
     __tablename__ = 'Contact'
+    __table_args__ = (
+        db.Index('ix_Contact_city_trgm', 'city',
+                 postgresql_using='gin',
+                 postgresql_ops={'city': 'gin_trgm_ops'}),
+        db.Index('ix_Contact_state_city', 'state', 'city'),
+        db.Index('ix_Contact_geohash', 'geohash'),
+    )
 
     id = db.Column(db.Integer, primary_key = True)
     address = db.Column(db.String(120))
@@ -34,27 +164,479 @@ class Contact(db.Model):
     website_link = db.Column(db.String(120))
     image_link = db.Column(db.String(120))
 
+    # Bumped by touch_versions on every change: the detail pages' validators
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, nullable=False, default=dt.now, server_default=func.now())
+
+    # Kept by place_contact from the city and state, unless given
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geohash = db.Column(db.String(geo.PRECISION))
+
+
+@event.listens_for(Contact, 'before_insert')
+@event.listens_for(Contact, 'before_update')
+def place_contact(mapper, connection, target):
+    """Geocode a contact offline, and index its position by geohash."""
+
+    moved = (attributes.get_history(target, 'latitude').has_changes()
+             or attributes.get_history(target, 'longitude').has_changes())
+
+    relocated = (attributes.get_history(target, 'city').has_changes()
+                 or attributes.get_history(target, 'state').has_changes())
+
+    # A new or relocated contact without its own position: the city's
+    if relocated and not moved:
+        target.latitude = target.longitude = None
+
+    target.latitude, target.longitude, target.geohash = geo.place(
+        target.city, target.state, target.latitude, target.longitude)
+
+
+# Length of a show given no end, and the longest one accepted; the bound
+# lets overlap checks scan only [start - SHOW_MAX_DURATION, end) by index.
+SHOW_DURATION = timedelta(hours=2)
+SHOW_MAX_DURATION = timedelta(hours=24)
+
 
 class Show(db.Model):
     __tablename__ = 'Show'
+    __table_args__ = (
+        db.Index('ix_Show_start_id', 'start', 'id'),
+        db.Index('ix_Show_venue_id_start', 'venue_id', 'start'),
+        db.Index('ix_Show_artist_id_start', 'artist_id', 'start'),
+        db.CheckConstraint('"end" > start', name='ck_Show_end_after_start'),
+    )
 
     id = db.Column(db.Integer, primary_key = True)
-    start = db.Column(db.DateTime)
-    artist_id = db.Column(db.Integer,
-                          db.ForeignKey('Artist.id'),
-                          nullable=False)
-    venue_id = db.Column(db.Integer,
-                         db.ForeignKey('Venue.id'),
-                         nullable=False)
+
+    # Old values are loaded on change so counter events can move the show
+    start = db.column_property(db.Column(db.DateTime), active_history=True)
+
+    # Bookings are [start, end): a show may begin as the previous one ends
+    end = db.Column(db.DateTime)
+    artist_id = db.column_property(db.Column(db.Integer,
+                                             db.ForeignKey('Artist.id'),
+                                             nullable=False),
+                                   active_history=True)
+    venue_id = db.column_property(db.Column(db.Integer,
+                                            db.ForeignKey('Venue.id'),
+                                            nullable=False),
+                                  active_history=True)
+
+    # Bumped by touch_versions on every change: the detail pages' validators
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, nullable=False, default=dt.now, server_default=func.now())
+
+    # A show is always displayed with its counterparts: join them in
+    artist = db.relationship('Artist', back_populates='shows', lazy='joined')
+    venue = db.relationship('Venue', back_populates='shows', lazy='joined')
+
+
+# No two shows of a venue, or of an artist, may overlap. GiST exclusion
+# constraints enforce it on PostgreSQL, race-free; bookings.py checks it
+# everywhere else and turns violations into form errors.
+SHOW_EXCLUSIONS = {
+    'ex_Show_venue_overlap': 'venue_id',
+    'ex_Show_artist_overlap': 'artist_id',
+}
+
+event.listen(Show.__table__,
+             'after_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS btree_gist').execute_if(dialect='postgresql'))
+
+for name, column in SHOW_EXCLUSIONS.items():
+    event.listen(Show.__table__,
+                 'after_create',
+                 DDL('ALTER TABLE "Show" ADD CONSTRAINT "%s" EXCLUDE USING gist '
+                     '(%s WITH =, tsrange(start, "end") WITH &&) '
+                     'WHERE (start IS NOT NULL AND "end" IS NOT NULL)' % (name, column))
+                 .execute_if(dialect='postgresql'))
 
 
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    __table_args__ = (
+        db.Index('ix_Venue_name_trgm', 'name',
+                 postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_Venue_name_id', 'name', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key = True)
     name = db.Column(db.String)
-    genres = db.Column(db.ARRAY(db.String))
     contact_id = db.Column(db.Integer, db.ForeignKey('Contact.id'))
 
+    # Bumped by touch_versions on every change: the detail pages' validators
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, nullable=False, default=dt.now, server_default=func.now())
+
+    # Genre rows, and their names as a plain list: venue.genres = ['Jazz']
+    genre_rows = db.relationship('Genre', secondary=venue_genres, order_by='Genre.name')
+    genres = association_proxy('genre_rows', 'name', creator=Genre.named)
+
+    # Maintained by the Show events below and by counters.roll_show_counters()
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # Contact is one row per venue: fetch it in the same SELECT
+    contact = db.relationship('Contact', lazy='joined')
+
+    # Shows are potentially many: loaded on demand, or with selectinload()
+    shows = db.relationship('Show',
+                            back_populates='venue',
+                            order_by='Show.start')
+
+
+class ShowCounterWatermark(db.Model):
+    """Single row: the instant up to which show counters have been rolled.
+
+    A show counts as upcoming while its start is after this watermark, so
+    inserts and the periodic roll agree on which bucket a show is in.
+    """
+    __tablename__ = 'ShowCounterWatermark'
+
+    id = db.Column(db.Integer, primary_key = True)
+    rolled_at = db.Column(db.DateTime, nullable=False)
+
+
+class FacetCount(db.Model):
+    """Venues or artists per (state, genre), for faceted browsing.
+
+    Rows with a NULL genre_id count every venue or artist of a state, each
+    once whatever its number of genres.
+    """
+    __tablename__ = 'FacetCount'
+    __table_args__ = (
+        db.Index('ix_FacetCount_kind_state', 'kind', 'state'),
+        db.Index('ix_FacetCount_kind_genre_id', 'kind', 'genre_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key = True)
+    kind = db.Column(db.String(16), nullable=False)
+    state = db.Column(db.String(120))
+    genre_id = db.Column(db.Integer, db.ForeignKey('Genre.id'))
+    count = db.Column(db.Integer, nullable=False)
+
+
+class ShowCard(db.Model):
+    """A show as /shows lists it: its counterparts' names copied in.
+
+    Read model kept by sync_show_cards from Show, Venue, Artist and
+    Contact, so a page of shows is one range scan of this table.
+    """
+    __tablename__ = 'ShowCard'
+    __table_args__ = (
+        db.Index('ix_ShowCard_start_show_id', 'start', 'show_id'),
+        db.Index('ix_ShowCard_venue_state_start', 'venue_state', 'start', 'show_id'),
+        db.Index('ix_ShowCard_venue_city_trgm', 'venue_city',
+                 postgresql_using='gin',
+                 postgresql_ops={'venue_city': 'gin_trgm_ops'}),
+        db.Index('ix_ShowCard_venue_id', 'venue_id'),
+        db.Index('ix_ShowCard_artist_id', 'artist_id'),
+    )
+
+    show_id = db.Column(db.Integer, db.ForeignKey('Show.id', ondelete='CASCADE'),
+                        primary_key = True, autoincrement=False)
+    start = db.Column(db.DateTime)
+    end = db.Column(db.DateTime)
+    venue_id = db.Column(db.Integer, nullable=False)
+    venue_name = db.Column(db.String)
+    venue_city = db.Column(db.String(120))
+    venue_state = db.Column(db.String(120))
+    artist_id = db.Column(db.Integer, nullable=False)
+    artist_name = db.Column(db.String)
+    artist_image_link = db.Column(db.String(120))
+
+
+#----------------------------------------------------------------------------#
+# Show counters
+#----------------------------------------------------------------------------#
+def watermark():
+    """Current watermark as a SQL expression, read under a share lock."""
+
+    rolled_at = (db.select([ShowCounterWatermark.rolled_at])
+                 .where(ShowCounterWatermark.id == 1)
+                 .with_for_update(read=True)
+                 .as_scalar())
+
+    return func.coalesce(rolled_at, dt.now())
+
+
+def bump_show_counters(connection, show_start, artist_id, venue_id, delta: int):
+    """Add delta to the upcoming or past counter of a show's artist and venue."""
+
+    is_upcoming = watermark() < show_start
+
+    for model, entity_id in ((Artist, artist_id), (Venue, venue_id)):
+        table = model.__table__
+        connection.execute(
+            table.update()
+            .where(table.c.id == entity_id)
+            .values(upcoming_shows_count=table.c.upcoming_shows_count
+                    + case([(is_upcoming, delta)], else_=0),
+                    past_shows_count=table.c.past_shows_count
+                    + case([(is_upcoming, 0)], else_=delta)))
+
+
+@event.listens_for(Show, 'after_insert')
+def count_inserted_show(mapper, connection, show):
+    bump_show_counters(connection, show.start, show.artist_id, show.venue_id, 1)
+
+
+@event.listens_for(Show, 'after_delete')
+def count_deleted_show(mapper, connection, show):
+    bump_show_counters(connection, show.start, show.artist_id, show.venue_id, -1)
+
+
+@event.listens_for(Show, 'after_update')
+def count_updated_show(mapper, connection, show):
+
+    # Rescheduling or moving a show: take it out of its old bucket first
+    old = {}
+    for key in ('start', 'artist_id', 'venue_id'):
+        history = attributes.get_history(show, key)
+        old[key] = history.deleted[0] if history.deleted else getattr(show, key)
+
+    if [old[k] for k in ('start', 'artist_id', 'venue_id')] == \
+            [show.start, show.artist_id, show.venue_id]:
+        return
+
+    bump_show_counters(connection, old['start'], old['artist_id'], old['venue_id'], -1)
+    bump_show_counters(connection, show.start, show.artist_id, show.venue_id, 1)
+
+
+
+
+#----------------------------------------------------------------------------#
+# Facet counts
+#----------------------------------------------------------------------------#
+FACETED = {'venues': (Venue, venue_genres), 'artists': (Artist, artist_genres)}
+
+# Advisory lock keys serializing recounts of each kind on PostgreSQL
+FACET_LOCKS = {'venues': 0x46410001, 'artists': 0x46410002}
+
+
+def state_in(column, states: Optional[Iterable[Optional[str]]]):
+    """column IN states, where a None state matches NULL; None means any."""
+
+    if states is None:
+        return db.true()
+
+    states = set(states)
+    known = [state for state in states if state is not None]
+
+    return db.or_(column.in_(known), column.is_(None) if None in states else db.false())
+
+
+def recount_facets(connection, kind: str, states: Optional[Iterable[Optional[str]]] = None):
+    """Replace the facet counts of kind for the given states (all if None)."""
+
+    model, genres = FACETED[kind]
+    entity = genres.c.venue_id if model is Venue else genres.c.artist_id
+    contact = Contact.__table__
+    facets = FacetCount.__table__
+    states = None if states is None else set(states)
+
+    # Concurrent recounts would each delete only the rows they can see and
+    # insert theirs: take turns, until the end of the transaction
+    if connection.dialect.name == 'postgresql':
+        connection.execute(db.select([func.pg_advisory_xact_lock(FACET_LOCKS[kind])]))
+
+    connection.execute(facets.delete()
+                       .where(facets.c.kind == kind)
+                       .where(state_in(facets.c.state, states)))
+
+    entities = model.__table__.join(contact, model.__table__.c.contact_id == contact.c.id)
+    columns = ['kind', 'state', 'genre_id', 'count']
+
+    # One row per (state, genre) ...
+    connection.execute(facets.insert().from_select(columns, db.select([
+        db.literal(kind), contact.c.state, genres.c.genre_id, func.count()])
+        .select_from(entities.join(genres, entity == model.__table__.c.id))
+        .where(state_in(contact.c.state, states))
+        .group_by(contact.c.state, genres.c.genre_id)))
+
+    # ... and one per state across genres
+    connection.execute(facets.insert().from_select(columns, db.select([
+        db.literal(kind), contact.c.state, db.cast(db.null(), db.Integer), func.count()])
+        .select_from(entities)
+        .where(state_in(contact.c.state, states))
+        .group_by(contact.c.state)))
+
+
+def contact_state(session, contact_id: Optional[int]) -> Optional[str]:
+    return session.query(Contact.state).filter_by(id=contact_id).scalar()
+
+
+# Rows whose version and updated_at follow their changes
+VERSIONED = (Venue, Artist, Contact, Show)
+
+
+@event.listens_for(Session, 'before_flush')
+def touch_versions(session, flush_context, instances):
+    """Bump the version of every changed row, genre links included.
+
+    The increment is computed by the UPDATE itself, so concurrent writers
+    never hand out the same version twice.
+    """
+
+    now = dt.now()
+
+    for obj in session.dirty:
+        if isinstance(obj, VERSIONED) and session.is_modified(obj):
+            obj.version = type(obj).version + 1
+            obj.updated_at = now
+
+
+@event.listens_for(Session, 'before_flush')
+def find_stale_facets(session, flush_context, instances):
+    """Note the (kind, state) facets that this flush's changes will move."""
+
+    stale: Set = session.info.setdefault('stale_facets', set())
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+
+        if isinstance(obj, (Venue, Artist)):
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+
+            kind = 'venues' if isinstance(obj, Venue) else 'artists'
+
+            # New rows reference their contact by id before it is loaded
+            if obj.contact is not None:
+                stale.add((kind, obj.contact.state))
+            elif obj.contact_id is not None:
+                stale.add((kind, contact_state(session, obj.contact_id)))
+
+            for old_contact_id in attributes.get_history(obj, 'contact_id').deleted:
+                stale.add((kind, contact_state(session, old_contact_id)))
+
+        elif isinstance(obj, Contact) and obj in session.dirty:
+            history = attributes.get_history(obj, 'state')
+            if history.has_changes():
+                for state in list(history.deleted) + list(history.added):
+                    stale.update({('venues', state), ('artists', state)})
+
+
+@event.listens_for(Session, 'after_flush')
+def recount_stale_facets(session, flush_context):
+    stale = session.info.pop('stale_facets', None)
+
+    for kind in FACETED:
+        states = {state for k, state in stale or () if k == kind}
+        if states:
+            recount_facets(session.connection(), kind, states)
+
+
+#----------------------------------------------------------------------------#
+# Show cards
+#----------------------------------------------------------------------------#
+CARD_COLUMNS = ['show_id', 'start', 'end', 'venue_id', 'venue_name', 'venue_city',
+                'venue_state', 'artist_id', 'artist_name', 'artist_image_link']
+
+# What a card copies, and what changing it refreshes
+CARD_SOURCES = {
+    Show: ('start', 'end', 'venue_id', 'artist_id'),
+    Venue: ('name', 'contact_id'),
+    Artist: ('name', 'contact_id'),
+    Contact: ('city', 'state', 'image_link'),
+}
+
+
+def card_rows():
+    """SELECT of the cards of every show, from the source tables, in CARD_COLUMNS order."""
+
+    venue_contact = aliased(Contact)
+    artist_contact = aliased(Contact)
+
+    columns = [Show.id, Show.start, Show.end,
+               Show.venue_id, Venue.name, venue_contact.city, venue_contact.state,
+               Show.artist_id, Artist.name, artist_contact.image_link]
+
+    return (db.select([column.label(name) for column, name in zip(columns, CARD_COLUMNS)])
+            .select_from(Show.__table__
+                         .join(Venue.__table__, Show.venue_id == Venue.id)
+                         .join(Artist.__table__, Show.artist_id == Artist.id)
+                         .outerjoin(venue_contact, Venue.contact_id == venue_contact.id)
+                         .outerjoin(artist_contact, Artist.contact_id == artist_contact.id)))
+
+
+def refresh_show_cards(connection, key: Optional[str] = None, ids: Iterable[int] = ()):
+    """Rewrite the cards of the shows with the given ids, venue ids or artist ids.
+
+    key is 'show_id', 'venue_id' or 'artist_id'; without one, every card.
+    Cards of shows, venues or artists that no longer exist are dropped.
+    """
+
+    cards = ShowCard.__table__
+    select = card_rows()
+
+    if key is not None:
+        ids = sorted(set(ids) - {None})
+        if not ids:
+            return
+
+        connection.execute(cards.delete().where(cards.c[key].in_(ids)))
+        select = select.where((Show.id if key == 'show_id' else Show.__table__.c[key]).in_(ids))
+
+    else:
+        connection.execute(cards.delete())
+
+    connection.execute(cards.insert().from_select(CARD_COLUMNS, select))
+
+
+def changed(obj, keys: Iterable[str]) -> bool:
+    return any(attributes.get_history(obj, key).has_changes() for key in keys)
+
+
+@event.listens_for(Session, 'after_flush')
+def sync_show_cards(session, flush_context):
+    """Refresh the cards of every show whose own or copied columns this flush changed."""
+
+    stale: Dict[str, Set[int]] = {'show_id': set(), 'venue_id': set(), 'artist_id': set()}
+    contact_ids: Set[int] = set()
+
+    for obj in session.new | session.dirty:
+        if not isinstance(obj, tuple(CARD_SOURCES)):
+            continue
+
+        # New venues, artists and contacts have no shows but new ones
+        if obj in session.new:
+            if isinstance(obj, Show):
+                stale['show_id'].add(obj.id)
+            continue
+
+        if not changed(obj, CARD_SOURCES[type(obj)]):
+            continue
+
+        if isinstance(obj, Show):
+            stale['show_id'].add(obj.id)
+        elif isinstance(obj, Venue):
+            stale['venue_id'].add(obj.id)
+        elif isinstance(obj, Artist):
+            stale['artist_id'].add(obj.id)
+        else:
+            contact_ids.add(obj.id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Show):
+            stale['show_id'].add(obj.id)
+        elif isinstance(obj, Venue):
+            stale['venue_id'].add(obj.id)
+        elif isinstance(obj, Artist):
+            stale['artist_id'].add(obj.id)
+
+    if not any(stale.values()) and not contact_ids:
+        return
+
+    connection = session.connection()
+
+    # A contact's cards are those of its venue's or artist's shows
+    if contact_ids:
+        for model, key in ((Venue, 'venue_id'), (Artist, 'artist_id')):
+            stale[key].update(id for id, in connection.execute(
+                db.select([model.id]).where(model.contact_id.in_(sorted(contact_ids)))))
 
-db.create_all()
+    for key, ids in stale.items():
+        refresh_show_cards(connection, key, ids)
@@ -0,0 +1,280 @@
+# pyright: reportGeneralTypeIssues=false
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+from collections import Counter
+from datetime import datetime as dt
+from flask import current_app
+from flask import g
+from flask import request
+import glob
+import hmac
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+
+#----------------------------------------------------------------------------#
+# Request profiling
+#
+# Opt-in and per request: a request sent with "X-Profile: <PROFILE_TOKEN>",
+# or drawn at PROFILE_SAMPLE_RATE, gets a sampler thread that records the
+# request thread's stack every PROFILE_INTERVAL seconds until its response
+# has been sent, streamed bodies included. Each profile is written to
+# PROFILE_DIR as JSON: the request, and how many samples saw each stack.
+#
+# Stacks are collapsed ("module:function;...;module:function") so that
+# `flask merge-profiles` can add up many requests of an endpoint and hand
+# them to flamegraph.pl or speedscope. Frames are classed by the innermost
+# one that is SQL (SQLAlchemy or a driver) or template rendering (Jinja or
+# a template's own code); the rest is Python in the app and Flask.
+#----------------------------------------------------------------------------#
+HEADER = 'X-Profile'
+
+# Module prefixes whose frames are time spent on SQL, or on rendering
+SQL_MODULES = ('sqlalchemy', 'psycopg2', 'sqlite3', 'flask_sqlalchemy')
+RENDER_MODULES = ('jinja2', 'markupsafe', 'flask.templating')
+
+# Numbers profiles saved by this process, so their file names never clash
+SEQUENCE = itertools.count(1)
+
+# Frames of the server around the app, trimmed from every stack: stacks
+# start at the app's WSGI entry, or, while a streamed body is sent, at the
+# iterator that hands out its chunks
+ENTRY_FRAMES = ('flask.app:wsgi_app', 'werkzeug.wsgi:__next__')
+
+
+def frame_name(frame) -> str:
+    """module:function of a frame; templates are named by their file."""
+
+    module = frame.f_globals.get('__name__')
+
+    if not module:
+        module = os.path.basename(frame.f_code.co_filename)
+
+    return '%s:%s' % (module, frame.f_code.co_name)
+
+
+def collapse(frame) -> Optional[str]:
+    """The stack ending at frame, outermost first, from the app's entry.
+
+    None when the thread is not in the app at all, e.g. in the server
+    between the view returning and the response being sent.
+    """
+
+    names = []
+    entry = None
+    while frame is not None:
+        names.append(frame_name(frame))
+
+        if names[-1] in ENTRY_FRAMES:
+            entry = len(names)
+
+        frame = frame.f_back
+
+    if entry is None:
+        return None
+
+    return ';'.join(reversed(names[:entry]))
+
+
+class Sampler:
+    """Records the stacks of one thread from a thread of its own."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.started = time.perf_counter()
+        self.started_at = dt.utcnow()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='profiler', daemon=True)
+
+    def start(self) -> 'Sampler':
+        self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = frame and collapse(frame)
+
+            if stack:
+                self.stacks[stack] += 1
+
+    def stop(self) -> float:
+        """Stop sampling; returns the seconds sampled."""
+
+        self.stopped.set()
+        self.thread.join()
+
+        return time.perf_counter() - self.started
+
+
+def is_requested() -> bool:
+    """Whether to profile this request: by token, else by draw."""
+
+    token = current_app.config.get('PROFILE_TOKEN')
+    # As bytes: compare_digest() raises TypeError on non-ASCII str
+    if token and hmac.compare_digest(request.headers.get(HEADER, '').encode(), token.encode()):
+        return True
+
+    return random.random() < current_app.config.get('PROFILE_SAMPLE_RATE', 0)
+
+
+def start_profile():
+    if is_requested():
+        g.profile = Sampler(threading.get_ident(),
+                            current_app.config.get('PROFILE_INTERVAL', 0.001)).start()
+
+
+def make_finish_profile(app):
+
+    def finish_profile(response):
+        sampler = g.pop('profile', None)
+
+        if sampler is None:
+            return response
+
+        profile = {
+            'endpoint': request.endpoint or 'unmatched',
+            'method': request.method,
+            'path': request.full_path,
+            'status': response.status_code,
+            'started': sampler.started_at.isoformat(),
+            'interval': sampler.interval,
+        }
+
+        name = '%s-%s-%d-%d.json' % (profile['endpoint'], sampler.started_at.strftime('%Y%m%dT%H%M%S'),
+                                     os.getpid(), next(SEQUENCE))
+
+        # Streamed bodies render as they are sent: stop once the last chunk is out
+        def write():
+            profile['seconds'] = sampler.stop()
+            profile['stacks'] = dict(sampler.stacks)
+            save(app.config['PROFILE_DIR'], name, profile)
+
+        response.call_on_close(write)
+        response.headers['X-Profile-File'] = name
+
+        return response
+
+    return finish_profile
+
+
+def abandon_profile(exc):
+    """A request that failed before its response: stop sampling, keep nothing."""
+
+    sampler = g.pop('profile', None)
+
+    if sampler is not None:
+        sampler.stop()
+
+
+def save(directory: str, name: str, profile: Dict):
+    os.makedirs(directory, exist_ok=True)
+
+    # Written aside then renamed: merge-profiles never reads half a file
+    path = os.path.join(directory, name)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(profile, f)
+
+    os.replace(path + '.tmp', path)
+
+
+def init_app(app):
+    """Profile requests asked for by header or drawn at the sample rate."""
+
+    if not app.config.get('PROFILE_TOKEN') and not app.config.get('PROFILE_SAMPLE_RATE'):
+        return
+
+    app.before_request(start_profile)
+    app.after_request(make_finish_profile(app))
+    app.teardown_request(abandon_profile)
+
+
+#----------------------------------------------------------------------------#
+# Merging
+#----------------------------------------------------------------------------#
+def load_profiles(directory: str, endpoints: Iterable[str] = ()) -> Iterator[Dict]:
+    """Profiles saved in directory, of the given endpoints or of all."""
+
+    endpoints = set(endpoints)
+
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        with open(path) as f:
+            profile = json.load(f)
+
+        if not endpoints or profile['endpoint'] in endpoints:
+            yield profile
+
+
+def merge(profiles: Iterable[Dict]) -> Dict[str, Dict]:
+    """Stacks, sample count and requests of each endpoint, summed over its profiles."""
+
+    merged: Dict[str, Dict] = {}
+
+    for profile in profiles:
+        entry = merged.setdefault(profile['endpoint'],
+                                  {'stacks': Counter(), 'requests': 0, 'seconds': 0.0})
+        entry['stacks'].update(profile['stacks'])
+        entry['requests'] += 1
+        entry['seconds'] += profile.get('seconds', 0.0)
+
+    return merged
+
+
+def category(stack: str) -> str:
+    """'sql', 'render' or 'python', after the innermost frame that tells."""
+
+    for name in reversed(stack.split(';')):
+        module = name.split(':', 1)[0]
+
+        if module.startswith(SQL_MODULES):
+            return 'sql'
+
+        if module.startswith(RENDER_MODULES) or module.endswith('.html'):
+            return 'render'
+
+    return 'python'
+
+
+def breakdown(stacks: Counter) -> Dict[str, int]:
+    """Samples of stacks per category."""
+
+    shares = Counter({'sql': 0, 'render': 0, 'python': 0})
+    for stack, count in stacks.items():
+        shares[category(stack)] += count
+
+    return dict(shares)
+
+
+def collapsed(merged: Dict[str, Dict], root: Optional[bool] = None) -> List[str]:
+    """Collapsed-stack lines ('frame;frame count') of merged profiles.
+
+    With several endpoints (or root=True), each stack starts with its
+    endpoint's name, so a flame graph splits them at the base.
+    """
+
+    if root is None:
+        root = len(merged) > 1
+
+    lines = []
+    for endpoint, entry in sorted(merged.items()):
+        for stack, count in sorted(entry['stacks'].items()):
+            lines.append('%s%s %d' % (endpoint + ';' if root else '', stack, count))
+
+    return lines
@@ -0,0 +1,692 @@
+# pyright: reportGeneralTypeIssues=false
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+from base64 import urlsafe_b64decode
+from base64 import urlsafe_b64encode
+from datetime import datetime as dt
+from datetime import timedelta
+from itertools import groupby
+from sqlalchemy import case
+from sqlalchemy import func
+from sqlalchemy import tuple_
+from sqlalchemy import union
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import lazyload
+from models import db
+from models import Artist
+from models import Contact
+from models import FacetCount
+from models import Genre
+from models import Venue
+from models import Show
+from models import ShowCard
+from models import artist_genres
+from models import venue_genres
+import geo
+import json
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Tuple
+
+
+#----------------------------------------------------------------------------#
+# Keyset pagination
+#----------------------------------------------------------------------------#
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(*key) -> str:
+    """Opaque, URL-safe token for the sort key of the last row on a page."""
+
+    raw = json.dumps([k.isoformat() if isinstance(k, dt) else k for k in key])
+
+    return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, *types) -> Tuple:
+    """Sort key back from a token, each part converted by the matching type."""
+
+    try:
+        raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        key = json.loads(raw)
+
+        if len(key) != len(types):
+            raise InvalidCursor(cursor)
+
+        # A NULL sort key (a venue without a name) stays None, not 'None'
+        return tuple(None if k is None else dt.fromisoformat(k) if t is dt else t(k)
+                     for k, t in zip(key, types))
+
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+
+
+def keyset_parts(query, columns, key: Optional[Tuple]) -> List:
+    """query's rows after key in (columns) order, as consecutive ordered queries.
+
+    The leading column may be NULL, the others not (they end with the id).
+    NULL leading keys sort last, as in PostgreSQL's indexes: first the rows
+    with one, then those without. A row comparison never matches a NULL, so
+    past a cursor each block is a query of its own, each a single index range.
+    """
+
+    lead, tail = columns[0], columns[1:]
+
+    # From the start, one ordered scan covers both blocks
+    if key is None:
+        return [query.order_by(lead.asc().nullslast(), *tail)]
+
+    if key[0] is None:
+        return [query.filter(lead.is_(None), tuple_(*tail) > tuple_(*key[1:])).order_by(*tail)]
+
+    return [query.filter(tuple_(*columns) > tuple_(*key)).order_by(*columns),
+            query.filter(lead.is_(None)).order_by(*tail)]
+
+
+def keyset_page(query, columns, types, after: Optional[str], per_page: int):
+    """Rows of query after the cursor, ordered by columns, plus next cursor.
+
+    The position is a (value, ..., id) row comparison rather than an OFFSET,
+    so with an index on columns every page is a short index range scan.
+    """
+
+    parts = keyset_parts(query, columns, decode_cursor(after, *types) if after else None)
+
+    # One extra row tells whether there is a next page; the rows with a
+    # NULL leading key are only read once those with one run out
+    rows: List = []
+    for part in parts:
+        rows += part.limit(per_page + 1 - len(rows)).all()
+
+        if len(rows) > per_page:
+            break
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(*(getattr(rows[-1], c.key) for c in columns))
+
+    return rows, next_cursor
+
+
+def iter_pages(listing, key: str, per_page: int = 500,
+               after: Optional[str] = None) -> Iterator[List[Dict]]:
+    """Every page of a keyset listing in turn, to walk a whole collection.
+
+    Only one page is held at a time, whatever the size of the collection.
+    """
+
+    while True:
+        page = listing(after, per_page)
+        yield page[key]
+
+        after = page['next_cursor']
+        if after is None:
+            return
+
+
+#----------------------------------------------------------------------------#
+# Shows
+#----------------------------------------------------------------------------#
+# The venue's contact, where a show takes place; Contact alone is the artist's
+VenueContact = aliased(Contact, name='venue_contact')
+
+
+def parse_time(value: str, end: bool = False) -> dt:
+    """A naive local datetime from ISO 8601, '2026-10-24' or '2026-10-24T20:00'.
+
+    A bare date as the end of a range covers that whole day. Raises
+    ValueError on anything else.
+    """
+
+    value = value.strip()
+    parsed = dt.fromisoformat(value)
+
+    # Stored times are naive and local: convert zoned input to the same
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+
+    return parsed
+
+
+def show_filters(args: Mapping[str, str]) -> Dict:
+    """Window and place of a show query from ?from=&to=&city=&state=.
+
+    from is inclusive, to exclusive (a bare date includes its day); city
+    and state are those of the venue. Raises ValueError on a bad date.
+    """
+
+    filters: Dict = {}
+
+    if args.get('from'):
+        filters['start_from'] = parse_time(args['from'])
+
+    if args.get('to'):
+        filters['start_to'] = parse_time(args['to'], end=True)
+
+    for key in ('city', 'state'):
+        if (args.get(key) or '').strip():
+            filters[key] = args[key].strip()
+
+    return filters
+
+
+def filter_shows(query, start_from: Optional[dt] = None, start_to: Optional[dt] = None,
+                 city: Optional[str] = None, state: Optional[str] = None):
+    """Narrow a show card query to a start window and the venue's city or state.
+
+    The window is a range on ShowCard.start, which the (start, show_id)
+    index serves together with the keyset order; cards carry the venue's
+    city and state, so places need no join either.
+    """
+
+    if start_from is not None:
+        query = query.filter(ShowCard.start >= start_from)
+
+    if start_to is not None:
+        query = query.filter(ShowCard.start < start_to)
+
+    # Case-insensitive, literal: the trigram index on venue_city serves it
+    if city:
+        query = query.filter(ShowCard.venue_city.ilike(escape_like(city), escape='\\'))
+
+    if state:
+        query = query.filter(ShowCard.venue_state == state.upper())
+
+    return query
+
+
+def show_rows():
+    """Column query of show cards: each show with its artist and venue, no join."""
+
+    return db.session.query(ShowCard.show_id,
+                            ShowCard.start,
+                            ShowCard.end,
+                            ShowCard.venue_id,
+                            ShowCard.venue_name,
+                            ShowCard.artist_id,
+                            ShowCard.artist_name,
+                            ShowCard.artist_image_link)
+
+
+def show_row_data(row) -> Dict:
+    return {
+        'venue_id': row.venue_id,
+        'venue_name': row.venue_name,
+        'artist_id': row.artist_id,
+        'artist_name': row.artist_name,
+        'artist_image_link': row.artist_image_link,
+        'start_time': row.start,
+        'end_time': row.end,
+    }
+
+
+def show_listing(after: Optional[str] = None, per_page: int = 50, **filters) -> Dict:
+    """A page of shows in (start, id) order, with their artist and venue.
+
+    filters are those of filter_shows().
+    """
+
+    rows, next_cursor = keyset_page(filter_shows(show_rows(), **filters),
+                                    (ShowCard.start, ShowCard.show_id), (dt, int), after, per_page)
+
+    return {
+        'shows': [show_row_data(row) for row in rows],
+        'next_cursor': next_cursor,
+    }
+
+
+def iter_shows(after: Optional[str] = None, batch: int = 1000, **filters) -> Iterator[Dict]:
+    """Every show past the cursor in (start, id) order, one at a time.
+
+    Rows come through a server-side cursor (yield_per streams results on
+    PostgreSQL), batch at a time, so memory does not grow with the
+    listing. The cursor is decoded before the first row is read.
+    """
+
+    parts = keyset_parts(filter_shows(show_rows(), **filters),
+                         (ShowCard.start, ShowCard.show_id),
+                         decode_cursor(after, dt, int) if after else None)
+
+    return (show_row_data(row) for part in parts for row in part.yield_per(batch))
+
+
+def calendar_shows(criterion, batch: int = 500):
+    """Rows of the shows matching criterion for a calendar feed, by start.
+
+    With their artist, venue and the venue's address; streamed through a
+    server-side cursor along the (venue_id, start) or (artist_id, start)
+    index.
+    """
+
+    return (db.session.query(Show.id,
+                             Show.start,
+                             Show.end,
+                             Show.venue_id,
+                             Venue.name.label('venue_name'),
+                             VenueContact.address,
+                             VenueContact.city,
+                             VenueContact.state,
+                             Show.artist_id,
+                             Artist.name.label('artist_name'))
+            .join(Venue, Show.venue_id == Venue.id)
+            .join(Artist, Show.artist_id == Artist.id)
+            .outerjoin(VenueContact, Venue.contact_id == VenueContact.id)
+            .filter(criterion)
+            .order_by(Show.start, Show.id)
+            .yield_per(batch))
+
+
+def split_shows(criterion, *options) -> Tuple[List[Show], List[Show]]:
+    """Past and upcoming shows matching criterion, split by the database."""
+
+    now = dt.now()
+
+    # Counterparts and their contacts come in through the joined relationships
+    shows = Show.query.filter(criterion).options(*options).order_by(Show.start)
+
+    past = shows.filter(Show.start <= now).all()
+    upcoming = shows.filter(Show.start > now).all()
+
+    return past, upcoming
+
+
+def detail_version(model, entity_id: int) -> Optional[Tuple]:
+    """What a venue or artist page shows, as versions; None if it does not exist.
+
+    One SELECT: the entity's and its contact's versions, then over its shows
+    (found by the (venue_id, start) or (artist_id, start) index) their count,
+    newest update and summed versions with those of their counterparts and
+    contacts, and the latest that has started, which moves a show from
+    upcoming to past. Any change to the page changes the tuple.
+    """
+
+    counterpart = Artist if model is Venue else Venue
+    own_id, other_id = ((Show.venue_id, Show.artist_id) if model is Venue
+                        else (Show.artist_id, Show.venue_id))
+
+    OwnContact = aliased(Contact)
+    OtherContact = aliased(Contact)
+
+    return (db.session.query(model.version,
+                             OwnContact.version,
+                             func.count(Show.id),
+                             func.max(Show.updated_at),
+                             func.sum(Show.version + counterpart.version
+                                      + func.coalesce(OtherContact.version, 0)),
+                             func.max(case([(Show.start <= dt.now(), Show.start)])))
+            .select_from(model)
+            .outerjoin(OwnContact, model.contact_id == OwnContact.id)
+            .outerjoin(Show, own_id == model.id)
+            .outerjoin(counterpart, other_id == counterpart.id)
+            .outerjoin(OtherContact, counterpart.contact_id == OtherContact.id)
+            .filter(model.id == entity_id)
+            .group_by(model.version, OwnContact.version)
+            .first())
+
+
+#----------------------------------------------------------------------------#
+# Genres and facets
+#----------------------------------------------------------------------------#
+def genre_members(model, criterion):
+    """SELECT of the ids of every venue or artist with a genre matching criterion."""
+
+    links = venue_genres if model is Venue else artist_genres
+    entity_id = links.c.venue_id if model is Venue else links.c.artist_id
+
+    return (db.select([entity_id])
+            .select_from(links.join(Genre, links.c.genre_id == Genre.id))
+            .where(criterion))
+
+
+def facet_counts(kind: str, genre: Optional[str] = None,
+                 state: Optional[str] = None) -> Dict:
+    """Per-genre and per-state counts of venues or artists, from FacetCount.
+
+    Each facet is narrowed by the other one's selection: genre counts
+    within the chosen state, state counts within the chosen genre.
+    """
+
+    genres = (db.session.query(Genre.name, func.sum(FacetCount.count).label('count'))
+              .join(Genre, FacetCount.genre_id == Genre.id)
+              .filter(FacetCount.kind == kind))
+    if state:
+        genres = genres.filter(FacetCount.state == state)
+
+    states = (db.session.query(FacetCount.state, func.sum(FacetCount.count).label('count'))
+              .filter(FacetCount.kind == kind, FacetCount.state.isnot(None)))
+    if genre:
+        states = (states.join(Genre, FacetCount.genre_id == Genre.id)
+                  .filter(Genre.name == genre))
+    else:
+        states = states.filter(FacetCount.genre_id.is_(None))
+
+    return {
+        'genres': [{'name': name, 'count': int(count)} for name, count in
+                   genres.group_by(Genre.name).order_by(func.sum(FacetCount.count).desc(), Genre.name)],
+        'states': [{'state': name, 'count': int(count)} for name, count in
+                   states.group_by(FacetCount.state).order_by(FacetCount.state)],
+    }
+
+
+#----------------------------------------------------------------------------#
+# Search
+#----------------------------------------------------------------------------#
+def escape_like(term: str) -> str:
+    """Escape LIKE wildcards so user input only ever matches literally."""
+
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def similarity(column, term: str):
+    """Trigram similarity on PostgreSQL; elsewhere (SQLite) no ranking signal."""
+
+    if db.engine.dialect.name == 'postgresql':
+        return func.similarity(column, term)
+
+    return db.literal(0)
+
+
+def search(model, term: str, page: int, per_page: int):
+    """Ranked page of venues or artists matching term, with upcoming counts.
+
+    Every predicate is served by an index: trigram GIN indexes on name and
+    city, a btree on state and the (genre_id, ...) keys of the genre link
+    tables. Predicates are grouped per table and unioned so each side can
+    scan its own indexes. Relevance and the total number of matches come
+    back from the same statement; upcoming show counts are a denormalized
+    column.
+    """
+
+    term = term.strip()
+    pattern = '%' + escape_like(term) + '%'
+
+    # The genre table is a few dozen rows: match the term against it first
+    genre_hits = genre_members(model, Genre.name.ilike(pattern, escape='\\')
+                               if term else db.false())
+    in_genres = model.id.in_(genre_hits)
+
+    name_matches = model.name.ilike(pattern, escape='\\')
+    city_matches = Contact.city.ilike(pattern, escape='\\')
+    state_matches = Contact.state == term.upper()
+
+    # Name similarity weighs most, then exact genre and state hits, then city
+    rank = (similarity(model.name, term) * 2
+            + case([(in_genres, 1)], else_=0)
+            + case([(state_matches, 1)], else_=0)
+            + similarity(Contact.city, term))
+
+    # Candidate ids, one index-driven branch per table
+    matches = union(
+        db.session.query(model.id)
+        .filter(name_matches)
+        .statement,
+        genre_hits,
+        db.session.query(model.id)
+        .join(Contact, model.contact_id == Contact.id)
+        .filter(city_matches | state_matches)
+        .statement)
+
+    rows = (db.session.query(model.id,
+                             model.name,
+                             model.upcoming_shows_count,
+                             func.count().over())
+            .join(Contact, model.contact_id == Contact.id)
+            .filter(model.id.in_(matches))
+            .order_by(rank.desc(), model.name, model.id)
+            .offset((page - 1) * per_page)
+            .limit(per_page)
+            .all())
+
+    count = rows[0][3] if rows else 0
+
+    return count, [(entity_id, name, n) for entity_id, name, n, _ in rows]
+
+
+#----------------------------------------------------------------------------#
+# Venues
+#----------------------------------------------------------------------------#
+def venue_listing(after: Optional[str] = None, per_page: int = 50,
+                  genre: Optional[str] = None, state: Optional[str] = None) -> Dict:
+    """A page of venues in (name, id) order, with area and upcoming count.
+
+    genre and state narrow the listing to one facet value each.
+    """
+
+    # One round trip: venues, their contact's area and their upcoming count
+    query = (db.session.query(Venue.id,
+                              Venue.name,
+                              Contact.city,
+                              Contact.state,
+                              Venue.upcoming_shows_count)
+             .join(Contact, Venue.contact_id == Contact.id))
+
+    if genre:
+        query = query.filter(Venue.id.in_(genre_members(Venue, Genre.name == genre)))
+    if state:
+        query = query.filter(Contact.state == state)
+
+    rows, next_cursor = keyset_page(query, (Venue.name, Venue.id), (str, int),
+                                    after, per_page)
+
+    return {
+        'venues': [{
+            'id': row.id,
+            'name': row.name,
+            'city': row.city,
+            'state': row.state,
+            'upcoming_shows_count': row.upcoming_shows_count,
+        } for row in rows],
+        'next_cursor': next_cursor,
+    }
+
+
+def venue_directory(after: Optional[str] = None, per_page: int = 50,
+                    genre: Optional[str] = None, state: Optional[str] = None) -> Dict:
+    """A page of venues in (name, id) order, grouped by area, in one query."""
+
+    page = venue_listing(after, per_page, genre, state)
+
+    # Group the page by area in a single pass over the sorted rows
+    area_key = lambda v: (v['state'] or '', v['city'] or '')
+    areas: List[Dict] = []
+    for (state, city), venues in groupby(sorted(page['venues'], key=area_key), key=area_key):
+        areas.append({
+            'city': city,
+            'state': state,
+            'venues': [{
+                'id': venue['id'],
+                'name': venue['name'],
+                'upcoming_shows_count': venue['upcoming_shows_count'],
+            } for venue in venues],
+        })
+
+    return {'areas': areas, 'next_cursor': page['next_cursor']}
+
+
+def search_venues(term: str, page: int = 1, per_page: int = 20) -> Dict:
+    """Ranked, paginated venue search results."""
+
+    count, rows = search(Venue, term, page, per_page)
+
+    return {
+        'count': count,
+        'page': page,
+        'pages': -(-count // per_page),
+        'data': [{
+            'id': venue_id,
+            'name': name,
+            'upcoming_shows_count': upcoming_shows_count,
+        } for venue_id, name, upcoming_shows_count in rows],
+    }
+
+
+def venues_near(latitude: float, longitude: float, radius_km: float,
+                limit: int = 20) -> List[Dict]:
+    """Venues within radius_km of a point, nearest first.
+
+    The geohash cells around the point are read as index ranges, then the
+    candidates, a few cells' worth at most, are ranked by exact distance.
+    """
+
+    # Stored geohashes all have full length: a cell is the range of its prefix
+    cells = [Contact.geohash.between(cell, cell + 'z' * (geo.PRECISION - len(cell)))
+             for cell in geo.covering_cells(latitude, longitude, radius_km)]
+
+    rows = (db.session.query(Venue.id, Venue.name, Contact.city, Contact.state,
+                             Contact.latitude, Contact.longitude)
+            .join(Contact, Venue.contact_id == Contact.id)
+            .filter(db.or_(*cells))
+            .all())
+
+    distances = geo.haversine_km(latitude, longitude,
+                                 [row.latitude for row in rows],
+                                 [row.longitude for row in rows])
+
+    nearest = sorted((distance, row.id, row) for distance, row in zip(distances, rows)
+                     if distance <= radius_km)
+
+    return [{
+        'id': row.id,
+        'name': row.name,
+        'city': row.city,
+        'state': row.state,
+        'latitude': row.latitude,
+        'longitude': row.longitude,
+        'distance_km': round(distance, 3),
+    } for distance, _, row in nearest[:limit]]
+
+
+def venue_detail(venue_id: int) -> Optional[Dict]:
+    """Venue page data in three queries: venue, past shows, upcoming shows."""
+
+    # Contact is joined in by the relationship's loading strategy
+    venue = Venue.query.options(joinedload(Venue.genre_rows)).get(venue_id)
+
+    if venue is None:
+        return None
+
+    # The venue is already in the identity map: do not join it again
+    past, upcoming = split_shows(Show.venue_id == venue_id, lazyload(Show.venue))
+
+    def show_data(show: Show) -> Dict:
+        return {
+            'artist_id': show.artist_id,
+            'artist_name': show.artist.name,
+            'artist_image_link': show.artist.contact.image_link,
+            'start_time': show.start,
+            'end_time': show.end,
+        }
+
+    return {
+        "id": venue.id,
+        "name": venue.name,
+        "genres": list(venue.genres),
+        "address": venue.contact.address,
+        "city": venue.contact.city,
+        "state": venue.contact.state,
+        "phone": venue.contact.phone,
+        "website": venue.contact.website_link,
+        "facebook_link": venue.contact.facebook_link,
+        "image_link": venue.contact.image_link,
+        "past_shows": [show_data(s) for s in past],
+        "upcoming_shows": [show_data(s) for s in upcoming],
+        "past_shows_count": len(past),
+        "upcoming_shows_count": len(upcoming),
+
+        # Hard-coded while I'm stuck
+        "seeking_talent": True,
+        "seeking_description": "Hardcoded description which means nothing."
+    }
+
+
+#----------------------------------------------------------------------------#
+# Artists
+#----------------------------------------------------------------------------#
+def artist_listing(after: Optional[str] = None, per_page: int = 50,
+                   genre: Optional[str] = None, state: Optional[str] = None) -> Dict:
+    """A page of artists in (name, id) order, optionally within a genre and state."""
+
+    query = db.session.query(Artist.id, Artist.name)
+
+    if genre:
+        query = query.filter(Artist.id.in_(genre_members(Artist, Genre.name == genre)))
+    if state:
+        query = (query.join(Contact, Artist.contact_id == Contact.id)
+                 .filter(Contact.state == state))
+
+    rows, next_cursor = keyset_page(query, (Artist.name, Artist.id), (str, int),
+                                    after, per_page)
+
+    return {
+        'artists': [{'id': a.id, 'name': a.name} for a in rows],
+        'next_cursor': next_cursor,
+    }
+
+
+def search_artists(term: str, page: int = 1, per_page: int = 20) -> Dict:
+    """Ranked, paginated artist search results."""
+
+    count, rows = search(Artist, term, page, per_page)
+
+    return {
+        'count': count,
+        'page': page,
+        'pages': -(-count // per_page),
+        'data': [{
+            'id': artist_id,
+            'name': name,
+            'num_upcoming_shows': num_upcoming_shows,
+        } for artist_id, name, num_upcoming_shows in rows],
+    }
+
+
+def artist_detail(artist_id: int) -> Optional[Dict]:
+    """Artist page data in three queries: artist, past shows, upcoming shows."""
+
+    # Contact is joined in by the relationship's loading strategy
+    artist = Artist.query.options(joinedload(Artist.genre_rows)).get(artist_id)
+
+    if artist is None:
+        return None
+
+    # The artist is already in the identity map: do not join it again
+    past, upcoming = split_shows(Show.artist_id == artist_id, lazyload(Show.artist))
+
+    def show_data(show: Show) -> Dict:
+        return {
+            'venue_id': show.venue_id,
+            'venue_name': show.venue.name,
+            'venue_image_link': show.venue.contact.image_link,
+            'start_time': show.start,
+            'end_time': show.end,
+        }
+
+    return {
+        'id': artist.id,
+        'name': artist.name,
+        'genres': list(artist.genres),
+        'city': artist.contact.city,
+        'state': artist.contact.state,
+        'phone': artist.contact.phone,
+        'website': artist.contact.website_link,
+        'facebook_link': artist.contact.facebook_link,
+        'image_link': artist.contact.image_link,
+        'past_shows': [show_data(s) for s in past],
+        'upcoming_shows': [show_data(s) for s in upcoming],
+        'past_shows_count': len(past),
+        'upcoming_shows_count': len(upcoming),
+    }
@@ -0,0 +1,141 @@
+# pyright: reportGeneralTypeIssues=false
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+from flask import current_app
+from flask import g
+from flask import has_app_context
+from flask import request
+from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy import SignallingSession
+from sqlalchemy import event
+from sqlalchemy import orm
+from sqlalchemy.sql.expression import UpdateBase
+import random
+import time
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import List
+
+
+#----------------------------------------------------------------------------#
+# Primary / replica routing
+#
+# With SQLALCHEMY_REPLICA_URIS configured, every GET or HEAD request (and
+# views marked read_only(), like the search forms) reads from one replica,
+# picked per request so its queries see a single server. Everything else
+# uses the primary: other methods, CLI commands, flushes and UPDATE /
+# DELETE / INSERT statements whatever the request.
+#
+# Replicas lag. Once a request commits, the rest of it and every request
+# of the same client for REPLICA_READ_YOUR_WRITES seconds go to the
+# primary, so users see their own writes (the client carries the deadline
+# in a cookie, which any worker can honour).
+#----------------------------------------------------------------------------#
+# Cookie holding the time until which a client reads from the primary
+PRIMARY_COOKIE = 'primary_until'
+
+
+def replica_binds(app) -> List[str]:
+    """Bind keys of the configured replicas: replica0, replica1, ..."""
+
+    return ['replica%d' % n for n in range(len(app.config.get('SQLALCHEMY_REPLICA_URIS') or ()))]
+
+
+class RoutingSession(SignallingSession):
+    """Session reading from the request's replica, if it has one."""
+
+    def __init__(self, db, **options):
+        self.db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        replica = g.get('replica') if has_app_context() else None
+
+        if replica is not None and not self._flushing and not isinstance(clause, UpdateBase):
+            return self.db.get_engine(self.app, bind=replica)
+
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy whose sessions are RoutingSessions."""
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def read_own_writes(session):
+    """After a commit, read from the primary for the rest of the request."""
+
+    if has_app_context():
+        g.pop('replica', None)
+        g.committed = True
+
+
+#----------------------------------------------------------------------------#
+# Flask integration
+#----------------------------------------------------------------------------#
+def read_only(view):
+    """Mark a view that only reads, whatever its method (e.g. a POST search)."""
+
+    view.read_only = True
+    return view
+
+
+def choose_database():
+    """Pick the replica this request reads from, or leave it on the primary."""
+
+    binds = replica_binds(current_app)
+
+    if not binds:
+        return
+
+    view = current_app.view_functions.get(request.endpoint)
+    reads = request.method in ('GET', 'HEAD') or getattr(view, 'read_only', False)
+
+    if reads and not pinned_to_primary():
+        g.replica = random.choice(binds)
+
+
+def pinned_to_primary() -> bool:
+    """Whether this client wrote within the last REPLICA_READ_YOUR_WRITES seconds."""
+
+    try:
+        primary_until = float(request.cookies.get(PRIMARY_COOKIE, 0))
+    except ValueError:
+        primary_until = 0
+
+    return primary_until >= time.time()
+
+
+def on_replica() -> bool:
+    """Whether this request reads from a replica."""
+
+    return has_app_context() and g.get('replica') is not None
+
+
+def remember_commit(response):
+    """Send a client that just wrote to the primary for the next few seconds."""
+
+    window = current_app.config.get('REPLICA_READ_YOUR_WRITES', 5)
+
+    if g.get('committed') and replica_binds(current_app) and window:
+        response.set_cookie(PRIMARY_COOKIE, '%.3f' % (time.time() + window),
+                            max_age=window, httponly=True, samesite='Lax')
+
+    return response
+
+
+def init_app(app):
+    """Register the replicas as binds and route each request's reads."""
+
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds.update(zip(replica_binds(app), app.config.get('SQLALCHEMY_REPLICA_URIS') or ()))
+    app.config['SQLALCHEMY_BINDS'] = binds or None
+
+    app.before_request(choose_database)
+    app.after_request(remember_commit)
@@ -2,3 +2,40 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Name pickers: <input class="typeahead" data-source="/api/v1/.../typeahead"
+// data-target="artist_id" list="..."> suggests names as you type and puts
+// the id of the one picked into the target field.
+document.addEventListener('DOMContentLoaded', function () {
+  Array.prototype.forEach.call(document.querySelectorAll('input.typeahead'), function (input) {
+    var options = document.getElementById(input.getAttribute('list'));
+    var target = document.getElementById(input.getAttribute('data-target'));
+    var ids = {};
+    var pending = null;
+
+    input.addEventListener('input', function () {
+      if (ids.hasOwnProperty(input.value)) {
+        target.value = ids[input.value];
+        return;
+      }
+
+      clearTimeout(pending);
+      pending = setTimeout(function () {
+        var url = input.getAttribute('data-source') + '?q=' + encodeURIComponent(input.value);
+
+        fetch(url).then(function (response) { return response.json(); }).then(function (body) {
+          ids = {};
+          options.innerHTML = '';
+
+          body.data.forEach(function (item) {
+            var label = item.name + ' (#' + item.id + ')';
+            var option = document.createElement('option');
+            option.value = label;
+            options.appendChild(option);
+            ids[label] = item.id;
+          });
+        });
+      }, 100);
+    });
+  });
+});
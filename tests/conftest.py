@@ -0,0 +1,137 @@
+#----------------------------------------------------------------------------#
+# Test setup: the app against a throwaway SQLite database.
+#
+# The models use no PostgreSQL-only column types, so the schema creates on
+# SQLite as-is. The app binds to its database when imported: configure it
+# first. Set TEST_DATABASE_URL to a scratch PostgreSQL database to run the
+# tests there instead, plan checks included; its tables are dropped.
+#----------------------------------------------------------------------------#
+import os
+import sys
+import tempfile
+import threading
+
+import pytest
+from sqlalchemy import event
+
+root = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'benchmarks'))
+
+database = os.path.join(tempfile.mkdtemp(prefix='fyyur-tests-'), 'test.sqlite')
+
+from harness import IMPORT_TOKEN
+
+import config
+config.SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite:///' + database)
+config.WTF_CSRF_ENABLED = False
+config.CACHE_BACKEND = None
+config.IMPORT_TOKEN = IMPORT_TOKEN
+
+
+@pytest.fixture
+def app():
+    from app import app
+    return app
+
+
+@pytest.fixture
+def postgresql(app):
+    """Skips the test unless it runs on PostgreSQL (TEST_DATABASE_URL)."""
+
+    from models import db
+
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            pytest.skip('needs PostgreSQL: set TEST_DATABASE_URL')
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def page_cache(app, monkeypatch):
+    """An in-process page cache for the test: the suite runs without one."""
+
+    import cache
+
+    backend = cache.LRUCache()
+    monkeypatch.setitem(app.extensions, 'cache', backend)
+
+    return backend
+
+
+@pytest.fixture
+def seed(app):
+    """seed(size): replace the catalog with a generated one; returns its row counts."""
+
+    import counters
+    from generate import generate
+    from generate import reset
+    from models import db
+
+    typeahead = app.extensions['typeahead']
+
+    def seed(size: int, **options):
+        # A name index load still reading the old tables would hold them
+        loading = typeahead.loading
+        if loading is not None:
+            loading.join()
+
+        with app.app_context():
+            reset(db)
+            catalog = generate(db, size, **options)
+            counters.rebuild_show_counters()
+            counters.rebuild_facet_counts()
+            counters.rebuild_show_cards()
+            db.session.remove()
+
+        # Loaded again, from the new catalog, on first use
+        typeahead.indexes = None
+
+        return catalog
+
+    return seed
+
+
+@pytest.fixture
+def catalog(seed):
+    """A small generated catalog: 20 venues, 40 artists, 200 shows."""
+
+    return seed(20)
+
+
+@pytest.fixture
+def statements(app, client):
+    """statements(url): how many statements a GET of url sends.
+
+    Counted on the second request, after once-per-app work such as the
+    name index load, and on the requesting thread only.
+    """
+
+    from models import db
+
+    def statements(url: str) -> int:
+        assert client.get(url).status_code == 200
+
+        thread = threading.get_ident()
+        count = [0]
+
+        def on_execute(*args, **kwargs):
+            if threading.get_ident() == thread:
+                count[0] += 1
+
+        with app.app_context():
+            engine = db.engine
+
+        event.listen(engine, 'before_cursor_execute', on_execute)
+        try:
+            assert client.get(url).status_code == 200
+        finally:
+            event.remove(engine, 'before_cursor_execute', on_execute)
+
+        return count[0]
+
+    return statements
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+
+def walk(client, url: str, per_page: int):
+    """Every item of a JSON collection, following next_cursor."""
+
+    items = []
+    after = ''
+    while True:
+        response = client.get('%s?per_page=%d&after=%s' % (url, per_page, after))
+        assert response.status_code == 200
+        assert response.content_type == 'application/json'
+
+        body = response.get_json()
+        assert len(body['data']) <= per_page
+        items += body['data']
+
+        after = body['next_cursor']
+        if after is None:
+            return items
+
+
+@pytest.mark.parametrize('url, key', [('/api/v1/venues', 'venues'),
+                                      ('/api/v1/artists', 'artists'),
+                                      ('/api/v1/shows', 'shows')])
+def test_collections_page_by_cursor(client, catalog, url, key):
+    items = walk(client, url, 7)
+
+    assert len(items) == catalog[key]
+    assert len({json.dumps(item, sort_keys=True) for item in items}) == len(items)
+
+
+@pytest.mark.parametrize('url', ['/api/v1/venues', '/api/v1/artists', '/api/v1/shows'])
+def test_all_streams_every_item(client, catalog, url):
+    paged = walk(client, url, 9)
+
+    response = client.get(url + '?all=1')
+    assert response.is_streamed
+    assert response.content_type == 'application/json'
+    assert json.loads(response.get_data()) == paged
+
+    response = client.get(url + '?all=1&format=ndjson')
+    assert response.content_type == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == paged
+
+    response = client.get(url + '?all=1', headers={'Accept': 'application/x-ndjson'})
+    assert response.content_type == 'application/x-ndjson'
+
+
+def test_all_of_an_empty_collection_is_an_empty_array(client, catalog):
+    response = client.get('/api/v1/shows?all=1&from=2999-01-01')
+
+    assert response.status_code == 200
+    assert json.loads(response.get_data()) == []
+
+
+def test_page_size_is_capped(app, client, catalog):
+    response = client.get('/api/v1/shows?per_page=100000')
+
+    assert len(response.get_json()['data']) == min(catalog['shows'],
+                                                   app.config['API_MAX_PAGE_SIZE'])
+
+
+@pytest.mark.parametrize('url', ['/api/v1/venues?after=garbage',
+                                 '/api/v1/shows?all=1&after=garbage',
+                                 '/api/v1/shows?from=not-a-date'])
+def test_bad_requests_are_json_errors(client, catalog, url):
+    response = client.get(url)
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Bad Request', 'status': 400}
+
+
+def test_missing_entities_are_json_404s(client, catalog):
+    for url in ('/api/v1/venues/999999', '/api/v1/artists/999999'):
+        response = client.get(url)
+
+        assert response.status_code == 404
+        assert response.get_json() == {'error': 'Not Found', 'status': 404}
+
+
+def test_details_list_past_and_upcoming_shows(client, catalog):
+    venue = client.get('/api/v1/venues/1').get_json()
+    artist = client.get('/api/v1/artists/1').get_json()
+
+    assert venue['id'] == 1 and artist['id'] == 1
+    for data in (venue, artist):
+        assert data['past_shows_count'] == len(data['past_shows'])
+        assert data['upcoming_shows_count'] == len(data['upcoming_shows'])
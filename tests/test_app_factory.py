@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import exc
+
+import models
+from app import create_app
+from models import db
+
+
+def test_sqlite_apps_drop_the_server_pool_options(app):
+    options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+
+    assert options['pool_pre_ping'] is True
+    assert not {'pool_size', 'max_overflow', 'pool_timeout', 'executemany_mode'} & set(options)
+
+
+def test_one_engine_per_app(app):
+    with app.app_context():
+        engine = db.engine
+
+    with app.app_context():
+        assert db.engine is engine
+
+    # Another app on the same SQLAlchemy instance gets engines of its own
+    other = create_app()
+    with other.app_context():
+        assert db.engine is not engine
+        assert str(db.engine.url) == str(engine.url)
+
+
+class Record:
+    """The parts of a pool's connection record the fork checks use."""
+
+    def __init__(self):
+        self.info = {}
+        self.connection = object()
+
+
+def test_connections_never_cross_a_fork():
+    record = Record()
+    models.remember_pid(None, record)
+    models.check_pid(None, record, Record())
+
+    # As seen from a worker forked after the connection was opened
+    record.info['pid'] = -1
+    proxy = Record()
+
+    with pytest.raises(exc.DisconnectionError):
+        models.check_pid(None, record, proxy)
+
+    assert record.connection is None
+    assert proxy.connection is None
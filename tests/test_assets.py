@@ -0,0 +1,137 @@
+import gzip
+import json
+import os
+import re
+import shutil
+
+import pytest
+
+import assets
+
+FINGERPRINT = re.compile(r'^(.+)\.[0-9a-f]{10}(\.\w+)$')
+
+
+@pytest.fixture
+def built(app, tmp_path, monkeypatch):
+    """Assets built from a copy of static/ and served by the app; the manifest."""
+
+    static = str(tmp_path / 'static')
+    shutil.copytree(app.static_folder, static, ignore=shutil.ignore_patterns(assets.DIST))
+
+    manifest = assets.build(static)
+
+    monkeypatch.setattr(app, 'static_folder', static)
+    files = assets.load_manifest(static)
+    monkeypatch.setitem(app.extensions, 'assets', files)
+    monkeypatch.setitem(app.extensions, 'assets_files', set(files.values()))
+
+    return manifest
+
+
+def test_build_fingerprints_every_file_and_bundle(app, built):
+    dist = os.path.join(app.static_folder, assets.DIST)
+
+    assert set(assets.BUNDLES) <= set(built)
+    assert 'css/main.css' in built and 'js/script.js' in built
+
+    for name, entry in built.items():
+        root, ext = os.path.splitext(name)
+        assert FINGERPRINT.match(entry['file']).groups() == (root, ext)
+        assert os.path.getsize(os.path.join(dist, entry['file'])) == entry['sizes']['']
+
+    with open(os.path.join(dist, assets.MANIFEST)) as f:
+        assert json.load(f) == built
+
+
+def test_build_compresses_what_shrinks(app, built):
+    dist = os.path.join(app.static_folder, assets.DIST)
+    css = built['app.css']
+
+    with open(os.path.join(dist, css['file']), 'rb') as f:
+        content = f.read()
+    with open(os.path.join(dist, css['file'] + '.gz'), 'rb') as f:
+        assert gzip.decompress(f.read()) == content
+
+    assert css['sizes']['.gz'] < css['sizes']['']
+
+    # Already compressed: no variant
+    images = [entry for name, entry in built.items() if name.endswith('.png')]
+    assert images and all(set(entry['sizes']) == {''} for entry in images)
+
+
+def test_css_urls_are_rewritten():
+    built = {'fonts/icons.woff': 'fonts/icons.0123456789.woff'}
+
+    def resolve(path):
+        return built.get(path, '/static/' + path)
+
+    css = ('a{background:url(../img/a.png)}'
+           '@font-face{src:url(\'../fonts/icons.woff?v=1#x\'),url(data:font/woff;base64,AA)}'
+           'b{background:url("/img/b.png")}')
+
+    assert assets.rewrite_css_urls(css, 'css/main.css', resolve) == (
+        'a{background:url("/static/img/a.png")}'
+        '@font-face{src:url("fonts/icons.0123456789.woff?v=1#x"),url(data:font/woff;base64,AA)}'
+        'b{background:url("/img/b.png")}')
+
+
+def test_bundles_link_from_dist(app, built):
+    dist = os.path.join(app.static_folder, assets.DIST)
+
+    with open(os.path.join(dist, built['app.css']['file']), encoding='utf-8') as f:
+        css = f.read()
+
+    # Bootstrap's glyphicons are not shipped: linked where they would be
+    assert 'url("/static/fonts/glyphicons-halflings-regular.woff")' in css
+    assert '../' not in css
+    assert len(css) < sum(os.path.getsize(os.path.join(app.static_folder, source))
+                          for source in assets.BUNDLES['app.css'])
+
+
+def test_built_assets_are_served_by_encoding(client, built):
+    css = built['app.css']['file']
+    url = '/static/dist/' + css
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Cache-Control'] == assets.IMMUTABLE
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.mimetype == 'text/css'
+    compressed = response.get_data()
+
+    response = client.get(url)
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['Cache-Control'] == assets.IMMUTABLE
+    assert gzip.decompress(compressed) == response.get_data()
+
+
+def test_only_built_names_are_served(client, built):
+    css = built['app.css']['file']
+
+    for name in (assets.MANIFEST, css + '.gz', 'app.css', 'css/main.css'):
+        assert client.get('/static/dist/' + name).status_code == 404
+
+
+def test_pages_link_built_assets(client, catalog, built):
+    body = client.get('/').get_data(as_text=True)
+
+    assert '/static/dist/' + built['app.css']['file'] in body
+    assert '/static/dist/' + built['head.js']['file'] in body
+
+
+def test_asset_url_falls_back_to_sources(app, client, monkeypatch):
+    monkeypatch.setitem(app.extensions, 'assets', None)
+
+    with app.test_request_context():
+        assert assets.asset_url('app.css') == '/assets/app.css'
+        assert assets.asset_url('css/main.css') == '/static/css/main.css'
+
+    response = client.get('/assets/app.css')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/css'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert b'/static/fonts/' in response.data
+
+    assert client.get('/assets/nothing.css').status_code == 404
+    assert client.get('/static/dist/app.css').status_code == 404
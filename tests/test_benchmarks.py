@@ -0,0 +1,66 @@
+from itertools import groupby
+
+from sqlalchemy import event
+
+import harness
+from generate import generate
+from generate import reset
+from generate import sizes_for
+from models import db
+from models import Show
+from models import Venue
+
+
+def test_same_seed_same_catalog(app):
+    def snapshot(seed: int):
+        with app.app_context():
+            reset(db)
+            catalog = generate(db, 10, seed=seed)
+            venues = [(v.id, v.name, v.contact.city) for v in Venue.query.order_by(Venue.id)]
+            db.session.remove()
+
+        return catalog, venues
+
+    assert snapshot(1) == snapshot(1)
+    assert snapshot(1) != snapshot(2)
+
+
+def test_generated_shows_never_overlap(app, catalog):
+    assert catalog['venues'] == sizes_for(20)['venues']
+    assert catalog['shows'] == sizes_for(20)['shows']
+
+    with app.app_context():
+        for column in (Show.venue_id, Show.artist_id):
+            shows = db.session.query(column, Show.start, Show.end).order_by(column, Show.start).all()
+
+            for _, booked in groupby(shows, key=lambda s: s[0]):
+                booked = list(booked)
+                assert all(a.end <= b.start for a, b in zip(booked, booked[1:]))
+
+        db.session.remove()
+
+
+def test_every_route_has_a_benchmark_request(app, catalog):
+    builders = harness.requests_for(catalog)
+    endpoints = {rule.endpoint for rule in app.url_map.iter_rules()}
+
+    assert endpoints - set(builders) == {'static', 'built_asset', 'source_bundle'}
+
+
+def test_benchmark_requests_succeed(app, catalog):
+    builders = harness.requests_for(catalog)
+    client = app.test_client()
+
+    with app.app_context():
+        engine = db.engine
+
+    counter = harness.StatementCounter(engine)
+    try:
+        for endpoint, build in sorted(builders.items()):
+            result = harness.measure(client, counter, build, 2)
+
+            assert all(status < 400 for status in result['status']), endpoint
+            assert result['p95_ms'] >= result['p50_ms'] > 0
+
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter.on_execute)
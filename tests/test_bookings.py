@@ -0,0 +1,119 @@
+from datetime import datetime as dt
+from datetime import timedelta
+
+import pytest
+
+import bookings
+from models import db
+from models import Show
+
+# After every generated show: the venue and artist are free from here on
+FREE = dt(2040, 6, 1, 20, 0)
+HOUR = timedelta(hours=1)
+
+
+def show_form(venue_id: int, artist_id: int, start: dt, minutes: int = 120):
+    return {'venue_id': venue_id, 'artist_id': artist_id,
+            'start_time': start.strftime('%Y-%m-%d %H:%M'), 'duration': minutes}
+
+
+def shows_at(app, start: dt) -> int:
+    with app.app_context():
+        count = Show.query.filter(Show.start == start).count()
+        db.session.remove()
+
+    return count
+
+
+def test_bookings_index_finds_the_overlapping_booking():
+    index = bookings.Bookings()
+    index.add(1, FREE, FREE + 2 * HOUR, 10)
+    index.add(1, FREE + 4 * HOUR, FREE + 5 * HOUR, 11)
+    index.add(1, FREE - 3 * HOUR, FREE - HOUR, 9)
+
+    assert index.overlapping(1, FREE + HOUR, FREE + 3 * HOUR) == (10, FREE, FREE + 2 * HOUR)
+    assert index.overlapping(1, FREE + 3 * HOUR, FREE + 6 * HOUR)[0] == 11
+    assert index.overlapping(1, FREE - 2 * HOUR, FREE - HOUR)[0] == 9
+
+    # Back to back is not an overlap; other keys are independent
+    assert index.overlapping(1, FREE + 2 * HOUR, FREE + 4 * HOUR) is None
+    assert index.overlapping(1, FREE - HOUR, FREE) is None
+    assert index.overlapping(2, FREE, FREE + HOUR) is None
+
+
+def test_end_of_bounds_the_duration():
+    assert bookings.end_of(FREE) == FREE + 2 * HOUR
+    assert bookings.end_of(FREE, minutes=90) == FREE + timedelta(minutes=90)
+    assert bookings.end_of(FREE, FREE + 24 * HOUR) == FREE + 24 * HOUR
+
+    for end, minutes in ((FREE, None), (FREE - HOUR, None), (None, 0), (None, 24 * 60 + 1)):
+        with pytest.raises(ValueError):
+            bookings.end_of(FREE, end, minutes)
+
+
+def test_find_conflict_names_the_field_and_show(app, catalog):
+    with app.app_context():
+        show = bookings.book_show(1, 1, FREE, FREE + 2 * HOUR)
+        db.session.commit()
+
+        conflict = bookings.find_conflict(1, 2, FREE + HOUR, FREE + 3 * HOUR)
+        assert (conflict.field, conflict.show_id) == ('venue_id', show.id)
+
+        conflict = bookings.find_conflict(2, 1, FREE - HOUR, FREE + HOUR)
+        assert (conflict.field, conflict.show_id) == ('artist_id', show.id)
+
+        assert bookings.find_conflict(1, 1, FREE + 2 * HOUR, FREE + 3 * HOUR) is None
+        assert bookings.find_conflict(1, 1, FREE, FREE + HOUR, exclude_id=show.id) is None
+
+        with pytest.raises(bookings.BookingConflict):
+            bookings.book_show(1, 3, FREE + HOUR, FREE + 2 * HOUR)
+
+        db.session.rollback()
+        db.session.remove()
+
+
+def test_create_show_rejects_overlaps(app, client, catalog):
+    assert client.post('/shows/create', data=show_form(1, 1, FREE)).status_code == 200
+
+    # The venue, then the artist, already booked
+    response = client.post('/shows/create', data=show_form(1, 2, FREE + HOUR))
+    assert response.status_code == 409
+    assert b'The venue is already booked' in response.data
+
+    response = client.post('/shows/create', data=show_form(2, 1, FREE - HOUR))
+    assert response.status_code == 409
+    assert b'The artist is already booked' in response.data
+
+    assert shows_at(app, FREE + HOUR) == shows_at(app, FREE - HOUR) == 0
+
+    # Right after the first one ends
+    assert client.post('/shows/create', data=show_form(1, 1, FREE + 2 * HOUR)).status_code == 200
+    assert shows_at(app, FREE + 2 * HOUR) == 1
+
+
+@pytest.mark.parametrize('minutes', [0, -30, 24 * 60 + 1])
+def test_create_show_rejects_bad_durations(app, client, catalog, minutes):
+    response = client.post('/shows/create', data=show_form(1, 1, FREE, minutes))
+
+    assert response.status_code == 400
+    assert shows_at(app, FREE) == 0
+
+
+def test_check_bookings_within_a_batch(app, catalog):
+    with app.app_context():
+        bookings.book_show(1, 1, FREE, FREE + 2 * HOUR)
+        db.session.commit()
+
+        free = [(2, 2, FREE, FREE + 2 * HOUR), (2, 3, FREE + 2 * HOUR, FREE + 4 * HOUR)]
+        assert bookings.check_bookings(free) is None
+        assert bookings.check_bookings([]) is None
+
+        # Overlapping a show already booked
+        i, conflict = bookings.check_bookings(free + [(3, 1, FREE + HOUR, FREE + 3 * HOUR)])
+        assert (i, conflict.field) == (2, 'artist_id')
+
+        # Overlapping an earlier show of the same batch
+        i, conflict = bookings.check_bookings(free + [(2, 4, FREE + 3 * HOUR, FREE + 5 * HOUR)])
+        assert (i, conflict.field, conflict.show_id) == (2, 'venue_id', None)
+
+        db.session.remove()
@@ -0,0 +1,127 @@
+import itertools
+
+from sqlalchemy import event
+
+import ical
+import queries
+from harness import venue_form
+from models import db
+from models import Show
+from models import Venue
+
+
+def unfold(body: str) -> list:
+    """Content lines of a calendar, folded lines joined back."""
+
+    return body.replace('\r\n ', '').split('\r\n')[:-1]
+
+
+def test_escape_text_values():
+    assert ical.escape('Rock, Paper; Back\\slash\nNext') == 'Rock\\, Paper\\; Back\\\\slash\\nNext'
+    assert ical.escape(None) == ''
+
+
+def test_fold_long_lines_on_character_boundaries():
+    line = 'SUMMARY:' + 'Café Ünïcødé ' * 20
+
+    folded = ical.fold(line)
+
+    assert folded.endswith('\r\n')
+    assert all(len(piece.encode()) <= ical.LINE_OCTETS
+               for piece in folded[:-2].split('\r\n'))
+    assert unfold(folded) == [line]
+    assert ical.fold('SHORT') == 'SHORT\r\n'
+
+
+def test_venue_feed_lists_every_show(app, client, catalog):
+    with app.app_context():
+        shows = Show.query.filter_by(venue_id=1).count()
+        name = Venue.query.get(1).name
+        db.session.remove()
+
+    response = client.get('/venues/1.ics')
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'text/calendar'
+    assert response.headers['ETag'].startswith('W/')
+    assert response.last_modified is not None
+
+    lines = unfold(response.get_data(as_text=True))
+    assert lines[0] == 'BEGIN:VCALENDAR' and lines[-1] == 'END:VCALENDAR'
+    assert 'X-WR-CALNAME:' + ical.escape(name) in lines
+    assert lines.count('BEGIN:VEVENT') == shows
+    assert len([line for line in lines if line.startswith('UID:show-')]) == shows
+
+
+def test_artist_feed_and_missing_entities(client, catalog):
+    assert client.get('/artists/1.ics').status_code == 200
+    assert client.get('/venues/999999.ics').status_code == 404
+    assert client.get('/artists/999999.ics').status_code == 404
+
+
+def test_current_copies_get_304s_without_a_cache(client, catalog):
+    etag = client.get('/venues/1.ics').headers['ETag']
+
+    response = client.get('/venues/1.ics', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+
+def test_cached_validators_answer_304s_without_sql(app, client, catalog, page_cache):
+    response = client.get('/venues/1.ics')
+    response.get_data()
+    etag, last_modified = response.headers['ETag'], response.headers['Last-Modified']
+
+    assert 'ics:venue:1' in page_cache.entries
+
+    statements = []
+
+    def on_execute(*args):
+        statements.append(args[2])
+
+    with app.app_context():
+        engine = db.engine
+
+    event.listen(engine, 'before_cursor_execute', on_execute)
+    try:
+        assert client.get('/venues/1.ics', headers={'If-None-Match': etag}).status_code == 304
+        assert client.get('/venues/1.ics',
+                          headers={'If-Modified-Since': last_modified}).status_code == 304
+    finally:
+        event.remove(engine, 'before_cursor_execute', on_execute)
+
+    assert statements == []
+
+
+def test_edits_change_the_feed(app, client, catalog, page_cache):
+    response = client.get('/venues/1.ics')
+    response.get_data()
+    etag = response.headers['ETag']
+
+    with app.app_context():
+        city = Venue.query.get(1).contact.city
+        db.session.remove()
+
+    client.post('/venues/1/edit', data=dict(venue_form(1), name='Renamed For Calendars', city=city))
+    assert 'ics:venue:1' not in page_cache.entries
+
+    response = client.get('/venues/1.ics', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert 'X-WR-CALNAME:Renamed For Calendars' in unfold(response.get_data(as_text=True))
+
+
+def test_validators_are_not_kept_when_a_write_lands_mid_stream(client, catalog, page_cache,
+                                                                monkeypatch):
+    # Every call sees a newer version, as if a write committed in between
+    versions = itertools.count()
+    monkeypatch.setattr(queries, 'detail_version', lambda model, id: (next(versions),))
+
+    response = client.get('/venues/1.ics')
+    response.get_data()
+
+    assert response.status_code == 200
+    assert 'ics:venue:1' not in page_cache.entries
@@ -0,0 +1,54 @@
+from datetime import datetime as dt
+
+from sqlalchemy import func
+
+import queries
+from models import db
+from models import Show
+
+
+def busiest_and_quietest(app, column):
+    """Ids of the entities with the most and the fewest shows (at least one)."""
+
+    with app.app_context():
+        rows = (db.session.query(column, func.count(Show.id))
+                .group_by(column)
+                .order_by(func.count(Show.id).desc(), column)
+                .all())
+        db.session.remove()
+
+    assert rows[0][1] > rows[-1][1]
+
+    return rows[0][0], rows[-1][0]
+
+
+def test_venue_detail_splits_shows_by_date(app, catalog):
+    busiest, _ = busiest_and_quietest(app, Show.venue_id)
+
+    with app.app_context():
+        data = queries.venue_detail(busiest)
+        shows = Show.query.filter_by(venue_id=busiest).count()
+        db.session.remove()
+
+    now = dt.now()
+    assert data['past_shows_count'] + data['upcoming_shows_count'] == shows
+    assert all(s['start_time'] <= now for s in data['past_shows'])
+    assert all(s['start_time'] > now for s in data['upcoming_shows'])
+    assert all(s['artist_name'] and s['artist_image_link'] for s in data['past_shows'])
+
+
+def test_detail_pages_of_missing_entities_are_404(client, catalog):
+    assert client.get('/venues/100000').status_code == 404
+    assert client.get('/artists/100000').status_code == 404
+
+
+def test_venue_page_statements_do_not_grow_with_shows(app, catalog, statements):
+    busiest, quietest = busiest_and_quietest(app, Show.venue_id)
+
+    assert statements('/venues/%d' % busiest) == statements('/venues/%d' % quietest)
+
+
+def test_artist_page_statements_do_not_grow_with_shows(app, catalog, statements):
+    busiest, quietest = busiest_and_quietest(app, Show.artist_id)
+
+    assert statements('/artists/%d' % busiest) == statements('/artists/%d' % quietest)
@@ -0,0 +1,78 @@
+import itertools
+
+import pytest
+
+import queries
+from harness import artist_form
+from models import db
+from models import Artist
+from models import Show
+
+DETAIL_URLS = ['/venues/1', '/artists/1', '/api/v1/venues/1', '/api/v1/artists/1']
+
+
+@pytest.mark.parametrize('url', DETAIL_URLS)
+def test_current_copies_get_304s(client, catalog, url):
+    response = client.get(url)
+    etag = response.headers['ETag']
+
+    assert etag.startswith('W/"')
+
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+    assert client.get(url, headers={'If-None-Match': 'W/"other"'}).status_code == 200
+
+
+@pytest.mark.parametrize('url', DETAIL_URLS)
+def test_cached_pages_answer_304s(client, catalog, page_cache, url):
+    etag = client.get(url).headers['ETag']
+    assert 'page:%s?' % url in page_cache.entries
+
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+    response = client.get(url)
+    assert response.status_code == 200 and response.headers['ETag'] == etag
+
+
+def test_missing_pages_have_no_etag(client, catalog):
+    response = client.get('/venues/999999')
+
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
+
+
+def test_counterpart_edits_change_the_etag(app, client, catalog, page_cache):
+    with app.app_context():
+        show = Show.query.filter_by(venue_id=1).first()
+        artist_id = show.artist_id
+        city = Artist.query.get(artist_id).contact.city
+        db.session.remove()
+
+    url = '/venues/1'
+    etag = client.get(url).headers['ETag']
+
+    # A performer of the venue renamed: shown on its page
+    form = dict(artist_form(artist_id), name='Renamed Performer', city=city)
+    assert client.post('/artists/%d/edit' % artist_id, data=form).status_code == 302
+    client.get('/')
+
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert b'Renamed Performer' in response.data
+
+
+def test_pages_rendered_across_a_write_are_not_validated(client, catalog, page_cache, monkeypatch):
+    # Every call sees a newer version, as if a write committed while rendering
+    versions = itertools.count()
+    monkeypatch.setattr(queries, 'detail_version', lambda model, id: (next(versions),))
+
+    response = client.get('/venues/1')
+
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+    assert 'page:/venues/1?' not in page_cache.entries
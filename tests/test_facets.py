@@ -0,0 +1,125 @@
+from collections import Counter
+
+import queries
+from harness import venue_form
+from models import db
+from models import Artist
+from models import FacetCount
+from models import Venue
+from models import venue_genres
+
+
+def expected_facets(model, genre=None, state=None):
+    """facet_counts() counted the slow way, from the entities themselves."""
+
+    genres, states = Counter(), Counter()
+
+    for entity in model.query.all():
+        entity_state = entity.contact.state if entity.contact else None
+
+        if state is None or entity_state == state:
+            genres.update(entity.genres)
+
+        if entity_state is not None and (genre is None or genre in entity.genres):
+            states[entity_state] += 1
+
+    return {
+        'genres': [{'name': name, 'count': count} for name, count in
+                   sorted(genres.items(), key=lambda g: (-g[1], g[0]))],
+        'states': [{'state': name, 'count': count} for name, count in sorted(states.items())],
+    }
+
+
+def facets_match(kind: str, model, genre=None, state=None) -> bool:
+    return queries.facet_counts(kind, genre=genre, state=state) == \
+        expected_facets(model, genre=genre, state=state)
+
+
+def test_facet_counts_match_the_catalog(app, catalog):
+    with app.app_context():
+        venue, artist = Venue.query.get(1), Artist.query.get(1)
+
+        for kind, model, entity in (('venues', Venue, venue), ('artists', Artist, artist)):
+            assert facets_match(kind, model)
+            assert facets_match(kind, model, genre=entity.genres[0])
+            assert facets_match(kind, model, state=entity.contact.state)
+            assert facets_match(kind, model, genre=entity.genres[0], state=entity.contact.state)
+
+        db.session.remove()
+
+
+def test_facets_api_narrows_by_selection(app, client, catalog):
+    with app.app_context():
+        venue = Venue.query.get(1)
+        genre, state = venue.genres[0], venue.contact.state
+        expected = expected_facets(Venue, genre=genre)
+        db.session.remove()
+
+    response = client.get('/api/v1/venues/facets', query_string={'genre': genre})
+
+    assert response.get_json() == expected
+    assert state in [s['state'] for s in expected['states']]
+
+
+def test_genre_filter_lists_only_members(app, client, catalog):
+    with app.app_context():
+        genre = Venue.query.get(1).genres[0]
+        members = {v.id for v in Venue.query.all() if genre in v.genres}
+        db.session.remove()
+
+    listed = client.get('/api/v1/venues', query_string={'all': 1, 'genre': genre}).get_json()
+
+    assert {v['id'] for v in listed} == members
+
+
+def test_edits_recount_facets(app, client, catalog):
+    with app.app_context():
+        city = Venue.query.get(1).contact.city
+        db.session.remove()
+
+    # Moved to another state, with a genre no other venue has
+    form = dict(venue_form(1), city=city, state='WY', genres=['Folk', 'Soul'])
+    assert client.post('/venues/1/edit', data=form).status_code == 302
+
+    with app.app_context():
+        assert Venue.query.get(1).genres == ['Folk', 'Soul']
+        assert facets_match('venues', Venue)
+        assert facets_match('venues', Venue, state='WY')
+        assert facets_match('venues', Venue, genre='Folk')
+        db.session.remove()
+
+
+def test_delete_venue_removes_links_and_recounts(app, client, catalog):
+    form = dict(venue_form(0), name='Venue To Delete', genres=['Folk'])
+    assert client.post('/venues/create', data=form).status_code == 200
+
+    with app.app_context():
+        venue_id = Venue.query.filter_by(name='Venue To Delete').one().id
+        folk = sum(s['count'] for s in queries.facet_counts('venues', genre='Folk')['states'])
+        db.session.remove()
+
+    assert client.delete('/venues/%d' % venue_id).get_json() == {'success': True}
+
+    with app.app_context():
+        assert Venue.query.get(venue_id) is None
+        assert db.session.query(venue_genres).filter(venue_genres.c.venue_id == venue_id).count() == 0
+        assert facets_match('venues', Venue)
+        assert sum(s['count'] for s in queries.facet_counts('venues', genre='Folk')['states']) == folk - 1
+        assert FacetCount.query.filter(FacetCount.count <= 0).count() == 0
+        db.session.remove()
+
+    # Gone already: nothing left to do
+    assert client.delete('/venues/%d' % venue_id).get_json() == {'success': True}
+
+
+def test_delete_venue_with_shows_fails_whole(app, client, catalog):
+    with app.app_context():
+        genres = Venue.query.get(1).genres
+        db.session.remove()
+
+    assert client.delete('/venues/1').get_json() == {'success': False}
+
+    with app.app_context():
+        assert Venue.query.get(1).genres == genres
+        assert facets_match('venues', Venue)
+        db.session.remove()
@@ -0,0 +1,82 @@
+from datetime import datetime as dt
+from datetime import timedelta
+
+import babel.dates
+import pytest
+
+import formatting
+
+START = dt(2035, 4, 1, 20, 30)
+
+
+def starts(n: int):
+    """n show starts, a few hours apart, repeating every day."""
+
+    return [START + timedelta(hours=3 * (i % 8)) for i in range(n)]
+
+
+@pytest.mark.parametrize('format', ['full', 'medium'])
+def test_format_datetime_matches_babel(format):
+    pattern = formatting.FORMATS[format]
+
+    assert formatting.format_datetime(START, format) == \
+        babel.dates.format_datetime(START, pattern, locale='en')
+
+
+def test_format_datetime_takes_strings():
+    assert formatting.format_datetime(str(START), 'full') == \
+        formatting.format_datetime(START, 'full')
+    assert formatting.format_datetime(START, 'full') == 'Sunday April, 1, 2035 at 8:30PM'
+
+
+def test_format_datetime_takes_babel_patterns():
+    assert formatting.format_datetime(START, 'yyyy-MM-dd') == '2035-04-01'
+
+
+def test_format_datetimes_matches_format_datetime():
+    values = starts(50)
+
+    assert formatting.format_datetimes(values, 'full') == \
+        [formatting.format_datetime(value, 'full') for value in values]
+    assert formatting.format_datetimes([]) == []
+
+
+def test_label_shows_adds_start_labels():
+    shows = [{'start_time': value} for value in starts(5)]
+
+    assert formatting.label_shows(shows) is shows
+    assert [show['start_label'] for show in shows] == \
+        [formatting.format_datetime(show['start_time'], 'full') for show in shows]
+
+
+def test_iter_labeled_reads_a_batch_at_a_time():
+    read = []
+
+    def stream():
+        for value in starts(25):
+            read.append(value)
+            yield {'start_time': value}
+
+    labeled = formatting.iter_labeled(stream(), batch=10)
+
+    first = next(labeled)
+    assert first['start_label'] == formatting.format_datetime(START, 'full')
+    assert len(read) == 10
+
+    rest = list(labeled)
+    assert len(rest) == 24
+    assert len(read) == 25
+    assert all('start_label' in show for show in rest)
+
+
+def test_pages_show_labels(app, client, catalog):
+    from models import Show
+    from models import db
+
+    with app.app_context():
+        show = Show.query.order_by(Show.id).first()
+        label = formatting.format_datetime(show.start, 'full')
+        venue_id = show.venue_id
+        db.session.remove()
+
+    assert label in client.get('/venues/%d' % venue_id).get_data(as_text=True)
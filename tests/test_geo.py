@@ -0,0 +1,105 @@
+import math
+import random
+
+import pytest
+
+import geo
+import queries
+import writes
+from harness import venue_form
+from models import db
+from models import Venue
+
+AUSTIN = geo.CITIES[('austin', 'TX')]
+
+
+def test_encode_known_geohashes():
+    assert geo.encode(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+    assert geo.encode(*AUSTIN, 5) == '9v6kp'
+    assert len(geo.encode(0, 0)) == geo.PRECISION
+
+
+def test_cities_are_found_loosely():
+    assert geo.locate('  St. Louis ', 'mo') == geo.CITIES[('saint louis', 'MO')]
+    assert geo.locate('Nowhere', 'TX') is None
+    assert geo.place('Austin', 'TX')[2] == geo.encode(*AUSTIN)
+    assert geo.place('Nowhere', 'TX') == (None, None, None)
+    assert geo.place(None, None, 1.5, 2.5)[:2] == (1.5, 2.5)
+
+
+def test_haversine_distances():
+    new_york, los_angeles = geo.CITIES[('new york', 'NY')], geo.CITIES[('los angeles', 'CA')]
+
+    distances = geo.haversine_km(*new_york, [new_york[0], los_angeles[0]],
+                                 [new_york[1], los_angeles[1]])
+
+    assert distances[0] == pytest.approx(0, abs=1e-6)
+    assert distances[1] == pytest.approx(3936, rel=0.01)
+    assert geo.haversine_km(0, 0, [], []) == []
+
+
+@pytest.mark.parametrize('center', [AUSTIN, (0.0, 0.0), (64.8, -147.7), (-33.9, 151.2), (10.0, 179.99)])
+@pytest.mark.parametrize('radius', [0.5, 10, 120, 500])
+def test_covering_cells_cover_the_circle(center, radius):
+    cells = geo.covering_cells(*center, radius)
+    rng = random.Random(0)
+
+    for _ in range(500):
+        # A point at a random bearing, up to radius away
+        distance = radius * math.sqrt(rng.random()) / geo.EARTH_RADIUS_KM
+        bearing = rng.uniform(0, 2 * math.pi)
+        lat1, lon1 = map(math.radians, center)
+
+        lat2 = math.asin(math.sin(lat1) * math.cos(distance)
+                         + math.cos(lat1) * math.sin(distance) * math.cos(bearing))
+        lon2 = lon1 + math.atan2(math.sin(bearing) * math.sin(distance) * math.cos(lat1),
+                                 math.cos(distance) - math.sin(lat1) * math.sin(lat2))
+        point = (math.degrees(lat2), (math.degrees(lon2) + 540) % 360 - 180)
+
+        assert geo.encode(*point).startswith(tuple(cells)), (point, cells)
+
+
+def test_venues_near_match_brute_force(app, catalog):
+    rng = random.Random(1)
+
+    with app.app_context():
+        # A cluster around Austin, on top of the generated venues
+        with writes.UnitOfWork() as uow:
+            for n in range(30):
+                uow.save(Venue, dict(venue_form(n), latitude=AUSTIN[0] + rng.uniform(-0.5, 0.5),
+                                     longitude=AUSTIN[1] + rng.uniform(-0.5, 0.5)))
+
+        placed = [v for v in Venue.query.all() if v.contact and v.contact.latitude is not None]
+
+        for radius in (5, 25, 60, 500):
+            distances = geo.haversine_km(*AUSTIN, [v.contact.latitude for v in placed],
+                                         [v.contact.longitude for v in placed])
+            expected = sorted((d, v.id) for d, v in zip(distances, placed) if d <= radius)
+
+            found = queries.venues_near(*AUSTIN, radius, limit=1000)
+
+            assert [v['id'] for v in found] == [id for _, id in expected]
+            assert [v['distance_km'] for v in found] == [round(d, 3) for d, _ in expected]
+
+        assert len(queries.venues_near(*AUSTIN, 60, limit=3)) == 3
+        db.session.remove()
+
+
+def test_near_api(client, catalog):
+    response = client.get('/api/v1/venues/near', query_string={'lat': AUSTIN[0], 'lon': AUSTIN[1],
+                                                               'radius': 500, 'limit': 5})
+
+    assert response.status_code == 200
+    distances = [v['distance_km'] for v in response.get_json()['data']]
+    assert distances == sorted(distances) and len(distances) <= 5
+    assert all(d <= 500 for d in distances)
+
+
+@pytest.mark.parametrize('query', ['', 'lat=30', 'lon=-97', 'lat=north&lon=-97',
+                                   'lat=91&lon=0', 'lat=0&lon=181', 'lat=0&lon=0&radius=0',
+                                   'lat=0&lon=0&radius=501', 'lat=0&lon=0&radius=-5'])
+def test_near_api_rejects_bad_input(client, catalog, query):
+    response = client.get('/api/v1/venues/near?' + query)
+
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 400
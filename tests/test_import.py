@@ -0,0 +1,159 @@
+import io
+import json
+
+import pytest
+
+import importer
+from harness import IMPORT_TOKEN
+from models import db
+from models import Artist
+from models import Show
+from models import ShowCard
+from models import Venue
+
+AUTHORIZATION = {'Authorization': 'Bearer ' + IMPORT_TOKEN}
+
+
+def post(client, kind: str, body: str, content_type: str = 'application/x-ndjson', **args):
+    query = '&'.join('%s=%s' % item for item in args.items())
+
+    return client.post('/import/%s?%s' % (kind, query), data=body.encode(),
+                       headers=dict(AUTHORIZATION, **{'Content-Type': content_type}))
+
+
+def ndjson(*rows) -> str:
+    return ''.join(json.dumps(row) + '\n' for row in rows)
+
+
+def test_import_venues_csv_and_artists_ndjson(app, client, catalog):
+    csv = ('name,genres,city,state\n'
+           'Imported Hall,"Jazz, Blues",Austin,TX\n'
+           'Imported Club,,Boise,ID\n')
+    response = post(client, 'venues', csv, 'text/csv')
+
+    assert response.status_code == 200
+    assert response.json['rows'] == 2
+
+    response = post(client, 'artists', ndjson({'name': 'Imported Band', 'genres': ['Funk']}))
+    assert response.json['rows'] == 1
+
+    with app.app_context():
+        hall = Venue.query.filter_by(name='Imported Hall').one()
+        assert sorted(hall.genres) == ['Blues', 'Jazz']
+        assert hall.contact.geohash is not None
+        assert Artist.query.filter_by(name='Imported Band').one().genres == ['Funk']
+        db.session.remove()
+
+
+def test_import_shows_keeps_counters_and_cards(app, client, catalog):
+    with app.app_context():
+        venue = Venue.query.get(1)
+        before = venue.upcoming_shows_count
+        artist_name = Artist.query.get(2).name
+        db.session.remove()
+
+    body = ndjson({'start': '2031-06-01T20:00', 'duration': 90, 'artist': artist_name, 'venue_id': 1},
+                  {'start': '2031-06-02T20:00', 'end': '2031-06-02T23:00', 'artist_id': '2', 'venue_id': 1})
+    response = post(client, 'shows', body)
+
+    assert response.status_code == 200
+    assert response.json['rows'] == 2
+
+    with app.app_context():
+        shows = Show.query.filter(Show.start >= '2031-06-01').order_by(Show.start).all()
+        assert [(s.end - s.start).seconds // 60 for s in shows] == [90, 180]
+        assert Venue.query.get(1).upcoming_shows_count == before + 2
+        assert ShowCard.query.filter(ShowCard.show_id.in_([s.id for s in shows])).count() == 2
+        db.session.remove()
+
+
+@pytest.mark.parametrize('row, message', [
+    ([1, 2], 'expected a JSON object, got list'),
+    ('"venue"', 'expected a JSON object, got str'),
+    ({'name': 42}, 'name must be a string'),
+    ({'name': ''}, 'name is required'),
+    ({'name': 'Bad', 'genres': {'Jazz': True}}, 'genres must be a string or a list of strings'),
+    ({'name': 'Bad', 'genres': ['Jazz', 3]}, 'genres must be a string or a list of strings'),
+    ({'name': 'Bad', 'genres': 'Polka'}, "unknown genre 'Polka'"),
+    ({'name': 'Bad', 'latitude': 'north', 'longitude': 3}, 'latitude and longitude must be numbers'),
+])
+def test_invalid_venue_rows(client, catalog, row, message):
+    body = (row if isinstance(row, str) else json.dumps(row)) + '\n'
+    response = post(client, 'venues', ndjson({'name': 'Fine Venue'}) + body, chunk_size=1)
+
+    assert response.status_code == 400
+    assert response.json['row'] == 2
+    assert message in response.json['error']
+
+    # The first row's chunk was committed before the second one failed
+    assert response.json['imported'] == 1
+
+
+@pytest.mark.parametrize('fields, message', [
+    ({'venue_id': True}, 'venue_id must be an integer'),
+    ({'venue_id': 1.5}, 'venue_id must be an integer'),
+    ({'venue_id': '٣'}, 'venue_id must be an integer'),
+    ({'venue_id': 100000}, 'no venue with id 100000'),
+    ({'venue_id': None, 'venue': ['a']}, 'venue must be a string'),
+    ({'venue_id': None, 'venue': 'Nowhere'}, "venue 'Nowhere' matches 0 rows"),
+    ({'duration': 1.5}, 'duration must be a number of minutes'),
+    ({'duration': True}, 'duration must be a number of minutes'),
+    ({'duration': 0}, 'A show must end after it starts'),
+    ({'start': 'tomorrow'}, "start must be an ISO date and time, got 'tomorrow'"),
+])
+def test_invalid_show_rows(app, client, catalog, fields, message):
+    row = dict({'start': '2031-07-01T20:00', 'artist_id': 1, 'venue_id': 1}, **fields)
+    response = post(client, 'shows', ndjson(row))
+
+    assert response.status_code == 400
+    assert response.json['row'] == 1
+    assert response.json['imported'] == 0
+    assert message in response.json['error']
+
+    with app.app_context():
+        assert Show.query.filter(Show.start >= '2031-07-01').count() == 0
+        db.session.remove()
+
+
+def test_overlapping_shows_are_rejected(client, catalog):
+    body = ndjson({'start': '2031-08-01T20:00', 'artist_id': 1, 'venue_id': 1},
+                  {'start': '2031-08-01T21:00', 'artist_id': 2, 'venue_id': 1})
+    response = post(client, 'shows', body)
+
+    assert response.status_code == 400
+    assert response.json['row'] == 2
+    assert 'venue is already booked' in response.json['error']
+
+
+def test_import_needs_the_token(app, client, catalog, monkeypatch):
+    body = ndjson({'name': 'Sneaky Venue'}).encode()
+
+    for authorization in ('', 'Bearer wrong', 'Bearer ' + IMPORT_TOKEN + 'é'):
+        response = client.post('/import/venues', data=body,
+                               headers={'Authorization': authorization.encode('utf-8').decode('latin-1')})
+        assert response.status_code == 403
+
+    monkeypatch.setitem(app.config, 'IMPORT_TOKEN', None)
+    assert client.post('/import/venues', data=body, headers=AUTHORIZATION).status_code == 404
+
+
+def test_uploaded_files_are_read_by_extension(client, catalog):
+    data = {'file': (io.BytesIO(ndjson({'name': 'Uploaded Venue'}).encode()), 'venues.jsonl')}
+    response = client.post('/import/venues', data=data, headers=AUTHORIZATION,
+                           content_type='multipart/form-data')
+
+    assert response.status_code == 200
+    assert response.json['rows'] == 1
+
+    data = {'file': (io.BytesIO(b'name\n'), 'venues.txt')}
+    assert client.post('/import/venues', data=data, headers=AUTHORIZATION,
+                       content_type='multipart/form-data').status_code == 400
+
+
+def test_whole_numbers():
+    assert importer.whole_number(7) == 7
+    assert importer.whole_number(' 42 ') == 42
+
+    for value in (True, 1.0, '1.5', '-1', '', '²', None):
+        with pytest.raises(ValueError):
+            importer.whole_number(value)
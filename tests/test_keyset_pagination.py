@@ -0,0 +1,78 @@
+from datetime import datetime as dt
+
+import pytest
+
+import queries
+from models import db
+from models import Venue
+
+
+def walk(listing, key: str, per_page: int):
+    """Every row of a listing, page by page."""
+
+    rows = []
+    for page in queries.iter_pages(listing, key, per_page):
+        assert len(page) <= per_page
+        rows += page
+
+    return rows
+
+
+def test_cursor_round_trip():
+    key = (dt(2026, 10, 24, 20, 30), 7)
+
+    assert queries.decode_cursor(queries.encode_cursor(*key), dt, int) == key
+    assert queries.decode_cursor(queries.encode_cursor(None, 3), str, int) == (None, 3)
+
+    for cursor in ('', 'not a cursor', queries.encode_cursor('M'), queries.encode_cursor('M', 'x')):
+        with pytest.raises(queries.InvalidCursor):
+            queries.decode_cursor(cursor, str, int)
+
+
+def test_venue_pages_cover_every_venue_once_in_order(app, catalog):
+    with app.app_context():
+        rows = walk(queries.venue_listing, 'venues', 7)
+        db.session.remove()
+
+    assert len(rows) == catalog['venues']
+    assert [(v['name'], v['id']) for v in rows] == sorted((v['name'], v['id']) for v in rows)
+
+
+def test_venues_without_a_name_come_last(app, catalog):
+    with app.app_context():
+        Venue.query.filter(Venue.id.in_([2, 5, 11])).update({Venue.name: None},
+                                                            synchronize_session=False)
+        db.session.commit()
+
+        # Page boundaries before, at and within the unnamed block
+        for per_page in (1, 3, 7, catalog['venues'] - 3, catalog['venues'] - 2):
+            rows = walk(queries.venue_listing, 'venues', per_page)
+
+            assert len(rows) == catalog['venues']
+            assert [v['id'] for v in rows[-3:]] == [2, 5, 11]
+            assert all(v['name'] is not None for v in rows[:-3])
+
+        db.session.remove()
+
+
+def test_show_listing_and_stream_agree(app, catalog):
+    with app.app_context():
+        paged = walk(queries.show_listing, 'shows', 30)
+        streamed = list(queries.iter_shows(batch=16))
+
+        # Resumed from a cursor: from the shows of that start on
+        middle = queries.encode_cursor(paged[99]['start_time'], 0)
+        resumed = list(queries.iter_shows(middle))
+        db.session.remove()
+
+    assert len(paged) == catalog['shows']
+    assert paged == streamed
+    assert resumed == [s for s in paged if s['start_time'] >= paged[99]['start_time']]
+
+
+def test_listings_reject_bad_cursors(client, catalog):
+    for url in ('/venues', '/artists', '/shows', '/shows?all=1'):
+        assert client.get(url + ('&' if '?' in url else '?') + 'after=garbage').status_code == 400
+
+    next_page = queries.encode_cursor('M', 0)
+    assert client.get('/artists?after=' + next_page).status_code == 200
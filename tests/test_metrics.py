@@ -0,0 +1,48 @@
+import re
+
+import instrumentation
+
+
+def sample(body: str, name: str, endpoint: str, le: str = None) -> float:
+    labels = 'endpoint="%s"' % endpoint + (',le="%s"' % le if le else '')
+    match = re.search(r'^%s\{%s\} (\S+)$' % (re.escape(name), re.escape(labels)), body, re.M)
+
+    return float(match.group(1)) if match else 0.0
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = instrumentation.Histogram('test_seconds', 'Test.', [0.1, 1])
+    for value in (0.05, 0.5, 0.5, 5):
+        histogram.observe('index', value)
+
+    lines = histogram.expose()
+
+    assert 'test_seconds_bucket{endpoint="index",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{endpoint="index",le="1"} 3' in lines
+    assert 'test_seconds_bucket{endpoint="index",le="+Inf"} 4' in lines
+    assert 'test_seconds_sum{endpoint="index"} 6.05' in lines
+    assert 'test_seconds_count{endpoint="index"} 4' in lines
+
+
+def test_requests_are_measured_per_endpoint(client, catalog):
+    before = client.get('/metrics').get_data(as_text=True)
+    client.get('/venues/1')
+    after = client.get('/metrics').get_data(as_text=True)
+
+    for name in ('fyyur_request_duration_seconds_count', 'fyyur_request_db_seconds_count',
+                 'fyyur_request_render_seconds_count', 'fyyur_response_size_bytes_count'):
+        assert sample(after, name, 'show_venue') == sample(before, name, 'show_venue') + 1
+
+    # The venue page reads the venue and its shows
+    statements = (sample(after, 'fyyur_request_statements_sum', 'show_venue')
+                  - sample(before, 'fyyur_request_statements_sum', 'show_venue'))
+    assert statements >= 3
+
+
+def test_requests_over_the_query_budget_are_logged(app, client, catalog, monkeypatch, caplog):
+    monkeypatch.setitem(app.config, 'QUERY_BUDGET', 1)
+
+    client.get('/venues/1')
+
+    assert any('issued' in r.getMessage() and '/venues/1' in r.getMessage()
+               for r in caplog.records)
@@ -0,0 +1,42 @@
+import os
+
+from flask_migrate import upgrade
+from sqlalchemy import inspect
+
+from models import db
+
+MIGRATIONS = os.path.join(os.path.dirname(__file__), '..', 'migrations')
+
+
+def drop_everything():
+    db.session.remove()
+    db.drop_all(bind=None)
+    db.session.execute('DROP TABLE IF EXISTS alembic_version')
+    db.session.commit()
+
+
+def test_upgrade_builds_the_schema(app, postgresql):
+    with app.app_context():
+        drop_everything()
+        upgrade(MIGRATIONS)
+
+        assert set(db.metadata.tables) <= set(inspect(db.engine).get_table_names())
+        db.session.remove()
+
+
+def test_upgrade_keeps_tables_made_before_migrations(app, postgresql):
+    with app.app_context():
+        drop_everything()
+
+        # The tables as db.create_all() used to leave them: no migration history
+        upgrade(MIGRATIONS, '1d6f3c0e2b47')
+        db.session.execute('INSERT INTO "Contact" (id, city, state) VALUES (1, \'Austin\', \'TX\')')
+        db.session.execute('INSERT INTO "Venue" (id, name, contact_id) VALUES (1, \'Kept Venue\', 1)')
+        db.session.execute('DROP TABLE alembic_version')
+        db.session.commit()
+
+        upgrade(MIGRATIONS)
+
+        assert db.session.execute('SELECT name FROM "Venue" WHERE id = 1').scalar() == 'Kept Venue'
+        assert set(db.metadata.tables) <= set(inspect(db.engine).get_table_names())
+        db.session.remove()
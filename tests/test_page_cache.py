@@ -0,0 +1,75 @@
+import cache
+from harness import venue_form
+from models import db
+from models import Venue
+
+
+def test_lru_cache_evicts_by_tag_age_and_size():
+    lru = cache.LRUCache(maxsize=2)
+
+    lru.set('a', 1, ['venue:1', 'venues'], 60)
+    lru.set('b', 2, ['venue:2'], 60)
+    assert lru.get('a') == 1
+
+    # 'b' is now the least recently used
+    lru.set('c', 3, [], 60)
+    assert lru.get('b') is None
+    assert lru.get('a') == 1
+
+    lru.invalidate(['venues'])
+    assert lru.get('a') is None
+    assert lru.get('c') == 3
+    assert 'venues' not in lru.tags
+
+    lru.set('d', 4, [], -1)
+    assert lru.get('d') is None
+
+
+def test_cached_pages_send_no_sql(catalog, page_cache, statements):
+    assert statements('/venues') == 0
+    assert statements('/artists?genre=Jazz') == 0
+    assert statements('/api/v1/venues/facets') == 0
+
+
+def test_edits_evict_the_pages_showing_them(app, client, catalog, page_cache):
+    with app.app_context():
+        venue = Venue.query.get(1)
+        name, city = venue.name, venue.contact.city
+        db.session.remove()
+
+    assert name.encode() in client.get('/venues').data
+    assert name.encode() in client.get('/venues/1').data
+
+    form = dict(venue_form(1), name='Renamed Venue', city=city)
+    assert client.post('/venues/1/edit', data=form).status_code == 302
+
+    # The edit flashed a message: read it before pages are shared again
+    client.get('/')
+
+    for url in ('/venues', '/venues/1'):
+        body = client.get(url).data
+        assert b'Renamed Venue' in body
+        assert name.encode() not in body
+
+
+def test_pages_with_flashes_are_not_cached(app, client, catalog, page_cache):
+    with app.app_context():
+        city = Venue.query.get(1).contact.city
+        db.session.remove()
+
+    client.post('/venues/1/edit', data=dict(venue_form(1), city=city))
+
+    assert b'successfully edited' in client.get('/venues/1').data
+    assert 'page:/venues/1?' not in page_cache.entries
+
+    assert b'successfully edited' not in client.get('/venues/1').data
+    assert 'page:/venues/1?' in page_cache.entries
+
+
+def test_detail_headers_are_cached_fragments(client, catalog, page_cache):
+    assert client.get('/venues/1').status_code == 200
+    assert client.get('/artists/1').status_code == 200
+
+    assert 'fragment:venue-header:1' in page_cache.entries
+    assert 'fragment:artist-header:1' in page_cache.entries
+    assert 'fragment:venue-header:1' in page_cache.tags['venue:1']
@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import event
+
+from explain import StatementLog
+from explain import prepare
+from explain import scanned_tables
+from models import db
+
+# Catalog size, and the smallest table a route may still scan sequentially
+SIZE = 10000
+MIN_ROWS = 1000
+
+
+def test_no_route_scans_a_large_table(app, postgresql):
+    with app.app_context():
+        catalog = prepare(db, SIZE)
+        scans = scanned_tables(app, db, catalog, MIN_ROWS)
+
+    assert scans
+    assert {endpoint: sorted(scanned) for endpoint, scanned in scans.items() if scanned} == {}
+
+
+# Routes over the shows, and the show tables they must only read by index
+SHOW_ROUTES = ['/shows', '/api/v1/shows', '/venues/1', '/artists/1', '/api/v1/venues/1']
+SHOW_TABLES = ('Show', 'ShowCard')
+
+
+def sqlite_scans(statements) -> set:
+    """Show tables SQLite's plans for statements read without an index."""
+
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        scans = set()
+        for statement, parameters in statements:
+            for row in cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters):
+                words = row[3].split()
+                if words[0] == 'SCAN' and words[1] in SHOW_TABLES and 'INDEX' not in words:
+                    scans.add(words[1])
+    finally:
+        connection.close()
+
+    return scans
+
+
+@pytest.mark.parametrize('url', SHOW_ROUTES)
+def test_show_routes_read_shows_by_index(app, client, catalog, url):
+    with app.app_context():
+        db.session.execute('ANALYZE')
+        db.session.commit()
+        if db.engine.dialect.name != 'sqlite':
+            pytest.skip('EXPLAIN QUERY PLAN is SQLite only')
+        engine = db.engine
+        log = StatementLog(engine)
+
+    try:
+        assert client.get(url).status_code == 200
+        with app.app_context():
+            assert log.statements
+            assert sqlite_scans(log.statements) == set()
+    finally:
+        event.remove(engine, 'before_cursor_execute', log.on_execute)
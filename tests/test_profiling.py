@@ -0,0 +1,145 @@
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import pytest
+from flask import Flask
+
+import config
+import profiling
+from app import create_app
+
+TOKEN = 'profile-token'
+
+
+def busy(seconds: float):
+    """Spin in Python for a while, for the sampler to see."""
+
+    until = time.perf_counter() + seconds
+    while time.perf_counter() < until:
+        pass
+
+
+@pytest.fixture
+def profiled(tmp_path):
+    """A small app with profiling on, writing to tmp_path."""
+
+    app = Flask(__name__)
+    app.config.update(PROFILE_TOKEN=TOKEN, PROFILE_DIR=str(tmp_path), PROFILE_INTERVAL=0.0005)
+    profiling.init_app(app)
+
+    @app.route('/stack')
+    def stack():
+        return profiling.collapse(sys._getframe())
+
+    @app.route('/busy')
+    def busy_view():
+        busy(0.05)
+        return 'done'
+
+    return app
+
+
+@pytest.mark.parametrize('header, expected', [(TOKEN, True), ('wrong', False), ('', False),
+                                              ('prófile-tökén', False), (TOKEN + 'é', False)])
+def test_is_requested_by_token(app, monkeypatch, header, expected):
+    monkeypatch.setitem(app.config, 'PROFILE_TOKEN', TOKEN)
+    monkeypatch.setitem(app.config, 'PROFILE_SAMPLE_RATE', 0)
+
+    # Non-ASCII header values reach the app decoded as latin-1
+    with app.test_request_context(headers={profiling.HEADER: header.encode().decode('latin-1')}):
+        assert profiling.is_requested() is expected
+
+
+def test_is_requested_by_draw(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'PROFILE_TOKEN', None)
+
+    with app.test_request_context(headers={profiling.HEADER: TOKEN}):
+        monkeypatch.setitem(app.config, 'PROFILE_SAMPLE_RATE', 0)
+        assert not profiling.is_requested()
+
+        monkeypatch.setitem(app.config, 'PROFILE_SAMPLE_RATE', 1)
+        assert profiling.is_requested()
+
+
+def test_stacks_start_at_the_app(profiled):
+    stack = profiled.test_client().get('/stack').get_data(as_text=True)
+
+    names = stack.split(';')
+    assert names[0] == 'flask.app:wsgi_app'
+    assert names[-1] == 'test_profiling:stack'
+
+    assert profiling.collapse(sys._getframe()) is None
+
+
+def test_token_requests_write_a_profile(profiled, tmp_path):
+    client = profiled.test_client()
+
+    assert 'X-Profile-File' not in client.get('/busy').headers
+    assert 'X-Profile-File' not in client.get('/busy', headers={profiling.HEADER: 'wrong'}).headers
+
+    response = client.get('/busy', headers={profiling.HEADER: TOKEN})
+    response.close()
+    name = response.headers['X-Profile-File']
+
+    assert os.listdir(str(tmp_path)) == [name]
+    with open(os.path.join(str(tmp_path), name)) as f:
+        profile = json.load(f)
+
+    assert (profile['endpoint'], profile['method'], profile['status']) == ('busy_view', 'GET', 200)
+    assert profile['seconds'] >= 0.05
+    assert any(stack.endswith('test_profiling:busy') for stack in profile['stacks'])
+    assert list(profiling.load_profiles(str(tmp_path), ['busy_view'])) == [profile]
+    assert list(profiling.load_profiles(str(tmp_path), ['other'])) == []
+
+
+def test_apps_profile_when_configured(monkeypatch, tmp_path, catalog):
+    monkeypatch.setattr(config, 'PROFILE_TOKEN', TOKEN)
+    monkeypatch.setattr(config, 'PROFILE_DIR', str(tmp_path))
+
+    # A new app has the hooks but none of the module-level views
+    other = create_app()
+    client = other.test_client()
+
+    assert 'X-Profile-File' not in client.get('/nowhere').headers
+
+    response = client.get('/nowhere', headers={profiling.HEADER: TOKEN})
+    response.close()
+
+    # Its first request started loading the name indexes
+    loading = other.extensions['typeahead'].loading
+    if loading is not None:
+        loading.join()
+
+    with open(os.path.join(str(tmp_path), response.headers['X-Profile-File'])) as f:
+        assert (json.load(f)['endpoint'], response.status_code) == ('unmatched', 404)
+
+
+def test_merge_breakdown_and_collapsed_output():
+    profiles = [
+        {'endpoint': 'shows', 'seconds': 0.5,
+         'stacks': {'flask.app:wsgi_app;app:shows;sqlalchemy.engine.base:execute': 3,
+                    'flask.app:wsgi_app;app:shows;jinja2.environment:render': 2}},
+        {'endpoint': 'shows', 'seconds': 0.25,
+         'stacks': {'flask.app:wsgi_app;app:shows;sqlalchemy.engine.base:execute': 1,
+                    'flask.app:wsgi_app;app:shows;pages/shows.html:root': 1}},
+        {'endpoint': 'index', 'seconds': 0.1,
+         'stacks': {'flask.app:wsgi_app;app:index': 4}},
+    ]
+
+    merged = profiling.merge(profiles)
+
+    assert merged['shows']['requests'] == 2
+    assert merged['shows']['seconds'] == 0.75
+    assert profiling.breakdown(merged['shows']['stacks']) == {'sql': 4, 'render': 3, 'python': 0}
+    assert profiling.breakdown(Counter(merged['index']['stacks'])) == {'sql': 0, 'render': 0, 'python': 4}
+
+    assert profiling.collapsed(merged) == [
+        'index;flask.app:wsgi_app;app:index 4',
+        'shows;flask.app:wsgi_app;app:shows;jinja2.environment:render 2',
+        'shows;flask.app:wsgi_app;app:shows;pages/shows.html:root 1',
+        'shows;flask.app:wsgi_app;app:shows;sqlalchemy.engine.base:execute 4',
+    ]
+    assert profiling.collapsed({'index': merged['index']}) == ['flask.app:wsgi_app;app:index 4']
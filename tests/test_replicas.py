@@ -0,0 +1,97 @@
+import sqlite3
+
+import pytest
+from flask import g
+
+import cache
+import routing
+from harness import venue_form
+from models import db
+from models import Venue
+
+
+@pytest.fixture
+def replica(app, catalog, tmp_path, monkeypatch):
+    """A copy of the SQLite test database, configured as the one replica.
+
+    Venue 1 is renamed on the copy only, so pages show which one they read.
+    """
+
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            pytest.skip('replicas are copied SQLite files')
+        primary = db.engine.url.database
+        db.session.remove()
+
+    path = str(tmp_path / 'replica.sqlite')
+    source, copy = sqlite3.connect(primary), sqlite3.connect(path)
+    source.backup(copy)
+    copy.execute('UPDATE "Venue" SET name = ? WHERE id = 1', ('Replica Venue',))
+    copy.commit()
+    source.close()
+    copy.close()
+
+    uri = 'sqlite:///' + path
+    monkeypatch.setitem(app.config, 'SQLALCHEMY_REPLICA_URIS', [uri])
+    monkeypatch.setitem(app.config, 'SQLALCHEMY_BINDS', {'replica0': uri})
+
+    yield uri
+
+    with app.app_context():
+        db.get_engine(app, bind='replica0').dispose()
+
+
+def test_reads_go_to_the_replica(client, replica):
+    assert b'Replica Venue' in client.get('/venues/1').data
+    assert b'Replica Venue' in client.get('/api/v1/venues/1').data
+
+    # A POST marked read-only reads there too
+    response = client.post('/venues/search', data={'search_term': 'Replica Venue'})
+    assert b'Replica Venue' in response.data
+
+
+def test_a_commit_pins_the_client_to_the_primary(app, client, replica):
+    with app.app_context():
+        city = Venue.query.get(1).contact.city
+        db.session.remove()
+
+    response = client.post('/venues/1/edit', data=dict(venue_form(1), name='Edited Venue', city=city))
+
+    assert response.status_code == 302
+    assert routing.PRIMARY_COOKIE + '=' in response.headers['Set-Cookie']
+
+    # Its own write, though the replica never got it
+    body = client.get('/venues/1').data
+    assert b'Edited Venue' in body and b'Replica Venue' not in body
+
+    # Another client, or this one once the window is over
+    assert b'Replica Venue' in app.test_client().get('/venues/1').data
+
+    client.set_cookie('localhost', routing.PRIMARY_COOKIE, '0')
+    assert b'Replica Venue' in client.get('/venues/1').data
+
+
+def test_reads_set_no_cookie(client, replica):
+    response = client.get('/venues/1')
+
+    assert 'Set-Cookie' not in response.headers
+
+
+def test_pinned_clients_skip_the_page_cache(app, client, replica, page_cache):
+    page_cache.set('page:/venues/1?', 'stale', [], 60)
+    client.set_cookie('localhost', routing.PRIMARY_COOKIE, '%d' % (2 ** 40))
+
+    body = client.get('/venues/1').data
+
+    assert body != b'stale'
+    assert b'Replica Venue' not in body
+
+
+def test_replica_pages_are_cached_briefly(app, replica):
+    with app.test_request_context('/venues/1'):
+        assert cache.entry_ttl(300) == 300
+
+        g.replica = 'replica0'
+        assert routing.on_replica()
+        assert cache.entry_ttl(300) == app.config['REPLICA_READ_YOUR_WRITES']
+        assert cache.entry_ttl(1) == 1
@@ -0,0 +1,65 @@
+import queries
+from models import db
+from models import Artist
+from models import Contact
+from models import Venue
+
+
+def test_search_matches_names_case_insensitively(app, catalog):
+    with app.app_context():
+        name = Venue.query.get(1).name
+        word = name.split()[1].upper()
+
+        results = queries.search_venues(word, per_page=100)
+        expected = Venue.query.filter(Venue.name.ilike('%' + word + '%')).count()
+        db.session.remove()
+
+    assert results['count'] >= expected > 0
+    assert 1 in [v['id'] for v in results['data']]
+
+
+def test_search_matches_states_and_genres(app, catalog):
+    with app.app_context():
+        state = Artist.query.get(1).contact.state
+        in_state = (Artist.query.join(Contact, Artist.contact_id == Contact.id)
+                    .filter(Contact.state == state).count())
+        by_state = queries.search_artists(state.lower(), per_page=100)
+
+        jazz = queries.search_venues('Jazz', per_page=100)
+        db.session.remove()
+
+    assert by_state['count'] >= in_state > 0
+    assert jazz['count'] > 0
+
+
+def test_search_treats_wildcards_literally(app, catalog):
+    with app.app_context():
+        assert queries.search_venues('%')['count'] == 0
+        assert queries.search_artists('_')['count'] == 0
+        db.session.remove()
+
+
+def test_search_pages_results(app, catalog):
+    with app.app_context():
+        everything = queries.search_artists('e', per_page=100)
+        first = queries.search_artists('e', page=1, per_page=5)
+        second = queries.search_artists('e', page=2, per_page=5)
+        db.session.remove()
+
+    assert first['count'] == everything['count']
+    assert first['pages'] == -(-everything['count'] // 5)
+    assert [a['id'] for a in first['data'] + second['data']] == \
+        [a['id'] for a in everything['data'][:10]]
+
+
+def test_search_forms(app, client, catalog):
+    with app.app_context():
+        name = Venue.query.get(1).name
+        db.session.remove()
+
+    response = client.post('/venues/search', data={'search_term': name})
+    assert response.status_code == 200
+    assert name.encode() in response.data
+
+    assert client.post('/artists/search', data={'search_term': 'moon'}).status_code == 200
+    assert client.get('/artists/search?search_term=moon&page=2').status_code == 200
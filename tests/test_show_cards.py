@@ -0,0 +1,113 @@
+import json
+from datetime import datetime as dt
+
+import counters
+from harness import IMPORT_TOKEN
+from harness import artist_form
+from harness import venue_form
+from models import db
+from models import Artist
+from models import Show
+from models import ShowCard
+from models import Venue
+
+AUTHORIZATION = {'Authorization': 'Bearer ' + IMPORT_TOKEN}
+
+
+def check(app):
+    with app.app_context():
+        result = counters.check_show_cards()
+        db.session.remove()
+
+    return result
+
+
+def cards_of(app, **criteria):
+    """(venue_name, venue_city, artist_name, artist_image_link) of the matching cards."""
+
+    with app.app_context():
+        cards = [(c.venue_name, c.venue_city, c.artist_name, c.artist_image_link)
+                 for c in ShowCard.query.filter_by(**criteria)]
+        db.session.remove()
+
+    return cards
+
+
+def test_generated_cards_are_clean(app, catalog):
+    result = check(app)
+
+    assert result['cards'] == catalog['shows']
+    assert (result['missing_or_stale'], result['unexpected']) == (0, 0)
+
+
+def test_edits_refresh_the_cards(app, client, catalog):
+    with app.app_context():
+        artist_id = Show.query.filter_by(venue_id=1).first().artist_id
+        db.session.remove()
+
+    # Renamed and moved: city is a contact column
+    client.post('/venues/1/edit', data=dict(venue_form(1), name='Card Venue', city='Boise', state='ID'))
+    form = dict(artist_form(artist_id), name='Card Artist', image_link='https://example.com/new.jpg')
+    client.post('/artists/%d/edit' % artist_id, data=form)
+    client.get('/')
+
+    assert {(name, city) for name, city, _, _ in cards_of(app, venue_id=1)} == {('Card Venue', 'Boise')}
+    assert {(name, image) for _, _, name, image in cards_of(app, artist_id=artist_id)} == \
+        {('Card Artist', 'https://example.com/new.jpg')}
+
+    assert client.get('/shows?all=1').data.count(b'Card Venue') == len(cards_of(app, venue_id=1))
+
+    result = check(app)
+    assert (result['missing_or_stale'], result['unexpected']) == (0, 0)
+
+
+def test_new_and_imported_shows_get_cards(app, client, catalog):
+    with app.app_context():
+        venue_name = Venue.query.get(2).name
+        artist_name = Artist.query.get(3).name
+        db.session.remove()
+
+    client.post('/shows/create', data={'venue_id': 2, 'artist_id': 3, 'start_time': '2040-01-01 20:00',
+                                       'duration': 120})
+
+    rows = [{'start': '2040-01-02T20:00', 'artist_id': 3, 'venue_id': 2},
+            {'start': '2040-01-03T20:00', 'artist': artist_name, 'venue_id': 2}]
+    response = client.post('/import/shows', data=''.join(json.dumps(row) + '\n' for row in rows),
+                           headers=dict(AUTHORIZATION, **{'Content-Type': 'application/x-ndjson'}))
+    assert response.status_code == 200
+
+    with app.app_context():
+        starts = [c.start for c in ShowCard.query.filter(ShowCard.start >= dt(2040, 1, 1))
+                  .order_by(ShowCard.start)]
+        db.session.remove()
+
+    assert starts == [dt(2040, 1, d, 20) for d in (1, 2, 3)]
+    assert {(venue, artist) for venue, _, artist, _ in cards_of(app, venue_id=2, artist_id=3)} == \
+        {(venue_name, artist_name)}
+
+    result = check(app)
+    assert result['cards'] == catalog['shows'] + 3
+    assert (result['missing_or_stale'], result['unexpected']) == (0, 0)
+
+
+def test_check_finds_corrupted_cards(app, catalog):
+    with app.app_context():
+        shows = [s.id for s in Show.query.order_by(Show.id).limit(3)]
+
+        cards = ShowCard.__table__
+        db.session.execute(cards.update().where(cards.c.show_id == shows[0])
+                           .values(venue_name='Wrong Name'))
+        db.session.execute(cards.delete().where(cards.c.show_id == shows[1]))
+        db.session.commit()
+
+        result = counters.check_show_cards()
+        assert (result['missing_or_stale'], result['unexpected']) == (2, 1)
+        assert result['missing_or_stale_ids'] == shows[:2]
+        assert result['unexpected_ids'] == shows[:1]
+        assert result['cards'] == catalog['shows'] - 1
+
+        # Repaired
+        assert counters.rebuild_show_cards() == catalog['shows']
+        result = counters.check_show_cards()
+        assert (result['missing_or_stale'], result['unexpected']) == (0, 0)
+        db.session.remove()
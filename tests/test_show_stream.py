@@ -0,0 +1,47 @@
+import re
+
+import queries
+from models import db
+from models import Venue
+
+SHOW_LINK = re.compile(r'<h5><a href="/artists/(\d+)">')
+
+
+def test_all_shows_stream_every_show(client, catalog):
+    response = client.get('/shows?all=1')
+
+    assert response.status_code == 200
+    assert response.is_streamed
+
+    body = response.get_data(as_text=True)
+    assert len(SHOW_LINK.findall(body)) == catalog['shows']
+    assert 'class="next"' not in body
+
+
+def test_all_shows_keep_filters_and_cursor(app, client, catalog):
+    with app.app_context():
+        shows = list(queries.iter_shows())
+        middle = shows[len(shows) // 2]
+        contact = Venue.query.get(middle['venue_id']).contact
+        city, state = contact.city, contact.state
+        after = queries.encode_cursor(middle['start_time'], 0)
+
+        expected = list(queries.iter_shows(after, city=city, state=state))
+        db.session.remove()
+
+    body = client.get('/shows', query_string={'all': 1, 'after': after,
+                                              'city': city, 'state': state}).get_data(as_text=True)
+
+    assert expected
+    assert [int(id) for id in SHOW_LINK.findall(body)] == [s['artist_id'] for s in expected]
+
+
+def test_all_shows_are_not_cached(client, catalog, page_cache):
+    client.get('/shows?all=1').get_data()
+
+    assert not any(key.startswith('page:/shows') for key in page_cache.entries)
+
+
+def test_all_shows_reject_bad_input(client, catalog):
+    assert client.get('/shows?all=1&after=garbage').status_code == 400
+    assert client.get('/shows?all=1&from=garbage').status_code == 400
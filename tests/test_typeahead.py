@@ -0,0 +1,157 @@
+import threading
+
+import typeahead
+from harness import venue_form
+from models import db
+from models import Venue
+
+
+def names(found):
+    return [f['name'] for f in found]
+
+
+def test_prefix_index_search_order():
+    index = typeahead.PrefixIndex([(1, 'The Blue Moon'), (2, 'Blue Note'),
+                                   (3, 'Bluebird Cafe'), (4, 'Old Blue'), (5, 'Red Room')])
+
+    # Whole-name matches first, then later words, each alphabetically
+    assert names(index.search('blue')) == ['Blue Note', 'Bluebird Cafe', 'Old Blue', 'The Blue Moon']
+    assert names(index.search('  BLUE   mo')) == ['The Blue Moon']
+    assert names(index.search('blue', limit=2)) == ['Blue Note', 'Bluebird Cafe']
+    assert index.search('') == index.search('   ') == []
+    assert index.search('green') == []
+
+
+def test_prefix_index_add_and_remove():
+    index = typeahead.PrefixIndex([(1, 'Blue Note')])
+
+    index.add(2, 'Jazz Blue')
+    assert names(index.search('blue')) == ['Blue Note', 'Jazz Blue']
+
+    # Renamed: the old name's entries go
+    index.add(1, 'Green Room')
+    assert names(index.search('blue')) == ['Jazz Blue']
+    assert names(index.search('room')) == ['Green Room']
+
+    index.remove(2)
+    index.remove(3)
+    assert index.search('blue') == []
+    assert index.starts == [('green room', 1)] and index.words == [('room', 1)]
+
+
+def test_search_waits_for_the_lock():
+    index = typeahead.PrefixIndex([(1, 'Blue Note')])
+    found = []
+
+    with index.lock:
+        searching = threading.Thread(target=lambda: found.append(index.search('blue')))
+        searching.start()
+        searching.join(0.1)
+        assert searching.is_alive()
+
+    searching.join()
+    assert names(found[0]) == ['Blue Note']
+
+
+def test_typeahead_endpoints(app, client, catalog):
+    with app.app_context():
+        name = Venue.query.get(1).name
+        db.session.remove()
+
+    response = client.get('/api/v1/venues/typeahead', query_string={'q': name[:4]})
+
+    assert response.status_code == 200
+    assert {'id': 1, 'name': name} in response.get_json()['data']
+    assert client.get('/api/v1/artists/typeahead?q=').get_json() == {'data': []}
+
+    limited = client.get('/api/v1/venues/typeahead?q=a&limit=1000').get_json()['data']
+    assert len(limited) <= 50
+
+
+def test_commits_update_the_index(app, client, catalog):
+    def suggested(prefix):
+        return names(client.get('/api/v1/venues/typeahead', query_string={'q': prefix})
+                     .get_json()['data'])
+
+    # Loaded before the writes
+    assert suggested('zz') == []
+
+    with app.app_context():
+        city = Venue.query.get(1).contact.city
+        db.session.remove()
+
+    client.post('/venues/1/edit', data=dict(venue_form(1), name='Zzyzx Hall', city=city))
+    assert suggested('zzy') == ['Zzyzx Hall']
+    assert 'Zzyzx Hall' in suggested('hall')
+
+    client.post('/venues/create', data=dict(venue_form(0), name='Zzz Lounge'))
+    assert suggested('zz') == ['Zzyzx Hall', 'Zzz Lounge']
+
+    with app.app_context():
+        venue_id = Venue.query.filter_by(name='Zzz Lounge').one().id
+        db.session.remove()
+
+    client.delete('/venues/%d' % venue_id)
+    assert suggested('zz') == ['Zzyzx Hall']
+
+    # Rolled back: never applied
+    with app.app_context():
+        Venue.query.get(1).name = 'Zzzz Rolled Back'
+        db.session.flush()
+        db.session.rollback()
+        db.session.remove()
+
+    assert suggested('zz') == ['Zzyzx Hall']
+
+
+def test_unloadable_names_are_a_503(app, client, catalog, monkeypatch):
+    typeaheads = app.extensions['typeahead']
+    index = typeahead.PrefixIndex
+
+    def unreadable(rows):
+        raise RuntimeError('database is down')
+
+    monkeypatch.setattr(typeaheads, 'indexes', None)
+    monkeypatch.setattr(typeahead, 'PrefixIndex', unreadable)
+    monkeypatch.setattr(threading, 'excepthook', lambda args: None)
+
+    response = client.get('/api/v1/venues/typeahead?q=a')
+
+    assert response.status_code == 503
+    assert response.get_json() == {'error': 'Service Unavailable', 'status': 503}
+    assert typeaheads.loading is None
+    assert isinstance(typeaheads.error, RuntimeError)
+
+    # Tried again on the next request, and working once the database is back
+    monkeypatch.setattr(typeahead, 'PrefixIndex', index)
+    assert client.get('/api/v1/venues/typeahead?q=a').status_code == 200
+    assert typeaheads.error is None
+
+
+def test_commits_during_a_load_are_replayed(app, client, catalog, monkeypatch):
+    typeaheads = app.extensions['typeahead']
+    index = typeahead.PrefixIndex
+    read, resume = threading.Event(), threading.Event()
+
+    # The load stops once it has read the names, before swapping them in
+    def slow_index(rows):
+        built = index(rows)
+        read.set()
+        resume.wait(5)
+        return built
+
+    with app.app_context():
+        city = Venue.query.get(1).contact.city
+        db.session.remove()
+
+    monkeypatch.setattr(typeahead, 'PrefixIndex', slow_index)
+    typeaheads.start_loading()
+    loading = typeaheads.loading
+    assert read.wait(5)
+
+    client.post('/venues/1/edit', data=dict(venue_form(1), name='Zzyzx Hall', city=city))
+
+    resume.set()
+    loading.join()
+
+    assert names(typeaheads.indexes['venues'].search('zzyzx')) == ['Zzyzx Hall']
@@ -0,0 +1,8 @@
+def test_venues_page_statements_do_not_grow_with_venues(seed, statements):
+    seed(20)
+    small = statements('/venues')
+
+    seed(200)
+    large = statements('/venues')
+
+    assert small == large
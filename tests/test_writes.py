@@ -0,0 +1,144 @@
+import json
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import writes
+from harness import IMPORT_TOKEN
+from harness import artist_form
+from harness import venue_form
+from models import db
+from models import Artist
+from models import Contact
+from models import Venue
+
+AUTHORIZATION = {'Authorization': 'Bearer ' + IMPORT_TOKEN}
+
+
+def counts(app):
+    """Venue, artist and contact row counts."""
+
+    with app.app_context():
+        counted = (Venue.query.count(), Artist.query.count(), Contact.query.count())
+        db.session.remove()
+
+    return counted
+
+
+@pytest.fixture
+def commits():
+    """How many session commits the test has made so far, as a one-item list."""
+
+    count = [0]
+
+    def on_commit(session):
+        count[0] += 1
+
+    event.listen(Session, 'after_commit', on_commit)
+    yield count
+    event.remove(Session, 'after_commit', on_commit)
+
+
+def test_forms_write_in_one_commit(app, client, catalog, commits):
+    venues, artists, contacts = counts(app)
+
+    client.post('/venues/create', data=venue_form(0))
+    assert commits == [1]
+    client.post('/artists/create', data=artist_form(0))
+    assert commits == [2]
+
+    assert counts(app) == (venues + 1, artists + 1, contacts + 2)
+
+    with app.app_context():
+        venue = Venue.query.filter_by(name=venue_form(0)['name']).one()
+        assert venue.genres == ['Blues', 'Jazz']
+        assert (venue.contact.city, venue.contact.address) == ('Austin', '0 Congress Ave')
+        city = venue.contact.city
+        venue_id = venue.id
+        db.session.remove()
+
+    client.post('/venues/%d/edit' % venue_id, data=dict(venue_form(0), city=city, name='Edited'))
+    assert commits == [3]
+    assert counts(app) == (venues + 1, artists + 1, contacts + 2)
+
+
+def test_failed_forms_leave_nothing(app, client, catalog):
+    before = counts(app)
+
+    response = client.post('/venues/create', data=dict(venue_form(0), name=''))
+
+    assert b'could not be listed' in response.data
+    assert counts(app) == before
+
+
+def test_a_failure_rolls_back_the_whole_unit(app, catalog):
+    before = counts(app)
+
+    with app.app_context():
+        with pytest.raises(RuntimeError):
+            with writes.UnitOfWork() as uow:
+                uow.save(Venue, venue_form(0))
+                uow.save(Artist, artist_form(0))
+                db.session.flush()
+                raise RuntimeError('after the flush')
+
+        with pytest.raises(ValueError, match='unknown genre'):
+            with writes.UnitOfWork() as uow:
+                uow.save(Venue, venue_form(1))
+                uow.save(Venue, dict(venue_form(2), genres=['Polka Metal']))
+
+        db.session.remove()
+
+    assert counts(app) == before
+
+
+def test_batch_creates_every_row(app, client, catalog, commits):
+    venues, artists, contacts = counts(app)
+    rows = [venue_form(n) for n in range(5)]
+
+    response = client.post('/batch/venues', data=json.dumps(rows), headers=AUTHORIZATION,
+                           content_type='application/json')
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert (body['kind'], body['rows'], len(set(body['ids']))) == ('venues', 5, 5)
+    assert commits == [1]
+
+    with app.app_context():
+        assert [Venue.query.get(id).name for id in body['ids']] == [row['name'] for row in rows]
+        db.session.remove()
+
+    assert counts(app) == (venues + 5, artists, contacts + 5)
+
+
+@pytest.mark.parametrize('bad, message', [({'name': ''}, 'name is required'),
+                                          ('a venue', 'expected an object'),
+                                          ({'name': 'X', 'genres': ['Nope']}, 'unknown genre'),
+                                          ({'name': 'X', 'latitude': 'north'}, 'latitude')])
+def test_batch_is_all_or_none(app, client, catalog, bad, message):
+    before = counts(app)
+    rows = [venue_form(0), venue_form(1), bad, venue_form(3)]
+
+    response = client.post('/batch/venues', data=json.dumps(rows), headers=AUTHORIZATION,
+                           content_type='application/json')
+
+    assert response.status_code == 400
+    assert response.get_json()['row'] == 3
+    assert message in response.get_json()['error']
+    assert counts(app) == before
+
+
+def test_batch_rejects_bad_requests(app, client, catalog, monkeypatch):
+    def post(kind, body, headers=AUTHORIZATION):
+        return client.post('/batch/' + kind, data=body, headers=headers,
+                           content_type='application/json').status_code
+
+    assert post('shows', '[]') == 404
+    assert post('venues', '{"name": "X"}') == 400
+    assert post('venues', 'not json') == 400
+    assert post('venues', '[]', headers={}) == 403
+
+    monkeypatch.setattr(writes, 'BATCH_MAX', 2)
+    assert post('artists', json.dumps([artist_form(n) for n in range(3)])) == 413
+    assert post('artists', json.dumps([artist_form(n) for n in range(2)])) == 201
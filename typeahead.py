@@ -0,0 +1,296 @@
+# pyright: reportGeneralTypeIssues=false
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+from bisect import bisect_left
+from flask import current_app
+from flask import has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.orm import attributes
+from threading import Lock
+from threading import Thread
+from models import db
+from models import Artist
+from models import Venue
+import re
+import time
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+
+#----------------------------------------------------------------------------#
+# Prefix index
+#----------------------------------------------------------------------------#
+MODELS = {'venues': Venue, 'artists': Artist}
+
+WORD = re.compile(r'\w+')
+
+
+def normalize(text: str) -> str:
+    return ' '.join(text.casefold().split())
+
+
+class PrefixIndex:
+    """Names by id, searchable by a prefix of any of their words.
+
+    Two sorted arrays of (key, id) pairs: one keyed on whole names, one on
+    each later word through to the end of the name, so "blue mo" also
+    finds "The Blue Moon". The matches of a prefix are a contiguous run of
+    each, found by bisection: a search reads O(log n + limit) entries, and
+    adding or removing a name is a bisection and a list insert per word.
+    """
+
+    def __init__(self, names: Iterable[Tuple[int, str]] = ()):
+        self.names: Dict[int, str] = dict(names)
+        self.lock = Lock()
+
+        self.starts: List[Tuple[str, int]] = []
+        self.words: List[Tuple[str, int]] = []
+        for id, name in self.names.items():
+            start, words = self.entries(id, name)
+            self.starts.extend(start)
+            self.words.extend(words)
+
+        self.starts.sort()
+        self.words.sort()
+
+    @staticmethod
+    def entries(id: int, name: str) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]:
+        """Whole-name and later-word entries of a name."""
+
+        key = normalize(name or '')
+        starts = [m.start() for m in WORD.finditer(key)]
+
+        return [(key, id)], [(key[i:], id) for i in starts if i > 0]
+
+    def add(self, id: int, name: str):
+        with self.lock:
+            self._remove(id)
+            self.names[id] = name
+
+            for keys, entries in zip((self.starts, self.words), self.entries(id, name)):
+                for entry in entries:
+                    keys.insert(bisect_left(keys, entry), entry)
+
+    def remove(self, id: int):
+        with self.lock:
+            self._remove(id)
+
+    def _remove(self, id: int):
+        name = self.names.pop(id, None)
+
+        if name is None:
+            return
+
+        for keys, entries in zip((self.starts, self.words), self.entries(id, name)):
+            for entry in entries:
+                i = bisect_left(keys, entry)
+                if i < len(keys) and keys[i] == entry:
+                    del keys[i]
+
+    def search(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """Up to limit {'id', 'name'} whose name has a word starting with prefix.
+
+        Names starting with the prefix come first, then names with a later
+        word starting with it, each in alphabetical order.
+        """
+
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        found: List[Dict] = []
+        seen = set()
+
+        # A concurrent add() or remove() shifts the arrays under the bisection
+        with self.lock:
+            for keys in (self.starts, self.words):
+                i = bisect_left(keys, (prefix,))
+
+                while i < len(keys) and len(found) < limit:
+                    key, id = keys[i]
+                    if not key.startswith(prefix):
+                        break
+                    i += 1
+
+                    name = self.names.get(id)
+                    if name is not None and id not in seen:
+                        seen.add(id)
+                        found.append({'id': id, 'name': name})
+
+        return found
+
+
+#----------------------------------------------------------------------------#
+# Per-process indexes
+#
+# Each worker loads the venue and artist names once, in the background as
+# it starts, then keeps them current with the commits of its own sessions
+# (session events below). Writes made by other workers or processes show
+# up when the indexes are reloaded, at most TYPEAHEAD_REFRESH seconds later.
+#----------------------------------------------------------------------------#
+class IndexUnavailable(RuntimeError):
+    """Raised when the names could not be loaded, e.g. the database is down."""
+
+
+class Typeahead:
+    def __init__(self, app, refresh: int):
+        self.app = app
+        self.refresh = refresh
+        self.indexes: Optional[Dict[str, PrefixIndex]] = None
+        self.loaded_at = 0.0
+        self.lock = Lock()
+        self.loading: Optional[Thread] = None
+
+        # Why the last load failed, if it did
+        self.error: Optional[Exception] = None
+
+        # Changes committed while a reload reads the tables, replayed on its result
+        self.replay: Optional[List[Tuple[str, int, Optional[str]]]] = None
+
+    def load(self):
+        """Read every name and swap in fresh indexes."""
+
+        with self.lock:
+            self.replay = []
+
+        try:
+            with self.app.app_context():
+                indexes = {kind: PrefixIndex(db.session.query(model.id, model.name))
+                           for kind, model in MODELS.items()}
+                db.session.remove()
+
+        except Exception as e:
+            with self.lock:
+                self.replay = None
+                self.loading = None
+                self.error = e
+            raise
+
+        # Replayed and swapped in one go: a commit applies either to the
+        # replay list or to the indexes swapped in, never to neither
+        with self.lock:
+            for change in self.replay:
+                apply_change(indexes, *change)
+
+            self.indexes = indexes
+            self.loaded_at = time.time()
+            self.error = None
+            self.replay = None
+            self.loading = None
+
+    def start_loading(self):
+        """Reload in a background thread unless one is already running."""
+
+        with self.lock:
+            if self.loading is not None:
+                return
+
+            self.loading = Thread(target=self.load, name='typeahead-load', daemon=True)
+            self.loading.start()
+
+    def get(self, kind: str) -> PrefixIndex:
+        """The index of kind, waiting for the first load if need be."""
+
+        if self.indexes is None:
+            # The first load, or another try after a failed one
+            self.start_loading()
+
+            loading = self.loading
+            if loading is not None:
+                loading.join()
+
+            if self.indexes is None:
+                raise IndexUnavailable('%s names could not be loaded: %s'
+                                       % (kind, self.error)) from self.error
+
+        elif time.time() - self.loaded_at > self.refresh:
+            self.start_loading()
+
+        return self.indexes[kind]
+
+    def apply(self, changes: List[Tuple[str, int, Optional[str]]]):
+        with self.lock:
+            if self.replay is not None:
+                self.replay.extend(changes)
+
+            if self.indexes is not None:
+                for change in changes:
+                    apply_change(self.indexes, *change)
+
+
+def apply_change(indexes: Dict[str, PrefixIndex], kind: str, id: int, name: Optional[str]):
+    if name is None:
+        indexes[kind].remove(id)
+    else:
+        indexes[kind].add(id, name)
+
+
+def search(kind: str, prefix: str, limit: int = 10) -> List[Dict]:
+    return current_app.extensions['typeahead'].get(kind).search(prefix, limit)
+
+
+def schedule_reload():
+    """Reload in the background, after writes the session events cannot see (COPY)."""
+
+    current_app.extensions['typeahead'].start_loading()
+
+
+#----------------------------------------------------------------------------#
+# Session events
+#----------------------------------------------------------------------------#
+@event.listens_for(Session, 'after_flush')
+def collect_names(session, flush_context):
+    """Note names added, renamed or deleted by this flush, applied on commit."""
+
+    changes = session.info.setdefault('typeahead', [])
+
+    for kind, model in MODELS.items():
+        for obj in session.new:
+            if isinstance(obj, model):
+                changes.append((kind, obj.id, obj.name))
+
+        for obj in session.dirty:
+            if isinstance(obj, model) and attributes.get_history(obj, 'name').has_changes():
+                changes.append((kind, obj.id, obj.name))
+
+        for obj in session.deleted:
+            if isinstance(obj, model):
+                changes.append((kind, obj.id, None))
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_names(session):
+    changes = session.info.pop('typeahead', None)
+
+    if changes and has_app_context():
+        typeahead = current_app.extensions.get('typeahead')
+        if typeahead is not None:
+            typeahead.apply(changes)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_names(session, previous_transaction):
+    session.info.pop('typeahead', None)
+
+
+#----------------------------------------------------------------------------#
+# Flask integration
+#----------------------------------------------------------------------------#
+def init_app(app):
+    """Keep per-process name indexes; loading starts with the first request."""
+
+    typeahead = app.extensions['typeahead'] = Typeahead(app, app.config.get('TYPEAHEAD_REFRESH', 60))
+
+    # After the fork, in the worker: not while the master imports the app
+    @app.before_first_request
+    def start_loading():
+        typeahead.start_loading()
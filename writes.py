@@ -0,0 +1,177 @@
+# pyright: reportGeneralTypeIssues=false
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+from flask import current_app
+from models import db
+from models import Artist
+from models import Contact
+from models import Genre
+from models import Venue
+from importer import CONTACT_FIELDS
+from importer import coordinate
+from importer import genres_of
+from importer import reserve_ids
+import cache
+
+#----------------------------------------------------------------------------#
+# Typing
+#----------------------------------------------------------------------------#
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+
+
+#----------------------------------------------------------------------------#
+# Unit of work
+#
+# Venues and artists are written together with their contact and genre
+# links: the forms, the edit pages and POST /batch/<kind> all go through
+# UnitOfWork, which stages everything in the session and sends it in one
+# flush and one commit, so a failure can never leave a contact without its
+# venue or artist. Cache invalidation follows the commit.
+#----------------------------------------------------------------------------#
+KINDS = {'venues': Venue, 'artists': Artist}
+
+# Most entities one POST /batch/<kind> request may carry
+BATCH_MAX = 1000
+
+
+class InvalidEntity(ValueError):
+    """Raised when one entity of a batch cannot be saved; none of them is."""
+
+    def __init__(self, row: int, message: str):
+        super().__init__('row %d: %s' % (row, message))
+        self.row = row
+
+
+def load(model, id: int):
+    """A venue or artist with its contact and genres, in one SELECT; None if missing."""
+
+    return model.query.options(db.joinedload(model.genre_rows)).get(id)
+
+
+class UnitOfWork:
+    """Creates and updates venues and artists, committed once.
+
+        with UnitOfWork() as uow:
+            venue = uow.save(Venue, form.data)
+
+    The block's changes are flushed and committed together when it exits,
+    then the cache tags of what changed are invalidated; an exception rolls
+    all of them back.
+    """
+
+    def __init__(self):
+        self.tags: Set[str] = set()
+
+        # Genre rows by name, read once per unit of work
+        self.genres: Optional[Dict[str, Genre]] = None
+
+    def __enter__(self) -> 'UnitOfWork':
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            db.session.rollback()
+            return False
+
+        try:
+            db.session.commit()
+
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if self.tags:
+            cache.catalog_changed.send(current_app._get_current_object(), tags=sorted(self.tags))
+
+        return False
+
+    def genre_rows(self, names: Iterable[str]) -> List[Genre]:
+        """Genre rows of names; raises ValueError on a genre not in the table."""
+
+        if self.genres is None:
+            self.genres = {genre.name: genre for genre in Genre.query}
+
+        rows = []
+        for name in dict.fromkeys(names):
+            if name not in self.genres:
+                raise ValueError('unknown genre %r' % name)
+            rows.append(self.genres[name])
+
+        return rows
+
+    def save(self, model, fields: Dict, entity=None,
+             id: Optional[int] = None, contact_id: Optional[int] = None):
+        """Stage a new venue or artist (entity None), or changes to entity, from fields.
+
+        fields are those of the forms and of import rows: name, genres and
+        the contact's. A new entity and its contact may be given their
+        primary keys. Raises ValueError on an invalid entity.
+        """
+
+        name = fields.get('name')
+        if name is not None and not isinstance(name, str):
+            raise ValueError('name must be a string')
+
+        name = (name or '').strip()
+        if not name:
+            raise ValueError('name is required')
+
+        genres = self.genre_rows(genres_of(fields.get('genres')))
+
+        kind = 'venues' if model is Venue else 'artists'
+
+        if entity is None:
+            entity = model(id=id, contact=Contact(id=contact_id))
+            db.session.add(entity)
+
+        else:
+            self.tags.add('%s:%d' % (kind[:-1], entity.id))
+            if entity.contact is None:
+                entity.contact = Contact()
+
+        entity.name = name
+        entity.genre_rows = genres
+
+        for field in CONTACT_FIELDS:
+            setattr(entity.contact, field, fields.get(field) or None)
+
+        # Import rows may place the contact themselves; the forms leave it to its city
+        for field, bound in (('latitude', 90), ('longitude', 180)):
+            if field in fields:
+                try:
+                    setattr(entity.contact, field, coordinate(fields[field], bound))
+                except (TypeError, ValueError):
+                    raise ValueError('%s must be a number of degrees' % field)
+
+        # New or renamed, the entity may land on any listing page
+        self.tags.add(kind)
+
+        return entity
+
+    def save_all(self, model, rows: List[Dict]) -> List:
+        """Stage many new venues or artists; raises InvalidEntity on the first bad one.
+
+        Their primary keys are reserved up front, so the flush sends each
+        table's rows as one executemany instead of an INSERT ... RETURNING
+        per row.
+        """
+
+        contact_ids = reserve_ids(Contact.__table__, len(rows))
+        entity_ids = reserve_ids(model.__table__, len(rows))
+
+        entities = []
+        for n, (row, contact_id, entity_id) in enumerate(zip(rows, contact_ids, entity_ids), 1):
+            if not isinstance(row, dict):
+                raise InvalidEntity(n, 'expected an object')
+
+            try:
+                entities.append(self.save(model, row, id=entity_id, contact_id=contact_id))
+            except ValueError as e:
+                raise InvalidEntity(n, str(e))
+
+        return entities